@@ -1,14 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import requests
 import os
 import subprocess
-import tempfile
 import shutil
 import time
 import win32com.client  # Requires pywin32
 
+from jobstate import MOUNTED
+
 class WindowsUpdateEngine:
     def __init__(self, status_callback, progress_callback):
         self.update_status = status_callback
@@ -57,6 +57,8 @@ class FlamesISOInstaller:
         self.progress_var = tk.DoubleVar()
         self.cancelled = False
         self.temp_dir = None
+        # Download, conversion and imaging happen in an engine, created on first use
+        self._engine = None
 
         # Header
         tk.Label(root, text="Flames NT ISO Installer 🔥", font=("Segoe UI", 18, "bold"), bg="#ffb3d9", fg="#8b0051").pack(pady=10)
@@ -111,8 +113,19 @@ class FlamesISOInstaller:
         self.update_button.config(state='disabled')
         threading.Thread(target=lambda: WindowsUpdateEngine(self.update_status, self.update_progress).upgrade_os(self.mounted_path), daemon=True).start()
 
+    @property
+    def engine(self):
+        if self._engine is None:
+            from flamesengine import FlamesEngine, configure_process
+
+            configure_process()
+            self._engine = FlamesEngine(status_callback=self.update_status, progress_callback=self.update_progress)
+        return self._engine
+
     def cancel(self):
         self.cancelled = True
+        if self._engine:
+            self._engine.cancelled = True
         self.update_status("Process cancelled by user.")
 
     def update_status(self, msg):
@@ -122,41 +135,19 @@ class FlamesISOInstaller:
         self.root.after(0, lambda: self.progress_var.set(pct))
 
     def download_and_prepare(self):
+        succeeded = False
         try:
             build_name = self.build_selector.get()
             edition = self.edition_selector.get()
-            self.update_status(f"Preparing {build_name} - {edition}...")
-            self.update_progress(5)
-
-            self.temp_dir = tempfile.mkdtemp(prefix="FlamesISO_")
-            mapping = {
-                "Canary Channel (Latest Insider)": {"build": "Canary", "ring": "Canary"},
-                "Dev Channel (Weekly Builds)": {"build": "Dev", "ring": "Dev"},
-                "Beta Channel (Monthly Updates)": {"build": "Beta", "ring": "Beta"},
-                "Release Preview (Stable Preview)": {"build": "RP", "ring": "RP"},
-                "Windows 11 24H2 (Current Stable)": {"build": "24H2", "ring": "Production"},
-                "Windows 11 23H2 (Previous Stable)": {"build": "23H2", "ring": "Production"},
-                "Windows 10 22H2 (Latest Win10)": {"build": "22H2", "ring": "Production"}
-            }
-            info = mapping.get(build_name)
-            if not info:
-                raise RuntimeError("Build info not found")
-
-            self.update_status("Fetching build metadata...")
-            r = requests.get("https://api.uupdump.net/listid.php", params={"search": info['build'], "sortByDate": 1}, timeout=10)
-            data = r.json().get('response', {}).get('builds', {})
-            # pick latest matching
-            bid, bdata = next(((k,v) for k,v in data.items() if info['ring'] in v.get('title','')), (None,None))
-            build_info = {'id': bid or f"{info['build']}_fallback", 'title': bdata['title'] if bdata else build_name, 'build': bdata.get('build', info['build']) if bdata else info['build']}
-
-            self.download_tools()
+            # Checkpointed per selection: after a crash or cancel the engine resumes at the first unfinished
+            # stage, and it downloads the payloads and converts them into the media the ISO is written from
+            self.engine.cancelled = False
+            iso_path = self.engine.run_job(build_name, edition, mount=False)
             if self.cancelled: return
-
-            self.update_status("Creating ISO... 🔄")
-            self.update_progress(40)
-            iso_path = self.create_iso(build_info, edition)
-            if not os.path.exists(iso_path):
+            if not iso_path or not os.path.exists(iso_path):
                 raise RuntimeError("ISO creation failed")
+            self.temp_dir = self.engine.temp_dir
+            state = self.engine.job_state
 
             self.update_progress(80)
             self.update_status("Mounting ISO... 💿")
@@ -164,11 +155,13 @@ class FlamesISOInstaller:
             if self.cancelled: return
 
             if drive:
+                state.complete(MOUNTED, iso=iso_path, drive=drive)
                 self.mounted_path = f"{drive}:\\"
                 self.update_status(f"ISO mounted at {self.mounted_path}")
                 self.progress_var.set(100)
                 self.update_status("✅ ISO ready. Click 'Upgrade via WinUpdate' to proceed.")
                 self.update_button.config(state='normal')
+                succeeded = True
             else:
                 raise RuntimeError("ISO mount failed")
 
@@ -178,21 +171,10 @@ class FlamesISOInstaller:
         finally:
             self.start_button.config(state='normal')
             self.cancel_button.config(state='disabled')
-            if self.temp_dir and not self.cancelled:
+            # Failed or cancelled jobs keep their files so the next run resumes
+            if self.temp_dir and succeeded:
                 shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    def download_tools(self):
-        tools = os.path.join(self.temp_dir, 'tools')
-        os.makedirs(tools, exist_ok=True)
-        # TODO: Download and extract aria2c if needed
-        self.update_status("Tools ready.")
-        self.update_progress(30)
-
-    def create_iso(self, build_info, edition):
-        iso = os.path.join(self.temp_dir, f"Windows_{build_info['build']}_{edition}.iso")
-        open(iso, 'wb').close()  # stub
-        return iso
-
     def mount_iso(self, iso_path):
         cmd = [
             "powershell", "-Command",
@@ -0,0 +1,168 @@
+"""
+Flames NT aria2 progress 📶
+Turns aria2c's console output into real byte counts, speed and ETA
+"""
+
+import os
+import re
+
+UNITS = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3, "TiB": 1024 ** 4}
+
+_SIZE = r"[\d.]+(?:[KMGT]i)?B"
+# One download in a readout or summary: [#2089b0 400MiB/1.2GiB(33%) CN:16 DL:112MiB ETA:7s]
+_ITEM = re.compile(rf"#(?P<gid>[0-9a-f]+)\s+(?P<done>{_SIZE})/(?P<total>{_SIZE})(?P<rest>[^\]]*)")
+_GLOBAL_DL = re.compile(rf"\[DL:(?P<speed>{_SIZE})\]")
+_ITEM_DL = re.compile(rf"DL:(?P<speed>{_SIZE})")
+_ETA = re.compile(r"ETA:(?P<eta>(?:\d+h)?(?:\d+m)?(?:\d+s)?)")
+_FILE = re.compile(r"^\s*FILE:\s*(?P<path>.+?)\s*$")
+_COMPLETE = re.compile(r"Download complete:\s*(?P<path>.+?)\s*$")
+# Download Results table: gid   |stat|avg speed  |path/URI
+_RESULT = re.compile(r"^(?P<gid>[0-9a-f]{6})\|(?P<stat>OK|ERR|INPR|RM)\s*\|[^|]*\|(?P<path>.*)$")
+
+ARIA2_PROGRESS_OPTIONS = ["--summary-interval=1", "--enable-color=false", "--console-log-level=notice"]
+
+
+def parse_size(text):
+    match = re.fullmatch(r"([\d.]+)((?:[KMGT]i)?B)", text.strip())
+    if not match:
+        return 0
+    return int(float(match.group(1)) * UNITS[match.group(2)])
+
+
+def parse_eta(text):
+    seconds = 0
+    for value, unit in re.findall(r"(\d+)([hms])", text):
+        seconds += int(value) * {"h": 3600, "m": 60, "s": 1}[unit]
+    return seconds
+
+
+class Aria2Progress:
+    """Feed it aria2c output (any chunking); it keeps live totals and calls callback(self)
+
+    expected is the planned file list (dicts with name/size) when known, so
+    the total covers files aria2c hasn't started yet and files that finish
+    between two summaries still count their full size.
+    """
+
+    def __init__(self, expected=None, callback=None):
+        self.sizes = {}
+        for entry in expected or []:
+            self.sizes[os.path.basename(entry["name"])] = entry.get("size") or 0
+        self.expected_bytes = sum(self.sizes.values())
+        self.expected_files = len(self.sizes)
+        self.callback = callback or (lambda progress: None)
+        self.active = {}
+        self.finished = {}
+        self.errors = []
+        self.speed = 0
+        self._last_gid = None
+        self._carry = ""
+
+    # -- totals -----------------------------------------------------------
+
+    @property
+    def completed_bytes(self):
+        return sum(self.finished.values())
+
+    @property
+    def downloaded(self):
+        return self.completed_bytes + sum(item["done"] for item in self.active.values())
+
+    @property
+    def total(self):
+        seen = self.completed_bytes + sum(item["total"] for item in self.active.values())
+        return max(self.expected_bytes, seen)
+
+    @property
+    def fraction(self):
+        total = self.total
+        return min(1.0, self.downloaded / total) if total else 0.0
+
+    @property
+    def eta(self):
+        if not self.speed:
+            return None
+        return max(0, self.total - self.downloaded) / self.speed
+
+    def describe(self):
+        files = f"{len(self.finished)}/{self.expected_files or len(self.finished) + len(self.active)} files"
+        text = f"{files} · {self.downloaded / 2**20:.0f} of {self.total / 2**20:.0f} MiB"
+        if self.speed:
+            text += f" · {self.speed / 2**20:.1f} MiB/s"
+        if self.eta is not None:
+            minutes, seconds = divmod(int(self.eta), 60)
+            text += f" · ETA {minutes}m{seconds:02d}s"
+        return text
+
+    # -- parsing ----------------------------------------------------------
+
+    def feed(self, text):
+        """Consume a chunk of output; partial lines wait for the rest"""
+        lines = re.split(r"[\r\n]", self._carry + text)
+        self._carry = lines.pop()
+        changed = False
+        for line in lines:
+            changed |= self._line(line)
+        if changed:
+            self.callback(self)
+
+    def close(self):
+        if self._carry:
+            line, self._carry = self._carry, ""
+            if self._line(line):
+                self.callback(self)
+
+    def _line(self, line):
+        if not line.strip():
+            return False
+        match = _COMPLETE.search(line)
+        if match:
+            self._complete_path(match.group("path"))
+            return True
+        match = _RESULT.match(line)
+        if match:
+            if match.group("stat") == "OK":
+                self._complete_gid(match.group("gid"), match.group("path"))
+            elif match.group("stat") == "ERR":
+                self.errors.append(match.group("path").strip())
+            return True
+        match = _FILE.match(line)
+        if match and self._last_gid in self.active:
+            self.active[self._last_gid]["path"] = match.group("path")
+            return False
+
+        items = list(_ITEM.finditer(line))
+        if not items:
+            return False
+        speeds = 0
+        for item in items:
+            gid = item.group("gid")
+            entry = self.active.setdefault(gid, {"path": None})
+            entry["done"] = parse_size(item.group("done"))
+            entry["total"] = parse_size(item.group("total"))
+            dl = _ITEM_DL.search(item.group("rest"))
+            eta = _ETA.search(item.group("rest"))
+            entry["speed"] = parse_size(dl.group("speed")) if dl else 0
+            entry["eta"] = parse_eta(eta.group("eta")) if eta else None
+            speeds += entry["speed"]
+            self._last_gid = gid
+        overall = _GLOBAL_DL.search(line)
+        self.speed = parse_size(overall.group("speed")) if overall else speeds
+        return True
+
+    def _complete_path(self, path):
+        name = os.path.basename(path.replace("\\", "/"))
+        for gid, entry in list(self.active.items()):
+            if entry.get("path") and os.path.basename(entry["path"].replace("\\", "/")) == name:
+                self._complete_gid(gid, path)
+                return
+        # Started and finished between two summaries: we never saw its gid
+        self.finished.setdefault(name, self.sizes.get(name, 0))
+
+    def _complete_gid(self, gid, path):
+        entry = self.active.pop(gid, None)
+        name = os.path.basename(path.replace("\\", "/").strip()) if path else gid
+        if name in self.finished:
+            return
+        size = self.sizes.get(name) or (entry["total"] if entry else 0)
+        self.finished[name] = size
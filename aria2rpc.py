@@ -0,0 +1,385 @@
+"""
+Flames NT aria2 RPC 🎚️
+Runs aria2c with its JSON-RPC interface on and drives it live: submit, watch, retune, pause
+"""
+
+import itertools
+import json
+import os
+import secrets
+import socket
+import subprocess
+import time
+import urllib.error
+import urllib.request
+
+import planner
+
+# Fields asked for on every poll; aria2 sends all of them (files, bitfield...) otherwise
+STATUS_KEYS = ["gid", "status", "totalLength", "completedLength", "downloadSpeed",
+               "connections", "errorCode", "errorMessage"]
+
+# aria2's per-server connection cap
+MAX_CONNECTIONS = 16
+
+
+class Aria2RPCError(RuntimeError):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class Aria2RPC:
+    """Thin JSON-RPC 2.0 client for one aria2c; every call carries the secret token"""
+
+    def __init__(self, url="http://127.0.0.1:6800/jsonrpc", secret=None, timeout=10):
+        self.url = url
+        self.secret = secret
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        # Never route localhost traffic through a configured proxy
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    def _params(self, params):
+        return ([f"token:{self.secret}"] if self.secret else []) + list(params)
+
+    def _post(self, payload):
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            # aria2 answers errors with 400 and a JSON-RPC error body
+            try:
+                return json.loads(e.read())
+            except ValueError:
+                raise Aria2RPCError(f"aria2 RPC returned HTTP {e.code}")
+        except (urllib.error.URLError, OSError) as e:
+            raise Aria2RPCError(f"aria2 RPC not reachable at {self.url}: {e}")
+
+    def call(self, method, *params):
+        # system.* methods take no token; a multicall's token goes on each inner call
+        params = list(params) if method.startswith("system.") else self._params(params)
+        reply = self._post({"jsonrpc": "2.0", "id": str(next(self._ids)), "method": method, "params": params})
+        if reply.get("error"):
+            error = reply["error"]
+            raise Aria2RPCError(f"{method}: {error.get('message')}", error.get("code"))
+        return reply.get("result")
+
+    def multicall(self, calls):
+        """Run [(method, *params), ...] in one round trip; returns each result (errors raise)"""
+        results = self.call("system.multicall", [
+            {"methodName": method, "params": self._params(params)} for method, *params in calls
+        ])
+        unpacked = []
+        for (method, *_), result in zip(calls, results):
+            if isinstance(result, dict) and "code" in result:
+                raise Aria2RPCError(f"{method}: {result.get('message')}", result.get("code"))
+            unpacked.append(result[0])
+        return unpacked
+
+    def add_uri(self, uris, options=None):
+        """Queue one download (several URIs are mirrors of the same file); returns its gid"""
+        return self.call("aria2.addUri", list(uris), options or {})
+
+    def tell_status(self, gid, keys=None):
+        return self.call("aria2.tellStatus", gid, keys or STATUS_KEYS)
+
+    def tell_active(self, keys=None):
+        return self.call("aria2.tellActive", keys or STATUS_KEYS)
+
+    def tell_waiting(self, offset=0, num=1000, keys=None):
+        return self.call("aria2.tellWaiting", offset, num, keys or STATUS_KEYS)
+
+    def tell_stopped(self, offset=0, num=1000, keys=None):
+        return self.call("aria2.tellStopped", offset, num, keys or STATUS_KEYS)
+
+    def get_global_stat(self):
+        return self.call("aria2.getGlobalStat")
+
+    def change_option(self, gid, options):
+        return self.call("aria2.changeOption", gid, {k: str(v) for k, v in options.items()})
+
+    def change_global_option(self, options):
+        return self.call("aria2.changeGlobalOption", {k: str(v) for k, v in options.items()})
+
+    def pause(self, gid):
+        return self.call("aria2.pause", gid)
+
+    def unpause(self, gid):
+        return self.call("aria2.unpause", gid)
+
+    def pause_all(self):
+        return self.call("aria2.pauseAll")
+
+    def unpause_all(self):
+        return self.call("aria2.unpauseAll")
+
+    def force_remove(self, gid):
+        return self.call("aria2.forceRemove", gid)
+
+    def get_version(self):
+        return self.call("aria2.getVersion")
+
+    def shutdown(self):
+        return self.call("aria2.shutdown")
+
+    def force_shutdown(self):
+        return self.call("aria2.forceShutdown")
+
+
+def free_port(host="127.0.0.1"):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class Aria2Daemon:
+    """An aria2c process with RPC on a private port and secret, for the length of one job
+
+    Usable as a context manager; stop() asks aria2c to shut down cleanly (so
+    its .aria2 control files let a later run resume) and kills it only if it
+    doesn't.
+    """
+
+    def __init__(self, aria2c, dest_dir, options=None, startup_timeout=15):
+        self.aria2c = aria2c
+        self.dest_dir = dest_dir
+        self.options = options or []
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self.rpc = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        os.makedirs(self.dest_dir, exist_ok=True)
+        port = free_port()
+        secret = secrets.token_hex(16)
+        cmd = [
+            self.aria2c,
+            "--enable-rpc", "--rpc-listen-all=false", f"--rpc-listen-port={port}",
+            f"--rpc-secret={secret}", f"--dir={self.dest_dir}",
+            "--continue=true", "--file-allocation=none", "--check-certificate=false",
+            # Nothing is read from the console; RPC is the only channel
+            "--quiet=true"
+        ] + self.options
+        self.process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.rpc = Aria2RPC(f"http://127.0.0.1:{port}/jsonrpc", secret=secret, timeout=2)
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            try:
+                self.rpc.get_version()
+                break
+            except Aria2RPCError:
+                if self.process.poll() is not None:
+                    raise Aria2RPCError(f"aria2c exited with code {self.process.returncode} before RPC came up")
+                if time.monotonic() > deadline:
+                    self.stop()
+                    raise Aria2RPCError("aria2c RPC did not come up in time")
+                time.sleep(0.1)
+        self.rpc.timeout = 10
+        return self
+
+    def stop(self, timeout=10):
+        if self.process is None or self.process.poll() is not None:
+            return
+        try:
+            self.rpc.shutdown()
+            self.process.wait(timeout=timeout)
+        except (Aria2RPCError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+class Aria2Session:
+    """A file set submitted to one aria2c and followed to completion over RPC
+
+    wait() polls getGlobalStat plus tellActive/tellWaiting/tellStopped for
+    real byte counts, speed and ETA, and calls callback(self) on every poll.
+    While it runs, other threads may call set_connections(), pause(),
+    resume() or set_rate() to retune transfers as they run.
+    """
+
+    def __init__(self, rpc, callback=None, cancel_check=None, scheduler=None, poll_interval=0.5):
+        self.rpc = rpc
+        self.callback = callback or (lambda session: None)
+        self.cancel_check = cancel_check or (lambda: False)
+        # When set, its global rate is mirrored into aria2's overall limit as it changes
+        self.scheduler = scheduler
+        self.poll_interval = poll_interval
+        self.entries = {}
+        self.duplicates = []
+        self.statuses = {}
+        self.speed = 0
+        self.paused = False
+        self._scheduler_rate = None
+
+    # -- submit -----------------------------------------------------------
+
+    def submit(self, files, connections=5 * MAX_CONNECTIONS, max_per_file=MAX_CONNECTIONS):
+        """Queue files in planner order, each split as wide as the plan says; returns the gids
+
+        Repeated content is fetched once and linked by link_duplicates().
+        """
+        plan = planner.plan(files, connections, max_per_file=max_per_file)
+        self.duplicates = plan.duplicates
+        calls = []
+        for entry in plan.order:
+            split = entry.get("connections") or 1
+            options = {"out": entry["name"], "split": str(split),
+                       "max-connection-per-server": str(min(split, MAX_CONNECTIONS))}
+            if entry.get("sha1"):
+                options["checksum"] = f"sha-1={entry['sha1']}"
+            calls.append(("aria2.addUri", [entry["url"]], options))
+        # One round trip for the whole list, however long it is
+        gids = self.rpc.multicall(calls) if calls else []
+        for gid, entry in zip(gids, plan.order):
+            self.entries[gid] = entry
+        return gids
+
+    def link_duplicates(self, dest_dir):
+        planner.link_duplicates(self.duplicates, dest_dir)
+
+    # -- live control -----------------------------------------------------
+
+    def set_connections(self, connections, gid=None):
+        """Change how many connections files use, without interrupting transfers
+
+        aria2 applies a new split to an active download by restarting it
+        (it resumes from its control file, but every connection reconnects),
+        so by default only files that haven't started yet, or are paused,
+        are changed, along with the default for anything added later. Naming
+        a gid changes that download even if it is active.
+        """
+        connections = max(1, min(int(connections), MAX_CONNECTIONS))
+        options = {"split": connections, "max-connection-per-server": connections}
+        if gid:
+            gids = [gid]
+        else:
+            self.rpc.change_global_option(options)
+            gids = [g for g in self.entries if self.statuses.get(g, {}).get("status", "waiting") in ("waiting", "paused")]
+        for target in gids:
+            try:
+                self.rpc.change_option(target, options)
+            except Aria2RPCError:
+                # Started or finished between the last poll and now
+                pass
+
+    def pause(self, gid=None):
+        if gid:
+            self.rpc.pause(gid)
+        else:
+            self.rpc.pause_all()
+            self.paused = True
+
+    def resume(self, gid=None):
+        if gid:
+            self.rpc.unpause(gid)
+        else:
+            self.rpc.unpause_all()
+            self.paused = False
+
+    def set_rate(self, bytes_per_second):
+        """Overall download limit for this aria2c; None or 0 lifts it"""
+        self.rpc.change_global_option({"max-overall-download-limit": int(bytes_per_second or 0)})
+
+    # -- progress ---------------------------------------------------------
+
+    @property
+    def total(self):
+        return sum(entry.get("size") or 0 for entry in self.entries.values()) or \
+            sum(int(s.get("totalLength") or 0) for s in self.statuses.values())
+
+    @property
+    def downloaded(self):
+        done = 0
+        for gid, status in self.statuses.items():
+            if status.get("status") == "complete":
+                done += self.entries.get(gid, {}).get("size") or int(status.get("totalLength") or 0)
+            else:
+                done += int(status.get("completedLength") or 0)
+        return done
+
+    @property
+    def fraction(self):
+        total = self.total
+        return min(1.0, self.downloaded / total) if total else 0.0
+
+    @property
+    def eta(self):
+        if not self.speed:
+            return None
+        return max(0, self.total - self.downloaded) / self.speed
+
+    @property
+    def completed(self):
+        return [gid for gid, s in self.statuses.items() if s.get("status") == "complete"]
+
+    @property
+    def errors(self):
+        return [f"{self.entries.get(gid, {}).get('name', gid)}: {s.get('errorMessage') or 'error ' + str(s.get('errorCode'))}"
+                for gid, s in self.statuses.items() if s.get("status") in ("error", "removed")]
+
+    def describe(self):
+        text = f"{len(self.completed)}/{len(self.entries)} files · " \
+               f"{self.downloaded / 2**20:.0f} of {self.total / 2**20:.0f} MiB"
+        if self.paused:
+            return text + " · paused"
+        if self.speed:
+            text += f" · {self.speed / 2**20:.1f} MiB/s"
+        if self.eta is not None:
+            minutes, seconds = divmod(int(self.eta), 60)
+            text += f" · ETA {minutes}m{seconds:02d}s"
+        return text
+
+    def poll(self):
+        """One round trip for global stats and every download's status; returns the global stat"""
+        stat, active, waiting, stopped = self.rpc.multicall([
+            ("aria2.getGlobalStat",),
+            ("aria2.tellActive", STATUS_KEYS),
+            ("aria2.tellWaiting", 0, 1000, STATUS_KEYS),
+            ("aria2.tellStopped", 0, 1000, STATUS_KEYS)
+        ])
+        for status in active + waiting + stopped:
+            if status["gid"] in self.entries:
+                self.statuses[status["gid"]] = status
+        self.speed = int(stat.get("downloadSpeed") or 0)
+        return stat
+
+    def wait(self):
+        """Follow the downloads until none is left; returns False if cancelled, raises on errors"""
+        while True:
+            if self.cancel_check():
+                for gid in self.entries:
+                    if self.statuses.get(gid, {}).get("status") != "complete":
+                        try:
+                            self.rpc.force_remove(gid)
+                        except Aria2RPCError:
+                            pass
+                return False
+            self._follow_scheduler()
+            stat = self.poll()
+            self.callback(self)
+            pending = int(stat.get("numActive") or 0) + int(stat.get("numWaiting") or 0)
+            if not pending and len(self.statuses) >= len(self.entries):
+                break
+            time.sleep(self.poll_interval)
+        if self.errors:
+            raise Aria2RPCError(f"{len(self.errors)} downloads failed: {', '.join(self.errors[:3])}")
+        return True
+
+    def _follow_scheduler(self):
+        if self.scheduler is None:
+            return
+        # Only follow changes, so a set_rate() made by hand sticks until the scheduler moves
+        rate = int(self.scheduler.global_bucket.rate or 0)
+        if rate != self._scheduler_rate:
+            self._scheduler_rate = rate
+            self.set_rate(rate)
@@ -0,0 +1,440 @@
+"""
+Flames NT asyncio download engine ⚡
+Hundreds of concurrent transfers on one event loop, bounded per host and globally
+"""
+
+import asyncio
+import os
+import ssl
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urljoin, urlsplit
+
+import planner
+from bandwidth import PAYLOAD, get_scheduler
+from hashstream import IntegrityError, StreamHasher
+from segdownloader import (DownloadCancelled, finish_part, from_store, open_part, plan_segments,
+                           resume_hash, reuse_finished, sync_journal, to_store)
+from writepath import MAX_CHUNK, AdaptiveBuffer, ProgressThrottle, open_for_write, pwrite_all
+
+
+class HTTPError(RuntimeError):
+    pass
+
+
+class _Response:
+    """One HTTP/1.1 response; the body is read with read() and the slot freed with release()"""
+
+    def __init__(self, engine, key, reader, writer, status, headers, method):
+        self.engine = engine
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self.status = status
+        self.headers = headers
+        self.chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        self.remaining = None
+        if method == "HEAD" or status in (204, 304):
+            self.remaining = 0
+        elif not self.chunked and "content-length" in headers:
+            self.remaining = int(headers["content-length"])
+        self._chunk_left = 0
+        self._done = self.remaining == 0
+        self._released = False
+
+    async def read(self, n):
+        """Up to n body bytes, b'' once the body is complete"""
+        if self._done:
+            return b""
+        timeout = self.engine.timeout
+        if self.chunked:
+            if self._chunk_left == 0:
+                line = await asyncio.wait_for(self.reader.readline(), timeout)
+                self._chunk_left = int(line.split(b";")[0].strip() or b"0", 16)
+                if self._chunk_left == 0:
+                    # Trailers end with a blank line
+                    while (await asyncio.wait_for(self.reader.readline(), timeout)).strip():
+                        pass
+                    self._done = True
+                    return b""
+            data = await asyncio.wait_for(self.reader.read(min(n, self._chunk_left)), timeout)
+            if not data:
+                raise HTTPError("Connection closed mid-chunk")
+            self._chunk_left -= len(data)
+            if self._chunk_left == 0:
+                await asyncio.wait_for(self.reader.readexactly(2), timeout)
+            return data
+
+        if self.remaining is not None:
+            n = min(n, self.remaining)
+        data = await asyncio.wait_for(self.reader.read(n), timeout)
+        if self.remaining is not None:
+            if not data:
+                raise HTTPError("Connection closed before end of body")
+            self.remaining -= len(data)
+            self._done = self.remaining == 0
+        elif not data:
+            self._done = True
+        return data
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        reusable = self._done and (self.remaining is not None or self.chunked)
+        reusable = reusable and self.headers.get("connection", "").lower() != "close"
+        if reusable:
+            self.engine._idle[self.key].append((self.reader, self.writer))
+        else:
+            self.writer.close()
+        self.engine._release_slot(self.key[1])
+
+
+class AsyncDownloadEngine:
+    def __init__(self, max_connections=128, per_host=16, connections_per_file=4,
+                 min_segment_size=16 * 1024 * 1024, chunk_size=256 * 1024, max_chunk_size=MAX_CHUNK,
+                 retries=3, timeout=30, checkpoint_bytes=16 * 1024 * 1024,
+                 scheduler=None, priority=PAYLOAD, job=None,
+                 status_callback=None, progress_callback=None, cancel_check=None, file_callback=None):
+        self.max_connections = max_connections
+        self.per_host = per_host
+        self.connections_per_file = max(1, connections_per_file)
+        self.min_segment_size = min_segment_size
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.retries = retries
+        self.timeout = timeout
+        self.checkpoint_bytes = checkpoint_bytes
+        self.scheduler = scheduler or get_scheduler()
+        self.priority = priority
+        self.job = job
+        self.update_status = status_callback or (lambda msg: None)
+        self.progress_callback = progress_callback
+        self._progress = ProgressThrottle(progress_callback)
+        self.cancel_check = cancel_check or (lambda: False)
+        # Called with (entry, path) as each file lands, so post-processing can start early
+        self.file_callback = file_callback or (lambda entry, path: None)
+
+        self.downloaded = 0
+        self.total = 0
+        self.started_at = None
+
+        self.loop = None
+        self._thread = None
+        self._ssl = ssl.create_default_context()
+        self._idle = defaultdict(list)
+        self._global_slots = None
+        self._host_slots = {}
+
+    # -- loop lifecycle ---------------------------------------------------
+
+    def start(self):
+        """Run the event loop in a daemon worker thread"""
+        if self.loop is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self._global_slots = asyncio.Semaphore(self.max_connections)
+            ready.set()
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="FlamesAsyncEngine", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def close(self):
+        if self.loop is None:
+            return
+
+        async def drain():
+            for conns in self._idle.values():
+                for _, writer in conns:
+                    writer.close()
+            self._idle.clear()
+
+        asyncio.run_coroutine_threadsafe(drain(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop = None
+
+    def download_files(self, files, dest_dir, store=None):
+        """Blocking entry point usable from any thread"""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._download_all(files, dest_dir, store), self.loop)
+        return future.result()
+
+    def throughput(self):
+        if not self.started_at:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return self.downloaded / elapsed if elapsed > 0 else 0.0
+
+    # -- job level --------------------------------------------------------
+
+    async def _download_all(self, files, dest_dir, store):
+        os.makedirs(dest_dir, exist_ok=True)
+        # Tasks queue for connection slots in plan order: largest first, big files split wider
+        plan = planner.plan(files, min(self.max_connections, self.per_host),
+                            max_per_file=self.connections_per_file, min_segment_size=self.min_segment_size)
+        self.total += sum(f.get("size") or 0 for f in plan.order)
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+        tasks = [
+            asyncio.ensure_future(self._download_entry(f, os.path.join(dest_dir, f["name"]), store))
+            for f in plan.order
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        await self._disk(planner.link_duplicates, plan.duplicates, dest_dir)
+        for entry, _ in plan.duplicates:
+            self.file_callback(entry, os.path.join(dest_dir, entry["name"]))
+        return [os.path.join(dest_dir, f["name"]) for f in files]
+
+    async def _download_entry(self, entry, dest, store):
+        stored = await self._disk(from_store, store, entry, dest)
+        if stored is not None:
+            self._advance(stored)
+            self.file_callback(entry, dest)
+            return dest
+
+        for attempt in range(2):
+            try:
+                await self.download_file(entry["url"], dest, entry.get("size"), entry.get("sha1"), entry.get("sha256"),
+                                         entry.get("connections"))
+                break
+            except IntegrityError:
+                # Only this file is fetched again; the rest of the set carries on
+                if attempt:
+                    raise
+                self.update_status(f"Checksum mismatch on {entry['name']}, re-downloading... 🔁")
+                self.downloaded -= entry.get("size") or 0
+        await self._disk(to_store, store, entry, dest)
+        self.file_callback(entry, dest)
+        return dest
+
+    async def download_file(self, url, dest, size=None, sha1=None, sha256=None, connections=None):
+        """Download one URL to dest, resuming any journaled .part left behind"""
+        if await self._disk(reuse_finished, dest, size, sha1, sha256):
+            self._advance(size)
+            return dest
+        part = dest + ".part"
+        hasher = StreamHasher(part, sha1, sha256)
+
+        final_url, length, ranges = await self._probe(url)
+        if length and not size:
+            self.total += length
+        size = length or size or 0
+
+        journal = await self._disk(open_part, part, size if ranges else 0, url)
+        if journal is None:
+            await self._fetch_range(final_url, part, 0, None, None, hasher)
+            return await self._disk(finish_part, hasher, part, dest)
+        if journal.done:
+            self.update_status(f"Resuming {os.path.basename(dest)} 🔁")
+            self._advance(journal.completed_bytes())
+            await self._disk(resume_hash, hasher, journal)
+
+        # Hashed files stream in order so the digest never needs a second pass,
+        # unless the planner gave them extra connections
+        lanes = connections or (1 if hasher else self.connections_per_file)
+        segments = plan_segments(journal.missing(), lanes, self.min_segment_size)
+        await asyncio.gather(*(self._fetch_range(final_url, part, s, e, journal, hasher) for s, e in segments))
+        return await self._disk(finish_part, hasher, part, dest, size, journal)
+
+    async def _disk(self, func, *args):
+        """Run blocking file work (fsync, fallocate, hashing, links) off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    # -- transfers --------------------------------------------------------
+
+    async def _probe(self, url):
+        response = await self._request(url, {"Range": "bytes=0-0"})
+        try:
+            final_url = response.url
+            if response.status == 206:
+                size = response.headers.get("content-range", "").rsplit("/", 1)[-1]
+                return final_url, int(size) if size.isdigit() else 0, True
+            return final_url, int(response.headers.get("content-length", 0)), False
+        finally:
+            # Drain the one-byte 206 body to reuse the socket, but never a full 200 body
+            if response.status == 206:
+                while await response.read(self.chunk_size):
+                    pass
+            else:
+                response.headers["connection"] = "close"
+            response.release()
+
+    async def _fetch_range(self, url, part, start, end, journal, hasher=None):
+        offset = start
+        attempt = 0
+        while True:
+            if end is not None and offset > end:
+                return
+            headers = {}
+            if end is not None:
+                headers["Range"] = f"bytes={offset}-{end}"
+            elif offset:
+                headers["Range"] = f"bytes={offset}-"
+            try:
+                with self.scheduler.active(self.priority):
+                    response = await self._request(url, headers)
+                    try:
+                        if offset and response.status != 206:
+                            raise HTTPError(f"Server ignored Range request for {url}")
+                        offset = await self._stream_to_file(response, part, offset, end, journal, hasher)
+                    finally:
+                        response.release()
+                if end is None or offset > end:
+                    return
+                raise HTTPError(f"Connection closed early at byte {offset}")
+            except (DownloadCancelled, asyncio.CancelledError):
+                raise
+            except Exception:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                await asyncio.sleep(min(2 ** attempt, 10))
+
+    async def _stream_to_file(self, response, part, offset, end, journal, hasher):
+        checkpoint = offset
+        # Socket reads are coalesced so the file sees few large positional writes
+        buf = AdaptiveBuffer(self.chunk_size, self.max_chunk_size)
+        fd = await self._disk(open_for_write, part)
+        try:
+            while True:
+                if self.cancel_check():
+                    raise DownloadCancelled("Download cancelled")
+                data = await buf.fill_async(response.read, None if end is None else end - offset + 1)
+                if not data:
+                    break
+                # The buffer isn't refilled until the write (and hash) is done with it
+                await self._disk(self._write, fd, data, offset, hasher)
+                offset += len(data)
+                self._advance(len(data))
+                await self.scheduler.throttle_async(len(data), self.priority, self.job)
+                if journal and offset - checkpoint >= self.checkpoint_bytes:
+                    await self._disk(sync_journal, fd, journal, checkpoint, offset)
+                    checkpoint = offset
+        finally:
+            # Whatever made it into the file is good, even on failure; the executor job
+            # runs to the end even if this task is cancelled while waiting for it
+            await self._disk(self._close_part, fd, journal, checkpoint, offset)
+        return offset
+
+    @staticmethod
+    def _write(fd, data, offset, hasher):
+        pwrite_all(fd, data, offset)
+        if hasher:
+            hasher.feed(offset, data)
+
+    @staticmethod
+    def _close_part(fd, journal, start, offset):
+        try:
+            if journal:
+                sync_journal(fd, journal, start, offset)
+        finally:
+            os.close(fd)
+
+    # -- HTTP plumbing ----------------------------------------------------
+
+    async def _request(self, url, headers, method="GET", redirects=5):
+        """Send a request and return the response headers, following redirects"""
+        for _ in range(redirects + 1):
+            parts = urlsplit(url)
+            https = parts.scheme == "https"
+            host = parts.hostname
+            port = parts.port or (443 if https else 80)
+            key = (parts.scheme, host, port)
+            target = parts.path or "/"
+            if parts.query:
+                target += "?" + parts.query
+
+            await self._acquire_slot(host)
+            try:
+                response = await self._send(key, method, target, parts.netloc, headers)
+            except BaseException:
+                self._release_slot(host)
+                raise
+            response.url = url
+
+            if response.status in (301, 302, 303, 307, 308) and "location" in response.headers:
+                location = urljoin(url, response.headers["location"])
+                response.headers["connection"] = "close"
+                response.release()
+                url = location
+                continue
+            if response.status >= 400:
+                response.headers["connection"] = "close"
+                response.release()
+                raise HTTPError(f"HTTP {response.status} for {url}")
+            return response
+        raise HTTPError(f"Too many redirects for {url}")
+
+    async def _send(self, key, method, target, netloc, headers):
+        scheme, host, port = key
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {netloc}",
+                 "User-Agent: FlamesNT-ISO-Installer", "Accept-Encoding: identity",
+                 "Connection: keep-alive"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        # A pooled keep-alive socket may have been closed by the server; retry once fresh
+        for attempt in range(2):
+            conn = self._idle[key].pop() if attempt == 0 and self._idle[key] else None
+            if conn is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port, ssl=self._ssl if scheme == "https" else None,
+                                            limit=self.chunk_size * 2),
+                    self.timeout
+                )
+            else:
+                reader, writer = conn
+            try:
+                writer.write(payload)
+                await writer.drain()
+                status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+                if not status_line:
+                    raise ConnectionResetError("Empty response")
+                status = int(status_line.split()[1])
+                response_headers = {}
+                while True:
+                    line = await asyncio.wait_for(reader.readline(), self.timeout)
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    response_headers[name.strip().lower()] = value.strip()
+                return _Response(self, key, reader, writer, status, response_headers, method)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if conn is None:
+                    raise
+        raise HTTPError("Unreachable")
+
+    async def _acquire_slot(self, host):
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        await self._global_slots.acquire()
+        try:
+            await self._host_slots[host].acquire()
+        except BaseException:
+            self._global_slots.release()
+            raise
+
+    def _release_slot(self, host):
+        self._host_slots[host].release()
+        self._global_slots.release()
+
+    def _advance(self, n):
+        self.downloaded += n
+        self._progress(self.downloaded, self.total)
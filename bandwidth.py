@@ -0,0 +1,126 @@
+"""
+Flames NT bandwidth scheduler 🚦
+Token-bucket rate limits plus priority classes shared by every transfer
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Priority classes, most important first
+METADATA = 0
+TOOLS = 1
+PAYLOAD = 2
+PREFETCH = 3
+
+
+def parse_rate(value):
+    """'20M' / '512K' / '1000000' -> bytes per second (None means unlimited)"""
+    if value in (None, "", "0", 0):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = value.strip().upper()
+    if value.endswith("/S"):
+        value = value[:-2]
+    if value.endswith("B"):
+        value = value[:-1]
+    scale = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}.get(value[-1:], 1)
+    if value[-1:] in "KMG":
+        value = value[:-1]
+    return float(value) * scale
+
+
+class TokenBucket:
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.burst = burst or rate or 0
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, n):
+        """Take n tokens, going into debt if needed; returns how long to wait for them"""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= n
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class BandwidthScheduler:
+    def __init__(self, global_rate=None, job_rate=None, backoff_factor=4, yield_delay=0.02):
+        self.global_bucket = TokenBucket(global_rate)
+        self.job_rate = job_rate
+        self.job_buckets = {}
+        # While a higher class is active, lower classes pay backoff_factor tokens per
+        # byte (or sleep yield_delay per chunk when no global rate is configured)
+        self.backoff_factor = backoff_factor
+        self.yield_delay = yield_delay
+        self._active = [0, 0, 0, 0]
+        self._lock = threading.Lock()
+
+    def set_rates(self, global_rate=None, job_rate=None):
+        self.global_bucket = TokenBucket(global_rate)
+        self.job_rate = job_rate
+        with self._lock:
+            self.job_buckets.clear()
+
+    @contextmanager
+    def active(self, priority):
+        """Mark a transfer of this class as in flight for its whole duration"""
+        with self._lock:
+            self._active[priority] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[priority] -= 1
+
+    def reserve(self, n, priority=PAYLOAD, job=None):
+        """Account n bytes and return the delay (seconds) the caller should wait"""
+        with self._lock:
+            busy_above = any(self._active[:priority])
+            bucket = None
+            if job is not None and self.job_rate:
+                bucket = self.job_buckets.get(job)
+                if bucket is None:
+                    bucket = self.job_buckets[job] = TokenBucket(self.job_rate)
+
+        delay = self.global_bucket.reserve(n * self.backoff_factor if busy_above else n)
+        if bucket:
+            delay = max(delay, bucket.reserve(n))
+        if busy_above and not self.global_bucket.rate:
+            delay = max(delay, self.yield_delay)
+        return delay
+
+    def throttle(self, n, priority=PAYLOAD, job=None):
+        delay = self.reserve(n, priority, job)
+        if delay:
+            time.sleep(delay)
+
+    async def throttle_async(self, n, priority=PAYLOAD, job=None):
+        delay = self.reserve(n, priority, job)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+_scheduler = None
+_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler; FLAMESNT_RATE_LIMIT / FLAMESNT_JOB_RATE_LIMIT set the rates"""
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            _scheduler = BandwidthScheduler(
+                parse_rate(os.environ.get("FLAMESNT_RATE_LIMIT")),
+                parse_rate(os.environ.get("FLAMESNT_JOB_RATE_LIMIT"))
+            )
+        return _scheduler
@@ -0,0 +1,176 @@
+"""
+Flames NT batch builds 🗂️
+Queues a build x edition matrix, downloads every shared payload once and builds the images side by side
+"""
+
+import hashlib
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import converter
+import uupdump
+from asyncengine import AsyncDownloadEngine
+from bandwidth import PAYLOAD
+from buildcache import BuildCache, build_key, manifest_hash, reproducible_timestamp
+from flamespaths import data_dir, job_dir
+from isowriter import create_iso
+from payloadstore import PayloadStore
+
+
+def content_key(entry):
+    """Identity of a payload across builds and editions (published hash, else its URL)"""
+    for field in ("sha1", "sha256"):
+        if entry.get(field):
+            return f"{field}-{entry[field].lower()}"
+    return "url-" + hashlib.sha1(entry["url"].split("?")[0].encode("utf-8")).hexdigest()
+
+
+class BatchRunner:
+    """Runs queued (build_info, edition) jobs with one shared download phase
+
+    Jobs whose exact input set was imaged before come straight from the
+    build cache. For the rest, every distinct payload is fetched once into a
+    shared pool (and the payload store) and linked into each job's files/
+    directory. The pool is then cleared, and up to `max_images` jobs are
+    converted to media and imaged concurrently.
+    """
+
+    def __init__(self, max_images=2, store=None, pool_dir=None, engine_options=None, build_cache=None,
+                 status_callback=None, progress_callback=None, cancel_check=None, converter_path=None):
+        self.max_images = max(1, max_images)
+        self.converter_path = converter_path or converter.find_converter()
+        self.store = store or PayloadStore()
+        self.build_cache = build_cache or BuildCache()
+        self.pool_dir = pool_dir or os.path.join(data_dir(), "batch-pool")
+        self.engine_options = dict(engine_options or {})
+        self.update_status = status_callback or (lambda msg: None)
+        self.update_progress = progress_callback or (lambda pct: None)
+        self.cancel_check = cancel_check or (lambda: False)
+        self.jobs = []
+        self.downloaded = 0
+        self.shared_bytes = 0
+
+    def add(self, build_info, edition):
+        job = {"build_info": build_info, "edition": edition, "files": None,
+               "dir": job_dir(build_info['id'], edition), "iso": None, "error": None, "cached": False}
+        self.jobs.append(job)
+        return job
+
+    def run(self):
+        """Fetch lists, download the union once, link, then build images; returns the jobs"""
+        if not self.jobs:
+            return self.jobs
+
+        self.update_status(f"Fetching {len(self.jobs)} file lists... 📡")
+        with ThreadPoolExecutor(max_workers=min(4, len(self.jobs))) as pool:
+            lists = pool.map(lambda j: uupdump.get_file_list(j["build_info"]['id'], j["edition"]), self.jobs)
+            for job, files in zip(self.jobs, lists):
+                job["files"] = files
+
+        for job in self.jobs:
+            job["key"] = build_key(job["build_info"]['id'], job["edition"], manifest_hash(job["files"]))
+            job["iso"] = self.build_cache.link_out(job["key"], self._iso_path(job))
+            job["cached"] = job["iso"] is not None
+        pending = [job for job in self.jobs if not job["cached"]]
+        if len(pending) < len(self.jobs):
+            self.update_status(f"{len(self.jobs) - len(pending)} images unchanged, taken from the build cache ⚡")
+        if not pending:
+            self.update_progress(100)
+            return self.jobs
+        if not converter.find_script(self.converter_path):
+            # Nothing could turn the payloads into media; don't download them
+            raise Exception(f"No UUP converter found in {self.converter_path}; install one there "
+                            "or point FLAMESNT_CONVERTER at it")
+
+        union = {}
+        requested = 0
+        for job in pending:
+            for entry in job["files"]:
+                requested += entry.get("size") or 0
+                union.setdefault(content_key(entry), entry)
+        unique = [dict(entry, name=key) for key, entry in union.items()]
+        self.shared_bytes = requested - sum(e.get("size") or 0 for e in unique)
+        self.update_status(
+            f"Downloading {len(unique)} unique payloads for {len(pending)} images "
+            f"({self.shared_bytes / 2**30:.1f} GiB shared, fetched once) ☕"
+        )
+
+        options = dict(max_connections=128, per_host=32, priority=PAYLOAD, job="batch")
+        options.update(self.engine_options)
+        engine = AsyncDownloadEngine(
+            status_callback=self.update_status,
+            progress_callback=lambda done, total: self.update_progress((done / total) * 80) if total else None,
+            cancel_check=self.cancel_check,
+            **options
+        )
+        try:
+            engine.download_files(unique, self.pool_dir, store=self.store)
+        finally:
+            engine.close()
+        self.downloaded = engine.downloaded
+        if self.cancel_check():
+            return self.jobs
+
+        for job in pending:
+            self._link_job(job)
+        # Every payload now lives in the store or a job's files/; the pool only held them in between
+        shutil.rmtree(self.pool_dir, ignore_errors=True)
+
+        self.update_status(f"Writing {len(pending)} images, {self.max_images} at a time... 💿")
+        finished = []
+        with ThreadPoolExecutor(max_workers=self.max_images) as pool:
+            futures = [pool.submit(self._build_image, job) for job in pending]
+            for job, future in zip(pending, futures):
+                try:
+                    job["iso"] = future.result()
+                except Exception as e:
+                    job["error"] = str(e)
+                finished.append(job)
+                self.update_progress(80 + 20 * len(finished) / len(pending))
+        return self.jobs
+
+    def _link_job(self, job):
+        """Give the job its own files/ view of the shared payloads (hardlinks, no copies)"""
+        files_dir = os.path.join(job["dir"], "files")
+        for entry in job["files"]:
+            dest = os.path.join(files_dir, entry["name"])
+            if entry.get("sha1") and self.store.has(entry["sha1"]):
+                self.store.link_into(entry["sha1"], dest)
+                continue
+            src = os.path.join(self.pool_dir, content_key(entry))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if os.path.lexists(dest):
+                os.remove(dest)
+            try:
+                os.link(src, dest)
+            except OSError:
+                shutil.copyfile(src, dest)
+
+    def _iso_path(self, job):
+        return os.path.join(job["dir"], f"Windows_{job['build_info']['build']}_{job['edition']}.iso")
+
+    def _build_media(self, job):
+        """Convert the job's files/ into media/ with the UUP converter; returns the media path"""
+        media = os.path.join(job["dir"], "media")
+        shutil.rmtree(media, ignore_errors=True)
+        errors = []
+
+        def emit(kind, text):
+            if kind == "error":
+                errors.append(text.strip())
+
+        if not converter.build_media(self.converter_path, os.path.join(job["dir"], "files"), media,
+                                     job["edition"], emit):
+            # The raw UUP set isn't installable media; never cache an image of it
+            raise Exception(f"UUP conversion failed: {errors[0] if errors else 'no media tree'}")
+        return media
+
+    def _build_image(self, job):
+        build_info = job["build_info"]
+        media = self._build_media(job)
+        iso_path = self._iso_path(job)
+        create_iso(media, iso_path, volume_id=f"FLAMESNT_{build_info['build']}",
+                   timestamp=reproducible_timestamp(build_info), cancel_check=self.cancel_check)
+        self.build_cache.put(job["key"], iso_path, build=build_info['id'], edition=job["edition"])
+        return iso_path
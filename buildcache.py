@@ -0,0 +1,162 @@
+"""
+Flames NT build cache 🗃️
+Remembers finished ISOs by what went into them so an unchanged build is never imaged twice
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from flamespaths import data_dir
+
+# Part of every key: bump whenever the image writer's output for the same input changes
+CONVERTER_VERSION = "flamesnt-isowriter-1"
+
+# Image dates when neither SOURCE_DATE_EPOCH nor the build's own date is known (2000-01-01)
+DEFAULT_EPOCH = 946684800
+
+DEFAULT_MAX_BYTES = 64 * 1024 ** 3
+
+
+def manifest_hash(files):
+    """Hash of a UUP file list: names plus published hashes (or sizes when there are none)"""
+    digest = hashlib.sha256()
+    for entry in sorted(files, key=lambda e: e["name"]):
+        ident = entry.get("sha1") or entry.get("sha256") or str(entry.get("size") or 0)
+        digest.update(f"{entry['name']}\t{ident.lower()}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def tree_manifest_hash(src_dir):
+    """Hash of a source tree's paths, sizes and mtimes, for trees with no file list"""
+    digest = hashlib.sha256()
+    for folder, dirs, names in os.walk(src_dir):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(folder, name)
+            st = os.stat(path)
+            rel = os.path.relpath(path, src_dir).replace(os.sep, "/")
+            digest.update(f"{rel}\t{st.st_size}\t{st.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_key(build_id, edition, manifest, lang="en-us", converter=CONVERTER_VERSION):
+    fields = {"build": build_id, "edition": edition.lower(), "lang": lang.lower(),
+              "converter": converter, "manifest": manifest}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def reproducible_timestamp(build_info=None):
+    """One fixed date for every timestamp in an image, so equal inputs give byte-identical ISOs"""
+    if os.environ.get("SOURCE_DATE_EPOCH"):
+        return int(os.environ["SOURCE_DATE_EPOCH"])
+    if build_info and build_info.get("created"):
+        return int(build_info["created"])
+    return DEFAULT_EPOCH
+
+
+class BuildCache:
+    """ISOs stored by build key as <key>.iso + <key>.json, linked in and out rather than copied
+
+    Least recently used images are evicted once the cache holds more than
+    max_bytes (FLAMESNT_BUILD_CACHE_GB overrides the 64 GiB default).
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or os.path.join(data_dir(), "buildcache")
+        os.makedirs(self.root, exist_ok=True)
+        if max_bytes is None:
+            gb = os.environ.get("FLAMESNT_BUILD_CACHE_GB")
+            max_bytes = int(float(gb) * 1024 ** 3) if gb else DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+
+    def path_for(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.iso")
+
+    def _meta_path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def _load_meta(self, key):
+        try:
+            with open(self._meta_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key):
+        """Path of the cached ISO for key, or None (entries whose file changed are dropped)"""
+        meta = self._load_meta(key)
+        path = self.path_for(key)
+        if meta is None or not os.path.isfile(path):
+            return None
+        if os.path.getsize(path) != meta.get("size"):
+            self.remove(key)
+            return None
+        meta["used"] = time.time()
+        self._write_meta(key, meta)
+        return path
+
+    def link_out(self, key, dest):
+        """Put the cached ISO for key at dest; returns dest, or None on a miss"""
+        src = self.get(key)
+        if src is None:
+            return None
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        if os.path.lexists(dest):
+            if os.path.exists(dest) and os.path.samefile(src, dest):
+                return dest
+            os.remove(dest)
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
+        return dest
+
+    def put(self, key, iso_path, **info):
+        """Record a freshly written ISO under key (hardlinked, so it costs no space while both exist)"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(iso_path, tmp)
+        except OSError:
+            shutil.copyfile(iso_path, tmp)
+        os.replace(tmp, path)
+        now = time.time()
+        self._write_meta(key, dict(info, size=os.path.getsize(path), created=now, used=now))
+        self.evict()
+        return path
+
+    def remove(self, key):
+        for path in (self.path_for(key), self._meta_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """Drop least recently used images until the cache fits in max_bytes"""
+        entries = []
+        for folder, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".json"):
+                    key = name[:-len(".json")]
+                    meta = self._load_meta(key) or {}
+                    entries.append((meta.get("used", 0), key, meta.get("size", 0)))
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.remove(key)
+            total -= size
+
+    def _write_meta(self, key, meta):
+        path = self._meta_path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, path)
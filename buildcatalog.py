@@ -0,0 +1,145 @@
+"""
+Flames NT build catalog 📚
+Local SQLite index of UUP dump builds, synced from listid.php
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from flamespaths import data_dir
+
+# Build choices offered by the installer windows and flamesctl (resolved by FlamesEngine)
+BUILDS = [
+    "Canary Channel (Latest Insider)",
+    "Dev Channel (Weekly Builds)",
+    "Beta Channel (Monthly Updates)",
+    "Release Preview (Stable Preview)",
+    "Windows 11 24H2 (Current Stable)",
+    "Windows 11 23H2 (Previous Stable)",
+    "Windows 10 22H2 (Latest Win10)"
+]
+
+EDITIONS = ["Professional", "Home", "Enterprise", "Education"]
+
+# Ends the placeholder id FlamesEngine.get_build_info returns when no lookup succeeded
+FALLBACK_SUFFIX = "_fallback"
+
+# Ring/channel tags we know how to look for in build titles, most specific first
+RING_TOKENS = ("Canary", "Dev", "Beta", "Production", "WIF", "WIS", "RETAIL", "RP")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    uuid TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    build TEXT,
+    build_major INTEGER,
+    build_minor INTEGER,
+    ring TEXT,
+    arch TEXT,
+    created INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_builds_ring ON builds (ring, created DESC);
+CREATE INDEX IF NOT EXISTS idx_builds_ring_arch ON builds (ring, arch, created DESC);
+CREATE INDEX IF NOT EXISTS idx_builds_number ON builds (build_major, ring, created DESC);
+CREATE INDEX IF NOT EXISTS idx_builds_created ON builds (created DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def is_fallback(build_info):
+    """True for a placeholder build_info from a failed lookup; UUP dump knows no such id"""
+    return not build_info or str(build_info.get("id", "")).endswith(FALLBACK_SUFFIX)
+
+
+def classify_ring(title):
+    """Pick the ring/channel tag out of a build title ('' when none matches)"""
+    for token in RING_TOKENS:
+        if re.search(rf"\b{token}\b", title or ""):
+            return token
+    return ""
+
+
+def split_build(build):
+    """'26100.1742' -> (26100, 1742)"""
+    parts = re.findall(r"\d+", str(build or ""))
+    major = int(parts[0]) if parts else None
+    minor = int(parts[1]) if len(parts) > 1 else 0
+    return major, minor
+
+
+class BuildCatalog:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), "catalog.sqlite3")
+        self._local = threading.local()
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections can't be shared
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def sync(self, builds):
+        """Add builds from a listid.php 'builds' object (dict or list) not seen before"""
+        if isinstance(builds, dict):
+            items = [(data.get("uuid") or key, data) for key, data in builds.items()]
+        else:
+            items = [(data.get("uuid"), data) for data in builds or []]
+
+        db = self._connect()
+        known = {row[0] for row in db.execute("SELECT uuid FROM builds")}
+        rows = []
+        for uuid, data in items:
+            if not uuid or uuid in known:
+                continue
+            title = data.get("title", "")
+            major, minor = split_build(data.get("build"))
+            rows.append((
+                uuid, title, data.get("build"), major, minor,
+                classify_ring(title), data.get("arch"), int(data.get("created") or 0)
+            ))
+
+        with db:
+            db.executemany(
+                "INSERT OR IGNORE INTO builds "
+                "(uuid, title, build, build_major, build_minor, ring, arch, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('synced_at', ?)",
+                       (str(int(time.time())),))
+        return len(rows)
+
+    def latest(self, ring, search=None, arch=None):
+        """Newest build for a ring, optionally narrowed by build number/search term and arch"""
+        sql = "SELECT uuid, title, build, created FROM builds WHERE ring = ?"
+        args = [ring]
+        if arch:
+            sql += " AND arch = ?"
+            args.append(arch)
+        if search and str(search).isdigit():
+            sql += " AND build_major = ?"
+            args.append(int(search))
+        elif search and search != "latest":
+            sql += " AND title LIKE ?"
+            args.append(f"%{search}%")
+        sql += " ORDER BY created DESC, build_major DESC, build_minor DESC LIMIT 1"
+
+        row = self._connect().execute(sql, args).fetchone()
+        if row is None:
+            return None
+        return {"id": row["uuid"], "title": row["title"], "build": row["build"], "created": row["created"]}
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM builds").fetchone()[0]
@@ -0,0 +1,294 @@
+"""
+Flames NT UUP converter runner 🧰
+Finds and runs a UUP converter script with no window attached
+"""
+
+import codecs
+import locale
+import os
+import shutil
+import subprocess
+import threading
+import traceback
+
+from outputwatch import OutputWatcher
+
+SCRIPTS = [
+    "convert-UUP.cmd",
+    "uup-converter-wimlib.cmd",
+    "convert.cmd",
+    "ConvertUUP.cmd",
+    # uup-dump's converter for Linux/macOS
+    "convert.sh"
+]
+
+# Edition names as shown to the user -> converter edition codes
+EDITION_CODES = {
+    "Professional": "Professional",
+    "Home": "Core",
+    "Enterprise": "Enterprise",
+    "Education": "Education",
+    "Pro N": "ProfessionalN",
+    "Core": "Core"
+}
+
+
+# Converter output is read in chunks of this size and handed on in batches no larger
+# than OUTPUT_BATCH_CHARS and no older than OUTPUT_BATCH_SECONDS
+OUTPUT_CHUNK = 64 * 1024
+OUTPUT_BATCH_CHARS = 64 * 1024
+OUTPUT_BATCH_SECONDS = 0.1
+
+
+def pump_output(stream, emit, encoding=None, chunk_size=OUTPUT_CHUNK,
+                max_chars=OUTPUT_BATCH_CHARS, interval=OUTPUT_BATCH_SECONDS):
+    """Read a binary stream until EOF, decoding incrementally, and emit(text) in batches
+
+    A reader thread only reads and decodes; this thread wakes when a batch
+    is full or interval has passed, so however fast the converter writes,
+    the consumer sees at most a few batches per interval.
+    """
+    decoder = codecs.getincrementaldecoder(encoding or locale.getpreferredencoding(False))(errors="replace")
+    read = getattr(stream, "read1", stream.read)
+    cond = threading.Condition()
+    pending = []
+    state = {"size": 0, "done": False}
+
+    def reader():
+        try:
+            while True:
+                chunk = read(chunk_size)
+                text = decoder.decode(chunk, final=not chunk)
+                with cond:
+                    if text:
+                        pending.append(text)
+                        state["size"] += len(text)
+                    if not chunk:
+                        state["done"] = True
+                    if state["done"] or state["size"] >= max_chars:
+                        cond.notify()
+                if not chunk:
+                    return
+        except (OSError, ValueError):
+            with cond:
+                state["done"] = True
+                cond.notify()
+
+    thread = threading.Thread(target=reader, name="converter-output", daemon=True)
+    thread.start()
+    carry = ""
+    while True:
+        with cond:
+            cond.wait_for(lambda: state["done"] or state["size"] >= max_chars, timeout=interval)
+            batch = carry + "".join(pending)
+            pending.clear()
+            state["size"] = 0
+            finished = state["done"]
+        # Same newlines text mode would give; a lone trailing \r may be half of a \r\n
+        carry = batch[-1:] if batch.endswith("\r") and not finished else ""
+        batch = batch[:len(batch) - len(carry)].replace("\r\n", "\n")
+        if batch:
+            emit(batch)
+        if finished:
+            break
+    thread.join()
+
+
+def find_converter():
+    """Try to find UUP converter: FLAMESNT_CONVERTER, then common locations"""
+    override = os.environ.get("FLAMESNT_CONVERTER")
+    if override:
+        return override
+    possible_paths = [
+        r"C:\UUP-Converter",
+        r"C:\UUPtoISO",
+        r"C:\Tools\UUP-Converter",
+        os.path.join(os.getcwd(), "UUP-Converter"),
+        os.path.join(os.getcwd(), "uup-converter-wimlib")
+    ]
+
+    for path in possible_paths:
+        # Check for the actual converter script
+        if os.path.exists(path) and find_script(path):
+            return path
+
+    return r"C:\UUP-Converter"  # Default fallback
+
+
+def find_script(converter_path):
+    """First converter script in converter_path that runs on this OS, or None"""
+    for script in SCRIPTS:
+        if script.endswith(".sh") == (os.name == "nt"):
+            continue
+        script_path = os.path.join(converter_path, script)
+        if os.path.exists(script_path):
+            return script_path
+    return None
+
+
+def _command(converter_script, converter_path, uup_path, edition_code, work_dir):
+    """(cmd, working directory, shell) to run one converter script"""
+    if converter_script.endswith(".sh"):
+        # convert.sh <compression> <UUP directory> <virtual editions>; output lands in the cwd
+        return ["sh", converter_script, "wim", uup_path, "0"], work_dir, False
+    if "wimlib" in converter_script.lower():
+        # uup-converter-wimlib style
+        # Set working directory to UUP files path for this converter
+        return ["cmd", "/c", converter_script, edition_code], uup_path, True
+    # Standard convert-UUP.cmd style
+    # This converter expects to be run from its own directory
+    return ["cmd", "/c", converter_script], converter_path, True
+
+
+def _run_script(cmd, working_dir, shell, env, emit, on_start):
+    """Run a converter with its output pumped into emit; returns the exit code"""
+    emit("info", f"Working Directory: {working_dir}\n")
+    emit("info", f"Command: {' '.join(cmd)}\n\n")
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=working_dir,
+        env=env,
+        shell=shell
+    )
+    if on_start:
+        on_start(process)
+
+    # Binary chunks in, batched text out: the log never throttles the converter
+    pump_output(process.stdout, lambda text: emit("output", text))
+
+    return process.wait()
+
+
+def _report_failure(emit, returncode):
+    emit("error", f"\n💔 Oh dear, the UUP conversion failed!\nError code: {returncode}\n")
+    emit("error", "Common issues:\n")
+    emit("error", "- Missing Windows ADK/DISM\n")
+    emit("error", "- Insufficient disk space\n")
+    emit("error", "- Corrupted UUP files\n")
+    emit("error", "- Wrong edition selected\n")
+
+
+def run_conversion(converter_path, uup_path, iso_dir, build_version, edition, emit, on_start=None):
+    """Run the converter, reporting through emit(kind, text); returns the ISO path if one was found
+
+    kind is "info", "output", "success" or "error"; "output" text arrives in
+    batches of many lines. on_start(process) is called once the converter is
+    running so callers can stop it.
+    """
+    try:
+        converter_script = find_script(converter_path)
+        if not converter_script:
+            emit("error", f"\n❌ No converter script found in {converter_path}\n")
+            return None
+
+        # Build ISO filename
+        iso_filename = f"FlamesOS_{build_version}_{edition.replace(' ', '_')}.iso"
+        edition_code = EDITION_CODES.get(edition, "Professional")
+
+        # Different converters use different arguments
+        cmd, working_dir, shell = _command(converter_script, converter_path, uup_path, edition_code, iso_dir)
+
+        # Log command
+        emit("info", f"Converter: {os.path.basename(converter_script)}\n")
+        emit("info", f"Edition: {edition_code}\n")
+
+        # Create environment with proper paths
+        env = os.environ.copy()
+        env["UUP_PATH"] = uup_path
+        env["ISO_PATH"] = iso_dir
+        env["ISO_NAME"] = iso_filename
+
+        # Watch for the image before the converter starts, so we learn its path
+        # the moment it's closed instead of walking the whole UUP tree afterwards.
+        # Converters write it to ISO_PATH or their working directory, never deeper
+        outputs = sorted({os.path.abspath(iso_dir), os.path.abspath(working_dir)})
+        watcher = OutputWatcher(outputs, recursive=False).start()
+        for error in watcher.errors:
+            emit("info", f"⚠️ Can't watch {error.filename} ({error.strerror}), rescanning it afterwards\n")
+
+        # Run conversion
+        try:
+            returncode = _run_script(cmd, working_dir, shell, env, emit, on_start)
+        finally:
+            produced = watcher.stop()
+
+        if returncode != 0:
+            _report_failure(emit, returncode)
+            return None
+
+        if produced:
+            # Newest image closed during the run; older ISOs lying around are never picked
+            iso_path = produced[-1]
+            final_path = os.path.join(iso_dir, iso_filename)
+            if os.path.abspath(iso_path) == os.path.abspath(final_path):
+                emit("success", f"\n✅ Conversion completed successfully!\nISO saved to: {final_path}\n")
+                return final_path
+            try:
+                # Move to output directory
+                os.rename(iso_path, final_path)
+                emit("success", f"\n✅ Conversion completed successfully!\nISO saved to: {final_path}\n")
+                return final_path
+            except OSError:
+                emit("success", f"\n✅ Conversion completed!\nISO created at: {iso_path}\n")
+                return iso_path
+
+        emit("success", "\n✅ Conversion completed! Check the converter output for ISO location.\n")
+        return None
+
+    except Exception as e:
+        emit("error", f"\n❌ Error: {str(e)}\n")
+        emit("error", f"Traceback:\n{traceback.format_exc()}\n")
+        return None
+
+
+def build_media(converter_path, uup_path, media_dir, edition, emit, on_start=None, expanded_path=None):
+    """Run the converter to lay out installation media (setup.exe, sources, boot, efi) in media_dir
+
+    Reports through emit(kind, text) like run_conversion; returns media_dir,
+    or None when the converter failed or left no media tree. Converters are
+    told where the tree goes through MEDIA_PATH; one that ignores it leaves
+    its ISOFOLDER working tree behind (convert-UUP.cmd with SkipISO=1 in
+    ConvertConfig.ini), which is moved into place. expanded_path, when
+    given, holds the payload archives already unpacked (one directory per
+    archive) and is passed on as EXPANDED_PATH.
+    """
+    try:
+        converter_script = find_script(converter_path)
+        if not converter_script:
+            emit("error", f"\n❌ No converter script found in {converter_path}\n")
+            return None
+
+        edition_code = EDITION_CODES.get(edition, "Professional")
+        cmd, working_dir, shell = _command(converter_script, converter_path, uup_path, edition_code,
+                                           os.path.dirname(media_dir))
+        emit("info", f"Converter: {os.path.basename(converter_script)}\n")
+        emit("info", f"Edition: {edition_code}\n")
+
+        env = os.environ.copy()
+        env["UUP_PATH"] = uup_path
+        env["MEDIA_PATH"] = media_dir
+        if expanded_path:
+            env["EXPANDED_PATH"] = expanded_path
+
+        returncode = _run_script(cmd, working_dir, shell, env, emit, on_start)
+        if returncode != 0:
+            _report_failure(emit, returncode)
+            return None
+
+        leftover = os.path.join(working_dir, "ISOFOLDER")
+        if not os.path.isdir(media_dir) and os.path.isdir(leftover):
+            shutil.move(leftover, media_dir)
+        if not os.path.isdir(media_dir) or not os.listdir(media_dir):
+            emit("error", f"\n❌ The converter finished without a media tree in {media_dir} "
+                          "(convert-UUP.cmd needs SkipISO=1 in ConvertConfig.ini)\n")
+            return None
+
+        emit("success", f"\n✅ Installation media ready in {media_dir}\n")
+        return media_dir
+
+    except Exception as e:
+        emit("error", f"\n❌ Error: {str(e)}\n")
+        emit("error", f"Traceback:\n{traceback.format_exc()}\n")
+        return None
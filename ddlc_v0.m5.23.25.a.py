@@ -1,13 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import requests
 import os
 import subprocess
-import tempfile
 import shutil
 import time
 
+from jobstate import MOUNTED
+
 class FlamesISOInstaller:
     def __init__(self, root):
         self.root = root
@@ -19,6 +19,8 @@ class FlamesISOInstaller:
         self.progress_var = tk.DoubleVar()
         self.cancelled = False
         self.temp_dir = None
+        # Download, conversion and imaging happen in an engine, created on first use
+        self._engine = None
 
         # Header
         tk.Label(root, text="Flames NT ISO Installer 🔥", font=("Segoe UI", 18, "bold"), bg="#ffb3d9", fg="#8b0051").pack(pady=10)
@@ -66,8 +68,19 @@ class FlamesISOInstaller:
         self.cancelled = False
         threading.Thread(target=self.download_and_install, daemon=True).start()
 
+    @property
+    def engine(self):
+        if self._engine is None:
+            from flamesengine import FlamesEngine, configure_process
+
+            configure_process()
+            self._engine = FlamesEngine(status_callback=self.update_status, progress_callback=self.update_progress)
+        return self._engine
+
     def cancel(self):
         self.cancelled = True
+        if self._engine:
+            self._engine.cancelled = True
         self.update_status("Process cancelled by user.")
 
     def update_status(self, msg):
@@ -77,34 +90,30 @@ class FlamesISOInstaller:
         self.root.after(0, lambda: self.progress_var.set(pct))
 
     def download_and_install(self):
+        succeeded = False
         try:
             build = self.build_selector.get()
             edition = self.edition_selector.get()
-            self.update_status(f"Preparing {build} - {edition}...")
-            self.update_progress(5)
-
-            self.temp_dir = tempfile.mkdtemp(prefix="FlamesISO_")
-            build_info = self.get_build_info(build)
-            if not build_info:
-                raise RuntimeError("Build info not found")
-
-            self.download_tools()
+            # Checkpointed per selection: the engine resumes at the first stage that didn't finish, and
+            # it downloads the payloads and converts them into the media the ISO is written from
+            self.engine.cancelled = False
+            iso_path = self.engine.run_job(build, edition, mount=False)
             if self.cancelled: return
-            self.update_status("Creating ISO...")
-            self.update_progress(40)
-
-            iso_path = self.create_iso(build_info, edition)
             if not iso_path or not os.path.exists(iso_path):
                 raise RuntimeError("ISO creation failed")
+            self.temp_dir = self.engine.temp_dir
+            state = self.engine.job_state
 
             self.update_progress(80)
             drive = self.mount_iso(iso_path)
             if self.cancelled: return
 
             if drive:
+                state.complete(MOUNTED, iso=iso_path, drive=drive)
                 self.install_os_from_iso(drive)
                 self.update_progress(100)
                 self.update_status("✅ Upgrade initiated. System will reboot when ready!")
+                succeeded = True
             else:
                 raise RuntimeError("ISO mount failed")
 
@@ -114,39 +123,10 @@ class FlamesISOInstaller:
         finally:
             self.start_button.config(state='normal')
             self.cancel_button.config(state='disabled')
-            if self.temp_dir and not self.cancelled:
+            # Failed or cancelled jobs keep their files so the next run resumes
+            if self.temp_dir and succeeded:
                 shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    def get_build_info(self, build_name):
-        mapping = { ... }  # same mapping as before
-        info = mapping.get(build_name)
-        if not info: return None
-        try:
-            r = requests.get("https://api.uupdump.net/listid.php", params={"search": info["build"], "sortByDate": 1}, timeout=10)
-            data = r.json()
-            # pick first matching
-            for bid, bdata in data.get('response', {}).get('builds', {}).items():
-                if info['ring'] in bdata.get('title', ''):
-                    return {'id': bid, 'title': bdata['title'], 'build': bdata.get('build', info['build'])}
-        except:
-            pass
-        return {'id': f"{info['build']}_fallback", 'title': build_name, 'build': info['build']}
-
-    def download_tools(self):
-        # simplified: ensure aria2c in tools
-        tools = os.path.join(self.temp_dir, 'tools')
-        os.makedirs(tools, exist_ok=True)
-        # download and extract aria2c as before
-        self.update_status("Tools ready.")
-        self.update_progress(30)
-
-    def create_iso(self, build_info, edition):
-        # write and run uup converter script as before
-        # for brevity, return dummy path
-        iso = os.path.join(self.temp_dir, f"Windows_{build_info['build']}_{edition}.iso")
-        open(iso, 'wb').close()
-        return iso
-
     def mount_iso(self, iso_path):
         self.update_status("Mounting ISO...")
         # mount via PowerShell
@@ -176,10 +156,8 @@ if __name__ == '__main__':
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import requests
 import os
 import subprocess
-import tempfile
 import shutil
 import time
 
@@ -194,6 +172,8 @@ class FlamesISOInstaller:
         self.progress_var = tk.DoubleVar()
         self.cancelled = False
         self.temp_dir = None
+        # Download, conversion and imaging happen in an engine, created on first use
+        self._engine = None
 
         # Header
         tk.Label(root, text="Flames NT ISO Installer 🔥", font=("Segoe UI", 18, "bold"), bg="#ffb3d9", fg="#8b0051").pack(pady=10)
@@ -241,8 +221,19 @@ class FlamesISOInstaller:
         self.cancelled = False
         threading.Thread(target=self.download_and_install, daemon=True).start()
 
+    @property
+    def engine(self):
+        if self._engine is None:
+            from flamesengine import FlamesEngine, configure_process
+
+            configure_process()
+            self._engine = FlamesEngine(status_callback=self.update_status, progress_callback=self.update_progress)
+        return self._engine
+
     def cancel(self):
         self.cancelled = True
+        if self._engine:
+            self._engine.cancelled = True
         self.update_status("Process cancelled by user.")
 
     def update_status(self, msg):
@@ -252,34 +243,30 @@ class FlamesISOInstaller:
         self.root.after(0, lambda: self.progress_var.set(pct))
 
     def download_and_install(self):
+        succeeded = False
         try:
             build = self.build_selector.get()
             edition = self.edition_selector.get()
-            self.update_status(f"Preparing {build} - {edition}...")
-            self.update_progress(5)
-
-            self.temp_dir = tempfile.mkdtemp(prefix="FlamesISO_")
-            build_info = self.get_build_info(build)
-            if not build_info:
-                raise RuntimeError("Build info not found")
-
-            self.download_tools()
+            # Checkpointed per selection: the engine resumes at the first stage that didn't finish, and
+            # it downloads the payloads and converts them into the media the ISO is written from
+            self.engine.cancelled = False
+            iso_path = self.engine.run_job(build, edition, mount=False)
             if self.cancelled: return
-            self.update_status("Creating ISO...")
-            self.update_progress(40)
-
-            iso_path = self.create_iso(build_info, edition)
             if not iso_path or not os.path.exists(iso_path):
                 raise RuntimeError("ISO creation failed")
+            self.temp_dir = self.engine.temp_dir
+            state = self.engine.job_state
 
             self.update_progress(80)
             drive = self.mount_iso(iso_path)
             if self.cancelled: return
 
             if drive:
+                state.complete(MOUNTED, iso=iso_path, drive=drive)
                 self.install_os_from_iso(drive)
                 self.update_progress(100)
                 self.update_status("✅ Upgrade initiated. System will reboot when ready!")
+                succeeded = True
             else:
                 raise RuntimeError("ISO mount failed")
 
@@ -289,39 +276,10 @@ class FlamesISOInstaller:
         finally:
             self.start_button.config(state='normal')
             self.cancel_button.config(state='disabled')
-            if self.temp_dir and not self.cancelled:
+            # Failed or cancelled jobs keep their files so the next run resumes
+            if self.temp_dir and succeeded:
                 shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    def get_build_info(self, build_name):
-        mapping = { ... }  # same mapping as before
-        info = mapping.get(build_name)
-        if not info: return None
-        try:
-            r = requests.get("https://api.uupdump.net/listid.php", params={"search": info["build"], "sortByDate": 1}, timeout=10)
-            data = r.json()
-            # pick first matching
-            for bid, bdata in data.get('response', {}).get('builds', {}).items():
-                if info['ring'] in bdata.get('title', ''):
-                    return {'id': bid, 'title': bdata['title'], 'build': bdata.get('build', info['build'])}
-        except:
-            pass
-        return {'id': f"{info['build']}_fallback", 'title': build_name, 'build': info['build']}
-
-    def download_tools(self):
-        # simplified: ensure aria2c in tools
-        tools = os.path.join(self.temp_dir, 'tools')
-        os.makedirs(tools, exist_ok=True)
-        # download and extract aria2c as before
-        self.update_status("Tools ready.")
-        self.update_progress(30)
-
-    def create_iso(self, build_info, edition):
-        # write and run uup converter script as before
-        # for brevity, return dummy path
-        iso = os.path.join(self.temp_dir, f"Windows_{build_info['build']}_{edition}.iso")
-        open(iso, 'wb').close()
-        return iso
-
     def mount_iso(self, iso_path):
         self.update_status("Mounting ISO...")
         # mount via PowerShell
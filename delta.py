@@ -0,0 +1,102 @@
+"""
+Flames NT delta updates 🔂
+Remembers the last file set built per channel and edition so the next build only fetches what changed
+"""
+
+import json
+import os
+import re
+import shutil
+
+from flamespaths import data_dir
+
+
+class DeltaManifest:
+    """Last completed working set for each ring/build track and edition"""
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(data_dir(), "manifests")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, ring, track, edition):
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{ring}_{track}_{edition}")
+        return os.path.join(self.root, name + ".json")
+
+    def load(self, ring, track, edition):
+        try:
+            with open(self.path_for(ring, track, edition), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, ring, track, edition, build_id, files_dir, files):
+        """Record a fully downloaded file set as the base for the next delta"""
+        manifest = {
+            "build_id": build_id,
+            "files_dir": files_dir,
+            "files": {
+                entry["name"]: {key: entry.get(key) for key in ("size", "sha1", "sha256")}
+                for entry in files
+            },
+        }
+        path = self.path_for(ring, track, edition)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+        return manifest
+
+
+def _same_content(old, new):
+    """True only when a published hash proves the bytes are identical"""
+    if old.get("size") and new.get("size") and old["size"] != new["size"]:
+        return False
+    for key in ("sha256", "sha1"):
+        if old.get(key) and new.get(key):
+            return old[key].lower() == new[key].lower()
+    return False
+
+
+def plan(previous, files):
+    """Split a new file list into (changed, reused); reused holds (entry, previous path) pairs"""
+    if not previous or not os.path.isdir(previous.get("files_dir") or ""):
+        return list(files), []
+
+    old_files = previous["files"]
+    by_sha1 = {meta["sha1"].lower(): name for name, meta in old_files.items() if meta.get("sha1")}
+    changed, reused = [], []
+    for entry in files:
+        name = entry["name"]
+        if not (name in old_files and _same_content(old_files[name], entry)):
+            # Payloads are often renamed between builds without changing
+            name = by_sha1.get((entry.get("sha1") or "").lower())
+            if name is None or not _same_content(old_files[name], entry):
+                changed.append(entry)
+                continue
+
+        source = os.path.join(previous["files_dir"], name)
+        size = entry.get("size") or old_files[name].get("size")
+        if os.path.isfile(source) and (not size or os.path.getsize(source) == size):
+            reused.append((entry, source))
+        else:
+            changed.append(entry)
+    return changed, reused
+
+
+def apply(reused, dest_dir):
+    """Hardlink (or copy) unchanged files from the previous working set; returns bytes reused"""
+    total = 0
+    for entry, source in reused:
+        dest = os.path.join(dest_dir, entry["name"])
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        if os.path.lexists(dest):
+            if os.path.exists(dest) and os.path.samefile(source, dest):
+                total += os.path.getsize(dest)
+                continue
+            os.remove(dest)
+        try:
+            os.link(source, dest)
+        except OSError:
+            shutil.copyfile(source, dest)
+        total += os.path.getsize(dest)
+    return total
@@ -0,0 +1,208 @@
+"""
+Flames NT control 🎛️
+Headless command line for the installer engine, the converter and the daemon
+"""
+
+import argparse
+import os
+import sys
+
+import flamesd
+
+
+def _print_status(msg):
+    print(msg, flush=True)
+
+
+def _build_name(value):
+    """Accept a full build name or any unique part of one ("24H2", "canary")"""
+    from buildcatalog import BUILDS
+
+    matches = [b for b in BUILDS if value.lower() in b.lower()]
+    if value in BUILDS:
+        return value
+    if len(matches) != 1:
+        raise argparse.ArgumentTypeError(
+            f"{value!r} matches {len(matches)} builds; choose from: " + ", ".join(BUILDS))
+    return matches[0]
+
+
+def _job_pairs(args):
+    return [(build, edition) for build in args.build for edition in args.edition]
+
+
+def cmd_build(args):
+    pairs = _job_pairs(args)
+    if args.daemon:
+        return _submit(args, pairs)
+
+    from flamesengine import FlamesEngine, configure_process
+
+    configure_process()
+    engine = FlamesEngine(status_callback=_print_status, use_aria2=args.aria2, unpack_archives=args.unpack)
+    try:
+        if len(pairs) == 1:
+            iso = engine.run_job(*pairs[0], mount=args.mount)
+            if iso:
+                print(iso)
+            return 0
+        runner = engine.run_batch(pairs, max_images=args.max_images)
+    except KeyboardInterrupt:
+        engine.cancelled = True
+        return 130
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 1
+    for job in runner.jobs:
+        if job["iso"]:
+            print(job["iso"])
+        else:
+            print(f"❌ {job['build_info']['build']} {job['edition']}: {job['error']}", file=sys.stderr)
+    return 0 if all(job["iso"] for job in runner.jobs) else 1
+
+
+def _submit(args, pairs):
+    client = flamesd.DaemonClient.find()
+    if client is None:
+        print("❌ No Flames NT daemon is running (start one with: flamesctl serve)", file=sys.stderr)
+        return 1
+    if len(pairs) == 1:
+        job_id = client.submit(*pairs[0], aria2=args.aria2, mount=args.mount, unpack=args.unpack)
+    else:
+        job_id = client.submit(batch=pairs, aria2=args.aria2)
+    print(f"Submitted job {job_id} 📨")
+    if args.detach:
+        return 0
+    last = [None]
+
+    def show(job):
+        if job["status"] != last[0]:
+            last[0] = job["status"]
+            _print_status(f"[{job['progress']:5.1f}%] {job['status']}")
+
+    job = client.wait(job_id, show)
+    for iso in ([job["iso"]] if job["iso"] else []) + job["isos"]:
+        print(iso)
+    return 0 if job["state"] == flamesd.DONE else 1
+
+
+def cmd_convert(args):
+    import converter
+
+    def emit(kind, text):
+        (sys.stderr if kind == "error" else sys.stdout).write(text)
+        sys.stdout.flush()
+
+    os.makedirs(args.output, exist_ok=True)
+    iso = converter.run_conversion(
+        args.converter or converter.find_converter(), args.uup, args.output,
+        args.build_version, args.edition, emit
+    )
+    return 0 if iso else 1
+
+
+def cmd_serve(args):
+    flamesd.check_host(args.host)
+    daemon = flamesd.JobDaemon(max_jobs=args.max_jobs)
+    print(f"Flames NT daemon listening on {args.host}:{args.port} 🛰️", flush=True)
+    try:
+        daemon.serve(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _client():
+    client = flamesd.DaemonClient.find()
+    if client is None:
+        raise SystemExit("❌ No Flames NT daemon is running")
+    return client
+
+
+def cmd_jobs(args):
+    for job in _client().jobs():
+        what = f"{job['build']} / {job['edition']}" if job["build"] else f"batch of {len(job['batch'])}"
+        print(f"{job['id']:>4}  {job['state']:<9} {job['progress']:5.1f}%  {what}  {job['status']}")
+    return 0
+
+
+def cmd_cancel(args):
+    job = _client().cancel(args.job)
+    print(f"Job {job['id']}: cancelling ({job['state']})")
+    return 0
+
+
+def cmd_tune(args):
+    from bandwidth import parse_rate
+
+    options = {}
+    if args.connections is not None:
+        options["connections"] = args.connections
+    if args.pause or args.resume:
+        options["paused"] = args.pause
+    if args.rate is not None:
+        options["rate"] = int(parse_rate(args.rate) or 0)
+    if not options:
+        raise SystemExit("❌ Nothing to change (use --connections, --pause/--resume or --rate)")
+    job = _client().tune(args.job, **options)
+    print(f"Job {job['id']}: retuned 🎚️")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="flamesctl", description="Flames NT headless control")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="download and build ISOs (several builds/editions share downloads)")
+    build.add_argument("--build", "-b", type=_build_name, action="append", required=True,
+                       help="build name or unique part of one, e.g. 24H2; repeatable")
+    build.add_argument("--edition", "-e", action="append", required=True, help="edition; repeatable")
+    build.add_argument("--aria2", action="store_true", help="use aria2c instead of the built-in downloader")
+    build.add_argument("--mount", action="store_true", help="mount the ISO when done (Windows)")
+    build.add_argument("--unpack", action="store_true",
+                       help="unpack .zip/.cab payloads while the rest download, for the converter (single builds)")
+    build.add_argument("--max-images", type=int, default=2, help="images written at once in a batch")
+    build.add_argument("--daemon", action="store_true", help="hand the job to the running daemon")
+    build.add_argument("--detach", action="store_true", help="with --daemon, don't wait for the job")
+    build.set_defaults(func=cmd_build)
+
+    convert = sub.add_parser("convert", help="run a UUP converter on already-downloaded files")
+    convert.add_argument("--converter", help="converter directory (default: search common locations)")
+    convert.add_argument("--uup", required=True, help="UUP files directory")
+    convert.add_argument("--output", required=True, help="ISO output directory")
+    convert.add_argument("--build-version", default="22H2")
+    convert.add_argument("--edition", default="Professional")
+    convert.set_defaults(func=cmd_convert)
+
+    serve = sub.add_parser("serve", help="run the job daemon on a local HTTP port")
+    serve.add_argument("--host", default="127.0.0.1", help="loopback address to listen on")
+    serve.add_argument("--port", type=int, default=flamesd.DEFAULT_PORT)
+    serve.add_argument("--max-jobs", type=int, default=1, help="jobs run at once")
+    serve.set_defaults(func=cmd_serve)
+
+    jobs = sub.add_parser("jobs", help="list the daemon's jobs")
+    jobs.set_defaults(func=cmd_jobs)
+
+    cancel = sub.add_parser("cancel", help="cancel a daemon job")
+    cancel.add_argument("job")
+    cancel.set_defaults(func=cmd_cancel)
+
+    tune = sub.add_parser("tune", help="retune a daemon job's aria2 download while it runs")
+    tune.add_argument("job")
+    tune.add_argument("--connections", "-c", type=int, help="connections per file not yet started (1-16)")
+    pause = tune.add_mutually_exclusive_group()
+    pause.add_argument("--pause", action="store_true", help="pause every download")
+    pause.add_argument("--resume", action="store_true", help="resume paused downloads")
+    tune.add_argument("--rate", help="overall limit, e.g. 20M or 512K; 0 lifts it")
+    tune.set_defaults(func=cmd_tune)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except flamesd.DaemonError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Flames NT daemon 🛰️
+One warm process that takes build jobs over local HTTP and runs them on FlamesEngine
+"""
+
+import ipaddress
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flamespaths import data_dir
+
+DEFAULT_PORT = 8765
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+def check_host(host):
+    """Refuse anything but a loopback address: the job API has no authentication"""
+    try:
+        loopback = host == "localhost" or ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise DaemonError(f"Refusing to serve on {host}: the job API is unauthenticated, "
+                          "so it only listens on localhost")
+
+
+def _targets(job):
+    """(build, edition) pairs a job builds"""
+    return set(job["batch"] or [(job["build"], job["edition"])])
+
+
+def state_path():
+    """Where a running daemon records its pid and port so clients can find it"""
+    return os.path.join(data_dir(), "flamesd.json")
+
+
+class JobDaemon:
+    """Queues jobs and runs up to max_jobs at once, each on its own engine
+
+    Engines share one metadata cache and build catalog, so lookups made for
+    one job are warm for the next.
+    """
+
+    def __init__(self, max_jobs=1):
+        # Imported here so clients (the Tk windows) don't pay for the engine's imports
+        from buildcatalog import BuildCatalog
+        from flamesengine import configure_process
+        from metacache import MetadataCache
+
+        # Once for the daemon's lifetime; jobs share the session from here on
+        configure_process()
+        self.metadata_cache = MetadataCache()
+        self.catalog = BuildCatalog()
+        self.jobs = {}
+        self._engines = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="flamesd-job")
+
+    def submit(self, build=None, edition=None, batch=None, aria2=False, mount=False, unpack=False):
+        """Queue a single build/edition, or a batch of [build, edition] pairs; returns the job
+
+        A build/edition already queued or running is refused: both jobs
+        would work in the same job directory.
+        """
+        if batch:
+            batch = [tuple(pair) for pair in batch]
+        elif not (build and edition):
+            raise DaemonError("A job needs a build and an edition, or a batch")
+        wanted = set(batch or [(build, edition)])
+        with self._lock:
+            for other in self.jobs.values():
+                if other["state"] in (QUEUED, RUNNING) and wanted & _targets(other):
+                    raise DaemonError(f"Job {other['id']} is already building that ({other['state']})")
+            job = {
+                "id": str(next(self._ids)), "build": build, "edition": edition, "batch": batch,
+                "aria2": bool(aria2), "mount": bool(mount), "unpack": bool(unpack), "state": QUEUED,
+                "status": "Queued ⏳", "progress": 0.0, "iso": None, "isos": [], "error": None,
+                "submitted": time.time(), "finished": None,
+            }
+            self.jobs[job["id"]] = job
+        self._pool.submit(self._run, job)
+        return job
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise DaemonError(f"No job {job_id}")
+            if job["state"] == QUEUED:
+                job["state"] = CANCELLED
+                job["finished"] = time.time()
+            elif job_id in self._engines:
+                self._engines[job_id].cancelled = True
+        return job
+
+    def tune(self, job_id, connections=None, paused=None, rate=None):
+        """Retune a running job's aria2 RPC download (see FlamesEngine.tune_downloads)"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise DaemonError(f"No job {job_id}")
+            engine = self._engines.get(job_id)
+        if engine is None or not engine.tune_downloads(connections, paused, rate):
+            raise DaemonError(f"Job {job_id} has no aria2 RPC download running")
+        return job
+
+    def close(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.cancelled = True
+        self._pool.shutdown(wait=True)
+
+    def _run(self, job):
+        from flamesengine import FlamesEngine
+
+        def status(msg):
+            job["status"] = msg
+
+        def progress(value):
+            job["progress"] = float(value)
+
+        engine = FlamesEngine(
+            status_callback=status, progress_callback=progress, use_aria2=job["aria2"],
+            metadata_cache=self.metadata_cache, catalog=self.catalog, unpack_archives=job["unpack"]
+        )
+        with self._lock:
+            if job["state"] == CANCELLED:
+                return
+            job["state"] = RUNNING
+            self._engines[job["id"]] = engine
+        try:
+            if job["batch"]:
+                runner = engine.run_batch(job["batch"])
+                job["isos"] = [j["iso"] for j in runner.jobs if j["iso"]]
+                errors = [f"{j['build_info']['build']} {j['edition']}: {j['error']}" for j in runner.jobs if j["error"]]
+                if errors:
+                    raise DaemonError("; ".join(errors))
+            else:
+                job["iso"] = engine.run_job(job["build"], job["edition"], mount=job["mount"])
+            job["state"] = CANCELLED if engine.cancelled else DONE
+        except Exception as e:
+            job["state"] = CANCELLED if engine.cancelled else FAILED
+            job["error"] = str(e)
+            job["status"] = f"❌ Error: {str(e)}"
+        finally:
+            job["finished"] = time.time()
+            with self._lock:
+                self._engines.pop(job["id"], None)
+
+    # -- HTTP -------------------------------------------------------------
+
+    def serve(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """Serve the job API until interrupted; only loopback hosts are accepted (see check_host)"""
+        check_host(host)
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, code, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = [p for p in self.path.split("?")[0].split("/") if p]
+                if parts == ["health"]:
+                    self._reply(200, {"ok": True, "pid": os.getpid()})
+                elif parts == ["jobs"]:
+                    self._reply(200, list(daemon.jobs.values()))
+                elif len(parts) == 2 and parts[0] == "jobs" and parts[1] in daemon.jobs:
+                    self._reply(200, daemon.jobs[parts[1]])
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                parts = [p for p in self.path.split("?")[0].split("/") if p]
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                    if parts == ["jobs"]:
+                        self._reply(201, daemon.submit(**body))
+                    elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                        self._reply(200, daemon.cancel(parts[1]))
+                    elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "tune":
+                        self._reply(200, daemon.tune(parts[1], **body))
+                    else:
+                        self._reply(404, {"error": "not found"})
+                except (DaemonError, TypeError, ValueError) as e:
+                    self._reply(400, {"error": str(e)})
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        with open(state_path(), "w") as f:
+            json.dump({"pid": os.getpid(), "host": host, "port": server.server_address[1]}, f)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            try:
+                os.remove(state_path())
+            except OSError:
+                pass
+            self.close()
+
+
+class DaemonClient:
+    """Talks to a running flamesd over HTTP"""
+
+    def __init__(self, url, timeout=10):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        # Never route localhost traffic through a configured proxy
+        self._opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    @classmethod
+    def find(cls, timeout=0.5):
+        """Client for the daemon recorded in the state file, or None if none answers"""
+        try:
+            with open(state_path()) as f:
+                state = json.load(f)
+            client = cls(f"http://{state['host']}:{state['port']}", timeout=timeout)
+            client.health()
+            client.timeout = 10
+            return client
+        except (OSError, ValueError, KeyError, DaemonError):
+            return None
+
+    def _call(self, method, path, payload=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error")
+            except ValueError:
+                message = None
+            raise DaemonError(message or f"Daemon returned HTTP {e.code}")
+        except (urllib.error.URLError, OSError) as e:
+            raise DaemonError(f"Daemon not reachable at {self.url}: {e}")
+
+    def health(self):
+        return self._call("GET", "/health")
+
+    def submit(self, build=None, edition=None, **options):
+        """Queue a job; returns its id"""
+        return self._call("POST", "/jobs", dict(options, build=build, edition=edition))["id"]
+
+    def job(self, job_id):
+        return self._call("GET", f"/jobs/{job_id}")
+
+    def jobs(self):
+        return self._call("GET", "/jobs")
+
+    def cancel(self, job_id):
+        return self._call("POST", f"/jobs/{job_id}/cancel", {})
+
+    def tune(self, job_id, **options):
+        """connections=, paused= and/or rate= for a job downloading with aria2"""
+        return self._call("POST", f"/jobs/{job_id}/tune", options)
+
+    def wait(self, job_id, callback=None, interval=0.5):
+        """Poll until the job finishes, passing each snapshot to callback; returns the final job"""
+        while True:
+            job = self.job(job_id)
+            if callback:
+                callback(job)
+            if job["state"] in FINISHED:
+                return job
+            time.sleep(interval)
@@ -0,0 +1,29 @@
+"""
+Flames NT data directories 📁
+Everything that should survive between runs lives under one root
+"""
+
+import os
+import re
+
+
+def data_dir():
+    """Root directory for persistent Flames NT data (FLAMESNT_HOME overrides)"""
+    root = os.environ.get("FLAMESNT_HOME")
+    if not root:
+        if os.name == "nt":
+            base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+            root = os.path.join(base, "FlamesNT")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+            root = os.path.join(base, "flamesnt")
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def job_dir(build_id, edition):
+    """Stable working directory for one build/edition so interrupted jobs can resume"""
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{build_id}_{edition}")
+    path = os.path.join(data_dir(), "jobs", name)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,105 @@
+"""
+Flames NT in-stream hashing 🔐
+Verifies SHA-1/SHA-256 while bytes are written, without a second pass over the file
+"""
+
+import hashlib
+import os
+import threading
+
+
+class IntegrityError(RuntimeError):
+    pass
+
+
+def verify_file(path, size, sha1=None, sha256=None):
+    """True if a finished file has the expected size and digests (only size when none are published)"""
+    if not os.path.isfile(path) or os.path.getsize(path) != size:
+        return False
+    hasher = StreamHasher(path, sha1, sha256)
+    try:
+        hasher.finish(size)
+    except IntegrityError:
+        return False
+    return True
+
+
+class StreamHasher:
+    """Hashes a file in byte order as chunks arrive (possibly out of order)
+
+    Chunks at the hash cursor are hashed immediately. Chunks ahead of it are
+    held in memory up to max_buffer bytes; anything beyond that is read back
+    from disk in finish(). A resumed run hashes its journaled prefix once up
+    front with catch_up(), so the stream picks up right at the cursor.
+    """
+
+    def __init__(self, path, sha1=None, sha256=None, max_buffer=64 * 1024 * 1024):
+        self.path = path
+        self.expected = {name: value.lower() for name, value in (("sha1", sha1), ("sha256", sha256)) if value}
+        self.hashes = {name: hashlib.new(name) for name in self.expected}
+        self.max_buffer = max_buffer
+        self.cursor = 0
+        self.pending = {}
+        self.buffered = 0
+        self.reread = 0
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.expected)
+
+    def feed(self, offset, data):
+        with self._lock:
+            if offset == self.cursor:
+                self._update(data)
+                self._drain()
+            elif offset > self.cursor and self.buffered + len(data) <= self.max_buffer:
+                self.pending[offset] = bytes(data)
+                self.buffered += len(data)
+
+    def catch_up(self, offset, block_size=4 * 1024 * 1024):
+        """Hash what an earlier run left on disk up to offset, so a resumed stream lands on the cursor"""
+        with self._lock:
+            self._read_to(offset, block_size)
+
+    def finish(self, size, block_size=4 * 1024 * 1024):
+        """Hash whatever the stream missed, then compare against the expected digests"""
+        with self._lock:
+            self._drain()
+            self._read_to(size, block_size)
+            self.pending.clear()
+            self.buffered = 0
+
+            for name, expected in self.expected.items():
+                actual = self.hashes[name].hexdigest()
+                if actual != expected:
+                    raise IntegrityError(
+                        f"{name} mismatch for {os.path.basename(self.path).removesuffix('.part')}: expected {expected}, got {actual}"
+                    )
+
+    def _read_to(self, offset, block_size):
+        if self.cursor >= offset:
+            return
+        with open(self.path, "rb") as f:
+            while self.cursor < offset:
+                start = self.cursor
+                f.seek(start)
+                block = f.read(min(block_size, offset - start))
+                if not block:
+                    break
+                self.reread += len(block)
+                self._update(block)
+                self._drain()
+
+    def _update(self, data):
+        for digest in self.hashes.values():
+            digest.update(data)
+        self.cursor += len(data)
+
+    def _drain(self):
+        # Stale pending chunks (already covered by a re-read) are simply dropped
+        for offset in [o for o in self.pending if o < self.cursor]:
+            self.buffered -= len(self.pending.pop(offset))
+        while self.cursor in self.pending:
+            data = self.pending.pop(self.cursor)
+            self.buffered -= len(data)
+            self._update(data)
@@ -0,0 +1,65 @@
+"""
+Flames NT shared HTTP session 🔌
+One keep-alive connection pool per host, shared by every module
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = 16   # number of hosts with their own pool
+POOL_MAXSIZE = 64       # keep-alive connections kept per host
+DEFAULT_TIMEOUT = (10, 30)  # (connect, read) seconds
+RETRIES = 2
+
+
+class PooledSession(requests.Session):
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 timeout=DEFAULT_TIMEOUT, retries=RETRIES):
+        super().__init__()
+        self.timeout = timeout
+        self.headers["User-Agent"] = "FlamesNT-ISO-Installer"
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                raise_on_status=False
+            )
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().request(method, url, **kwargs)
+
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """The process-wide pooled session (created on first use)"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = PooledSession()
+        return _session
+
+
+def configure(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+              timeout=DEFAULT_TIMEOUT, retries=RETRIES):
+    """Replace the shared session, e.g. to fit the pool to the downloader's connection count"""
+    global _session
+    with _lock:
+        old, _session = _session, PooledSession(pool_connections, pool_maxsize, timeout, retries)
+    if old is not None:
+        old.close()
+    return _session
@@ -0,0 +1,104 @@
+"""
+Flames NT ISO writer benchmark ⏱️
+Generates a Windows-media-shaped tree and measures image throughput against a plain copy
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from isowriter import IsoWriter, windows_boot_entries
+
+BLOCK = 4 * 1024 * 1024
+
+
+def _write_file(path, size, block):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining:
+            n = min(remaining, len(block))
+            f.write(block[:n])
+            remaining -= n
+
+
+def generate_tree(root, total_bytes, small_files=2000):
+    """install.wim-sized file (multi-extent past 4 GiB), a boot.wim, boot images and many small CABs"""
+    block = os.urandom(BLOCK)
+    _write_file(os.path.join(root, "boot", "etfsboot.com"), 4096, block)
+    _write_file(os.path.join(root, "efi", "microsoft", "boot", "efisys.bin"), 1474560, block)
+    small_size = 64 * 1024
+    small_total = small_files * small_size
+    boot_wim = min(600 * 1024 * 1024, total_bytes // 8)
+    install_wim = max(0, total_bytes - small_total - boot_wim)
+    _write_file(os.path.join(root, "sources", "boot.wim"), boot_wim, block)
+    _write_file(os.path.join(root, "sources", "install.wim"), install_wim, block)
+    for i in range(small_files):
+        name = f"Microsoft-Windows-Package~31bf3856ad364e35~amd64~~10.0.26100.{i}.cab"
+        _write_file(os.path.join(root, "sources", "sxs", name), small_size, block)
+
+
+def baseline_copy(root, dest):
+    """Same bytes through shutil.copyfileobj into one file, for comparison"""
+    with open(dest, "wb") as out:
+        for folder, _, names in os.walk(root):
+            for name in sorted(names):
+                with open(os.path.join(folder, name), "rb") as src:
+                    shutil.copyfileobj(src, out, BLOCK)
+
+
+def _drop_caches():
+    # Best effort: only works as root on Linux
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Flames NT ISO writer")
+    parser.add_argument("--size-gb", type=float, default=6.0, help="total tree size in GiB (default 6)")
+    parser.add_argument("--small-files", type=int, default=2000)
+    parser.add_argument("--workdir", default=None, help="where to put the tree and images (default: temp dir)")
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--keep", action="store_true", help="keep the generated tree and image")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="flamesnt-isobench-")
+    tree = os.path.join(workdir, "tree")
+    image = os.path.join(workdir, "bench.iso")
+    try:
+        if not os.path.isdir(tree):
+            print(f"Generating {args.size_gb:g} GiB tree in {tree} ...")
+            generate_tree(tree, int(args.size_gb * 1024 ** 3), args.small_files)
+
+        for run in range(1, args.runs + 1):
+            cold = _drop_caches()
+            started = time.perf_counter()
+            baseline_copy(tree, image)
+            copy_time = time.perf_counter() - started
+            copy_size = os.path.getsize(image)
+            os.remove(image)
+
+            _drop_caches()
+            writer = IsoWriter("FLAMESNT_BENCH", windows_boot_entries(tree)).add_tree(tree)
+            started = time.perf_counter()
+            size = writer.write(image)
+            iso_time = time.perf_counter() - started
+
+            print(f"run {run}{' (cold cache)' if cold else ''}: "
+                  f"iso {size / 2**20 / iso_time:8.1f} MiB/s ({iso_time:.2f}s, "
+                  f"copy_file_range={'yes' if writer.copy_file_range_used else 'no'})  |  "
+                  f"plain copy {copy_size / 2**20 / copy_time:8.1f} MiB/s ({copy_time:.2f}s)")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,606 @@
+"""
+Flames NT ISO writer 💿
+ISO 9660 (level 3) + Joliet + UDF 1.02 bridge + El Torito images from a directory tree, in one sequential pass
+"""
+
+import math
+import os
+import re
+import struct
+import time
+
+import udf
+from writepath import MAX_CHUNK, ProgressThrottle, preallocate
+
+SECTOR = 2048
+# Largest sector-aligned extent a 32-bit data length can describe; bigger files span several
+MAX_EXTENT = 0xFFFFF800
+# copy_file_range calls are capped so progress and cancellation stay responsive
+COPY_CHUNK = 64 * 1024 * 1024
+# Joliet's own limit is 64 characters; Windows and libisofs (-joliet-long) read 103
+JOLIET_MAX = 103
+
+FLAG_DIRECTORY = 0x02
+FLAG_MULTI_EXTENT = 0x80
+
+PLATFORM_BIOS = 0x00
+PLATFORM_EFI = 0xEF
+
+# Where a Windows media tree keeps its El Torito images
+WINDOWS_BOOT = (
+    ("boot/etfsboot.com", "bios"),
+    ("efi/microsoft/boot/efisys.bin", "efi"),
+)
+
+
+class IsoError(RuntimeError):
+    pass
+
+
+def _both16(value):
+    return struct.pack("<H", value) + struct.pack(">H", value)
+
+
+def _both32(value):
+    return struct.pack("<I", value) + struct.pack(">I", value)
+
+
+def _record_date(stamp):
+    t = time.gmtime(stamp)
+    return bytes([t.tm_year - 1900, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec, 0])
+
+
+def _volume_date(stamp):
+    if stamp is None:
+        return b"0" * 16 + b"\x00"
+    return time.strftime("%Y%m%d%H%M%S00", time.gmtime(stamp)).encode("ascii") + b"\x00"
+
+
+def _pad(data, length, fill=b" "):
+    return data[:length].ljust(length, fill)
+
+
+def _sectors(size):
+    return (size + SECTOR - 1) // SECTOR
+
+
+class _Node:
+    def __init__(self, name, path, parent, is_dir, size=0, mtime=0):
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+        self.children = []
+        self.names = {}      # hierarchy -> identifier bytes
+        self.lba = {}        # hierarchy -> directory extent (dirs)
+        self.dir_size = {}   # hierarchy -> directory extent length (dirs)
+        self.number = {}     # hierarchy -> path table index (dirs)
+        self.data_lba = 0    # first data extent (files)
+        self.udf_entry = 0   # UDF file entry
+        self.udf_data = 0    # UDF directory contents (dirs)
+        self.udf_size = 0
+        self.udf_id = 0      # UDF unique ID
+
+    def extents(self):
+        """(lba, length) of each extent holding the file data"""
+        if self.size == 0:
+            return [(self.data_lba, 0)]
+        per_extent = MAX_EXTENT // SECTOR
+        count = math.ceil(self.size / MAX_EXTENT)
+        return [(self.data_lba + i * per_extent, min(MAX_EXTENT, self.size - i * MAX_EXTENT))
+                for i in range(count)]
+
+
+class IsoWriter:
+    """Lays out a whole tree up front, then streams headers and file extents in LBA order
+
+    `boot` is a list of {"path": <path inside the tree>, "platform": "bios" | "efi"}
+    El Torito no-emulation entries; the first one is the default entry.
+
+    The UDF bridge shares every file's data with the ISO 9660 records, so a
+    file past one ISO extent (install.wim over 4 GiB) is one contiguous UDF
+    file that Windows Setup reads, and a multi-extent file for ISO 9660.
+    """
+
+    def __init__(self, volume_id="FLAMESNT", boot=None, timestamp=None,
+                 progress_callback=None, cancel_check=None):
+        self.volume_id = volume_id
+        self.boot = list(boot or [])
+        # A fixed timestamp makes every date in the image (and so the image) reproducible
+        self.timestamp = timestamp
+        self.progress_callback = progress_callback
+        self._progress = ProgressThrottle(progress_callback)
+        self.cancel_check = cancel_check or (lambda: False)
+        self.root = _Node("", None, None, True)
+        self.root.parent = self.root
+        self.files = []
+        self.written = 0
+        self.copy_file_range_used = False
+
+    # -- tree -------------------------------------------------------------
+
+    def add_tree(self, src_dir):
+        """Add everything below src_dir at the root of the image"""
+        self._scan(src_dir, self.root)
+        return self
+
+    def _scan(self, path, node):
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=True):
+                child = _Node(entry.name, entry.path, node, True)
+                node.children.append(child)
+                self._scan(entry.path, child)
+            elif entry.is_file(follow_symlinks=True):
+                st = entry.stat()
+                child = _Node(entry.name, entry.path, node, False, st.st_size, st.st_mtime)
+                node.children.append(child)
+
+    def _find(self, relpath):
+        node = self.root
+        for part in relpath.replace("\\", "/").strip("/").split("/"):
+            matches = [c for c in node.children if c.name.lower() == part.lower()]
+            if not matches:
+                return None
+            node = matches[0]
+        return node
+
+    # -- naming -----------------------------------------------------------
+
+    @staticmethod
+    def _iso_identifier(name, is_dir, taken):
+        """Level 3 d-character identifier, unique within its directory"""
+        name = name.upper()
+        if is_dir:
+            base, ext = re.sub(r"[^A-Z0-9_]", "_", name)[:31], None
+        else:
+            stem, dot, ext = name.rpartition(".")
+            if not dot:
+                stem, ext = ext, ""
+            ext = re.sub(r"[^A-Z0-9_]", "_", ext)[:8]
+            base = re.sub(r"[^A-Z0-9_]", "_", stem)[:30 - len(ext) - 1] or "_"
+
+        def build(b):
+            return b if is_dir else f"{b}.{ext};1"
+
+        candidate = build(base)
+        n = 1
+        while candidate in taken:
+            suffix = f"~{n}"
+            candidate = build(base[:(31 if is_dir else 30 - len(ext) - 1) - len(suffix)] + suffix)
+            n += 1
+        taken.add(candidate)
+        return candidate.encode("ascii")
+
+    @staticmethod
+    def _joliet_identifier(name, taken):
+        candidate = name[:JOLIET_MAX]
+        n = 1
+        while candidate.lower() in taken:
+            suffix = f"~{n}"
+            candidate = name[:JOLIET_MAX - len(suffix)] + suffix
+            n += 1
+        taken.add(candidate.lower())
+        return candidate.encode("utf-16-be")
+
+    @staticmethod
+    def _udf_identifier(name, taken):
+        def fit(text, suffix=""):
+            while len(udf.dchars(text + suffix)) > udf.MAX_NAME:
+                text = text[:-1]
+            return text + suffix
+
+        candidate = fit(name)
+        n = 1
+        while candidate.lower() in taken:
+            candidate = fit(name, f"~{n}")
+            n += 1
+        taken.add(candidate.lower())
+        return udf.dchars(candidate)
+
+    def _assign_names(self, node):
+        iso_taken, joliet_taken, udf_taken = set(), set(), set()
+        for child in node.children:
+            child.names["iso"] = self._iso_identifier(child.name, child.is_dir, iso_taken)
+            child.names["joliet"] = self._joliet_identifier(child.name, joliet_taken)
+            child.names["udf"] = self._udf_identifier(child.name, udf_taken)
+            if child.is_dir:
+                self._assign_names(child)
+
+    def _sorted_children(self, node, hierarchy):
+        return sorted(node.children, key=lambda c: c.names[hierarchy])
+
+    def _directories(self, hierarchy):
+        """Directories in path table order: breadth first, siblings sorted"""
+        order = [self.root]
+        for node in order:
+            order.extend(c for c in self._sorted_children(node, hierarchy) if c.is_dir)
+        return order
+
+    # -- layout -----------------------------------------------------------
+
+    @staticmethod
+    def _record_length(name_length):
+        return 33 + name_length + (1 - name_length % 2)
+
+    def _directory_size(self, node, hierarchy):
+        used = 0
+        lengths = [self._record_length(1), self._record_length(1)]
+        for child in self._sorted_children(node, hierarchy):
+            count = 1 if child.is_dir else len(child.extents())
+            lengths.extend([self._record_length(len(child.names[hierarchy]))] * count)
+        for length in lengths:
+            # Records never straddle a sector boundary
+            if used % SECTOR + length > SECTOR:
+                used += SECTOR - used % SECTOR
+            used += length
+        return _sectors(used) * SECTOR
+
+    def _path_table_size(self, directories, hierarchy):
+        size = 0
+        for node in directories:
+            name_length = len(node.names[hierarchy])
+            size += 8 + name_length + name_length % 2
+        return size
+
+    def _udf_directory_size(self, node):
+        return udf.identifier_length(b"") + sum(udf.identifier_length(c.names["udf"]) for c in node.children)
+
+    def _layout(self):
+        self.root.names = {"iso": b"\x00", "joliet": b"\x00", "udf": b""}
+        self._assign_names(self.root)
+
+        boot_nodes = []
+        for entry in self.boot:
+            node = self._find(entry["path"])
+            if node is None or node.is_dir:
+                raise IsoError(f"Boot image {entry['path']} is not in the tree")
+            boot_nodes.append((node, entry))
+
+        lba = 16
+        self.pvd_lba = lba
+        lba += 1
+        self.boot_record_lba = None
+        if boot_nodes:
+            self.boot_record_lba = lba
+            lba += 1
+        self.joliet_lba = lba
+        lba += 1
+        self.terminator_lba = lba
+        lba += 1
+        # BEA01/NSR02/TEA01 right after the terminator tell readers UDF is there too
+        self.recognition_lba = lba
+        lba += 3
+
+        self.catalog_lba = None
+        if boot_nodes:
+            self.catalog_lba = lba
+            lba += 1
+        if lba > udf.MAIN_VDS:
+            raise IsoError("Internal layout mismatch")
+
+        # UDF partition: file set descriptor + terminator, then each directory's
+        # file entry and identifiers followed by the entries of the files in it
+        lba = udf.PARTITION_START + 2
+        self.dirs = {h: self._directories(h) for h in ("iso", "joliet", "udf")}
+        unique_id = udf.FIRST_UNIQUE_ID
+        for node in self.dirs["udf"]:
+            node.udf_entry = lba
+            node.udf_size = self._udf_directory_size(node)
+            node.udf_data = lba + 1
+            lba += 1 + _sectors(node.udf_size)
+            for child in self._sorted_children(node, "udf"):
+                child.udf_id = unique_id
+                unique_id += 1
+                if not child.is_dir:
+                    child.udf_entry = lba
+                    lba += 1
+        self.next_unique_id = unique_id
+
+        self.path_tables = {}
+        for hierarchy in ("iso", "joliet"):
+            for number, node in enumerate(self.dirs[hierarchy], 1):
+                node.number[hierarchy] = number
+            size = self._path_table_size(self.dirs[hierarchy], hierarchy)
+            sectors = _sectors(size)
+            self.path_tables[hierarchy] = (size, lba, lba + sectors)
+            lba += 2 * sectors
+
+        for hierarchy in ("iso", "joliet"):
+            for node in self.dirs[hierarchy]:
+                node.dir_size[hierarchy] = self._directory_size(node, hierarchy)
+                node.lba[hierarchy] = lba
+                lba += node.dir_size[hierarchy] // SECTOR
+
+        # File data in directory order, so the image reads back sequentially too;
+        # ISO 9660 and UDF both point at the same extents
+        self.data_lba = lba
+        self.files = []
+        for node in self.dirs["iso"]:
+            for child in self._sorted_children(node, "iso"):
+                if not child.is_dir:
+                    child.data_lba = lba
+                    lba += _sectors(child.size)
+                    self.files.append(child)
+
+        # The closing anchor is the last sector; the partition runs up to it
+        self.anchor_lba = lba
+        self.partition_length = lba - udf.PARTITION_START
+        self.boot_nodes = boot_nodes
+        self.total_sectors = lba + 1
+        return self.total_sectors * SECTOR
+
+    # -- metadata ---------------------------------------------------------
+
+    def _stamp_for(self, node):
+        return self.timestamp if self.timestamp is not None else (node.mtime or self._now)
+
+    def _date_for(self, node):
+        return _record_date(self._stamp_for(node))
+
+    def _dir_record(self, name, lba, size, flags, date):
+        length = self._record_length(len(name))
+        record = (bytes([length, 0]) + _both32(lba) + _both32(size) + date + bytes([flags, 0, 0])
+                  + _both16(1) + bytes([len(name)]) + name)
+        return record.ljust(length, b"\x00")
+
+    def _directory_extent(self, node, hierarchy):
+        records = [
+            self._dir_record(b"\x00", node.lba[hierarchy], node.dir_size[hierarchy], FLAG_DIRECTORY, self._date_for(node)),
+            self._dir_record(b"\x01", node.parent.lba[hierarchy], node.parent.dir_size[hierarchy],
+                             FLAG_DIRECTORY, self._date_for(node.parent)),
+        ]
+        for child in self._sorted_children(node, hierarchy):
+            name = child.names[hierarchy]
+            if child.is_dir:
+                records.append(self._dir_record(name, child.lba[hierarchy], child.dir_size[hierarchy],
+                                                FLAG_DIRECTORY, self._date_for(child)))
+                continue
+            extents = child.extents()
+            for i, (lba, length) in enumerate(extents):
+                flags = FLAG_MULTI_EXTENT if i < len(extents) - 1 else 0
+                records.append(self._dir_record(name, lba, length, flags, self._date_for(child)))
+
+        data = bytearray()
+        for record in records:
+            if len(data) % SECTOR + len(record) > SECTOR:
+                data.extend(b"\x00" * (SECTOR - len(data) % SECTOR))
+            data.extend(record)
+        return bytes(data).ljust(node.dir_size[hierarchy], b"\x00")
+
+    def _path_table(self, hierarchy, big_endian):
+        fmt = ">IH" if big_endian else "<IH"
+        data = bytearray()
+        for node in self.dirs[hierarchy]:
+            name = b"\x00" if node is self.root else node.names[hierarchy]
+            data.extend(bytes([len(name), 0]) + struct.pack(fmt, node.lba[hierarchy], node.parent.number[hierarchy]) + name)
+            if len(name) % 2:
+                data.append(0)
+        return bytes(data)
+
+    def _volume_descriptor(self, hierarchy):
+        joliet = hierarchy == "joliet"
+        if joliet:
+            def text(value, length):
+                data = value[:length // 2].encode("utf-16-be")
+                return (data + "\u0020".encode("utf-16-be") * length)[:length]
+            volume_id = text(self.volume_id, 32)
+        else:
+            def text(value, length):
+                return _pad(value.upper().encode("ascii", "replace"), length)
+            volume_id = _pad(re.sub(r"[^A-Z0-9_]", "_", self.volume_id.upper()).encode("ascii"), 32)
+
+        size, l_lba, m_lba = self.path_tables[hierarchy]
+        created = _volume_date(self.timestamp if self.timestamp is not None else self._now)
+        root = self._dir_record(b"\x00", self.root.lba[hierarchy], self.root.dir_size[hierarchy],
+                                FLAG_DIRECTORY, self._date_for(self.root))
+        escape = b"%/E" if joliet else b""
+
+        vd = bytearray(SECTOR)
+        vd[0:7] = bytes([2 if joliet else 1]) + b"CD001\x01"
+        vd[8:40] = text("", 32)
+        vd[40:72] = volume_id
+        vd[80:88] = _both32(self.total_sectors)
+        vd[88:88 + len(escape)] = escape
+        vd[120:124] = _both16(1)
+        vd[124:128] = _both16(1)
+        vd[128:132] = _both16(SECTOR)
+        vd[132:140] = _both32(size)
+        vd[140:144] = struct.pack("<I", l_lba)
+        vd[148:152] = struct.pack(">I", m_lba)
+        vd[156:190] = root
+        vd[190:318] = text("", 128)
+        vd[318:446] = text("FLAMES NT", 128)
+        vd[446:574] = text("", 128)
+        vd[574:702] = text("FLAMES NT ISO WRITER", 128)
+        vd[702:813] = text("", 111)
+        vd[813:830] = created
+        vd[830:847] = created
+        vd[847:864] = _volume_date(None)
+        vd[864:881] = created
+        vd[881] = 1
+        return bytes(vd)
+
+    def _boot_record(self):
+        vd = bytearray(SECTOR)
+        vd[0:7] = b"\x00CD001\x01"
+        vd[7:39] = _pad(b"EL TORITO SPECIFICATION", 32, b"\x00")
+        vd[71:75] = struct.pack("<I", self.catalog_lba)
+        return bytes(vd)
+
+    def _boot_catalog(self):
+        def platform_of(entry):
+            return PLATFORM_EFI if entry["platform"].lower() == "efi" else PLATFORM_BIOS
+
+        def boot_entry(node):
+            # No emulation; the count is in 512-byte virtual sectors
+            count = min(0xFFFF, max(1, math.ceil(node.size / 512)))
+            return struct.pack("<BBHBBHI20x", 0x88, 0, 0, 0, 0, count, node.data_lba)
+
+        first_node, first = self.boot_nodes[0]
+        validation = bytearray(struct.pack("<BBH24sHBB", 1, platform_of(first), 0,
+                                           _pad(b"FLAMES NT", 24, b"\x00"), 0, 0x55, 0xAA))
+        checksum = -sum(struct.unpack("<16H", validation)) & 0xFFFF
+        validation[28:30] = struct.pack("<H", checksum)
+
+        catalog = bytearray(validation) + boot_entry(first_node)
+        rest = self.boot_nodes[1:]
+        for i, (node, entry) in enumerate(rest):
+            indicator = 0x91 if i == len(rest) - 1 else 0x90
+            catalog += struct.pack("<BBH28s", indicator, platform_of(entry), 1, b"\x00" * 28)
+            catalog += boot_entry(node)
+        return bytes(catalog).ljust(SECTOR, b"\x00")
+
+    def _udf_directory(self, node):
+        """File identifiers of one directory, parent entry first"""
+        location = node.udf_data - udf.PARTITION_START
+        parent = node.parent
+        data = bytearray(udf.file_identifier(location, b"", parent.udf_entry - udf.PARTITION_START,
+                                             parent.udf_id, True, parent=True))
+        for child in self._sorted_children(node, "udf"):
+            data += udf.file_identifier(location + len(data) // SECTOR, child.names["udf"],
+                                        child.udf_entry - udf.PARTITION_START, child.udf_id, child.is_dir)
+        return bytes(data)
+
+    def _udf_structures(self):
+        """The partition's file set, file entries and directories, from PARTITION_START"""
+        created = self.timestamp if self.timestamp is not None else self._now
+        data = bytearray(udf.file_set(self.volume_id, created, self.root.udf_entry - udf.PARTITION_START))
+        for node in self.dirs["udf"]:
+            links = 1 + sum(1 for c in node.children if c.is_dir)
+            data += udf.file_entry(node.udf_entry - udf.PARTITION_START, True, node.udf_size,
+                                   node.udf_data - udf.PARTITION_START, links, node.udf_id, self._stamp_for(node))
+            data += udf.block(self._udf_directory(node))
+            for child in self._sorted_children(node, "udf"):
+                if not child.is_dir:
+                    data += udf.file_entry(child.udf_entry - udf.PARTITION_START, False, child.size,
+                                           child.data_lba - udf.PARTITION_START, 1, child.udf_id,
+                                           self._stamp_for(child))
+        return bytes(data)
+
+    def _metadata(self):
+        """Everything before the first file extent"""
+        image = bytearray(self.data_lba * SECTOR)
+
+        def place(lba, data):
+            image[lba * SECTOR:lba * SECTOR + len(data)] = data
+
+        place(self.pvd_lba, self._volume_descriptor("iso"))
+        if self.boot_record_lba is not None:
+            place(self.boot_record_lba, self._boot_record())
+        place(self.joliet_lba, self._volume_descriptor("joliet"))
+        place(self.terminator_lba, b"\xffCD001\x01")
+        place(self.recognition_lba, udf.recognition_sequence())
+        if self.catalog_lba is not None:
+            place(self.catalog_lba, self._boot_catalog())
+
+        created = self.timestamp if self.timestamp is not None else self._now
+        for start in (udf.MAIN_VDS, udf.RESERVE_VDS):
+            place(start, udf.volume_descriptors(start, self.volume_id, created, self.partition_length))
+        place(udf.INTEGRITY_LBA, udf.integrity_sequence(created, self.next_unique_id, self.partition_length,
+                                                        len(self.files), len(self.dirs["udf"])))
+        place(udf.ANCHOR_LBA, udf.anchor(udf.ANCHOR_LBA))
+        place(udf.PARTITION_START, self._udf_structures())
+
+        for hierarchy in ("iso", "joliet"):
+            size, l_lba, m_lba = self.path_tables[hierarchy]
+            place(l_lba, self._path_table(hierarchy, False))
+            place(m_lba, self._path_table(hierarchy, True))
+            for node in self.dirs[hierarchy]:
+                place(node.lba[hierarchy], self._directory_extent(node, hierarchy))
+        return bytes(image)
+
+    # -- output -----------------------------------------------------------
+
+    def write(self, dest):
+        """Write the image to dest (via dest.part); returns the image size in bytes"""
+        self._now = time.time()
+        total = self._layout()
+        metadata = self._metadata()
+        if len(metadata) != self.data_lba * SECTOR:
+            raise IsoError("Internal layout mismatch")
+
+        part = dest + ".part"
+        fd = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            preallocate(fd, total)
+            self._buffer = bytearray(MAX_CHUNK)
+            self.written = 0
+            self._write_all(fd, metadata, total)
+            for node in self.files:
+                if self.cancel_check():
+                    raise IsoError("Image creation cancelled")
+                self._copy_file(fd, node, total)
+                padding = _sectors(node.size) * SECTOR - node.size
+                if padding:
+                    self._write_all(fd, bytes(padding), total)
+            self._write_all(fd, udf.block(udf.anchor(self.anchor_lba)), total)
+            os.ftruncate(fd, total)
+        except BaseException:
+            os.close(fd)
+            os.remove(part)
+            raise
+        os.close(fd)
+        os.replace(part, dest)
+        return total
+
+    def _write_all(self, fd, data, total):
+        view = memoryview(data)
+        while view:
+            n = os.write(fd, view)
+            view = view[n:]
+            self._advance(n, total)
+
+    def _copy_file(self, fd, node, total):
+        remaining = node.size
+        with open(node.path, "rb") as src:
+            # In-kernel copy where available; the file positions advance just like write()
+            if hasattr(os, "copy_file_range"):
+                try:
+                    while remaining:
+                        if self.cancel_check():
+                            raise IsoError("Image creation cancelled")
+                        n = os.copy_file_range(src.fileno(), fd, min(remaining, COPY_CHUNK))
+                        if not n:
+                            break
+                        remaining -= n
+                        self.copy_file_range_used = True
+                        self._advance(n, total)
+                except OSError:
+                    # Cross-device on older kernels, or a filesystem without support
+                    src.seek(node.size - remaining)
+            view = memoryview(self._buffer)
+            while remaining:
+                n = src.readinto(view[:min(remaining, len(view))])
+                if not n:
+                    break
+                self._write_all(fd, view[:n], total)
+                remaining -= n
+        if remaining:
+            raise IsoError(f"{node.path} shrank while it was being written")
+
+    def _advance(self, n, total):
+        self.written += n
+        self._progress(self.written, total)
+
+
+def windows_boot_entries(src_dir):
+    """El Torito entries for the BIOS/UEFI boot images a Windows media tree ships"""
+    entries = []
+    for relpath, platform in WINDOWS_BOOT:
+        if os.path.isfile(os.path.join(src_dir, *relpath.split("/"))):
+            entries.append({"path": relpath, "platform": platform})
+    return entries
+
+
+def create_iso(src_dir, dest, volume_id="FLAMESNT", boot=None, timestamp=None,
+               progress_callback=None, cancel_check=None):
+    """Build dest from src_dir; Windows boot images are picked up automatically"""
+    if boot is None:
+        boot = windows_boot_entries(src_dir)
+    writer = IsoWriter(volume_id, boot, timestamp, progress_callback, cancel_check)
+    writer.add_tree(src_dir)
+    return writer.write(dest)
@@ -0,0 +1,139 @@
+"""
+Flames NT job checkpoints 📌
+Persists how far a job got so a restarted process resumes at its first unfinished stage
+"""
+
+import json
+import os
+import re
+import time
+
+from flamespaths import data_dir
+
+METADATA = "metadata"
+TOOLS = "tools"
+PAYLOADS = "payloads"
+MEDIA = "media"
+IMAGE = "image"
+MOUNTED = "mounted"
+
+# In order; finishing a stage invalidates nothing before it, redoing one drops everything after it
+STAGES = (METADATA, TOOLS, PAYLOADS, MEDIA, IMAGE, MOUNTED)
+
+
+class JobStateError(RuntimeError):
+    pass
+
+
+def tree_bytes(path):
+    """Total size of the files under path (0 if it doesn't exist)"""
+    total = 0
+    for folder, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+def file_matches(path, size):
+    """For checkpoint validators: the file is still there with the size we recorded"""
+    return bool(path) and os.path.isfile(path) and os.path.getsize(path) == size
+
+
+class JobState:
+    """Checkpoint file for one build/edition selection
+
+    Each completed stage is stored with whatever data later stages (or a
+    resumed process) need, e.g. the resolved build_info or the ISO path.
+    Writes go through a temp file and os.replace so a crash mid-write never
+    leaves a half-written checkpoint.
+    """
+
+    def __init__(self, build, edition, root=None, cancel_check=None):
+        self.root = root or os.path.join(data_dir(), "jobs", "state")
+        os.makedirs(self.root, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{build}_{edition}")
+        self.path = os.path.join(self.root, f"{name}.json")
+        self.cancel_check = cancel_check or (lambda: False)
+        self.stages = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.stages = json.load(f).get("stages", {})
+        except (OSError, ValueError):
+            self.stages = {}
+        if self.finished():
+            # A job that ran to the end starts over (a newer build may be out)
+            self.reset()
+
+    def done(self, stage):
+        return stage in self.stages
+
+    def data(self, stage):
+        return self.stages.get(stage, {}).get("data", {})
+
+    def next_stage(self):
+        """First stage not yet completed, or None when the job is finished"""
+        for stage in STAGES:
+            if stage not in self.stages:
+                return stage
+        return None
+
+    def finished(self):
+        return self.next_stage() is None
+
+    def complete(self, stage, **data):
+        if stage not in STAGES:
+            raise JobStateError(f"Unknown stage {stage}")
+        if self.cancel_check():
+            return
+        self.stages[stage] = {"at": time.time(), "data": data}
+        self._save()
+
+    def invalidate(self, stage):
+        """Forget stage and every stage after it"""
+        for later in STAGES[STAGES.index(stage):]:
+            self.stages.pop(later, None)
+        self._save()
+
+    def reset(self):
+        self.stages = {}
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def step(self, stage, func, valid=None):
+        """Return the checkpointed data for stage, or run func() and checkpoint its dict
+
+        valid(data) re-checks a recorded stage against the disk (e.g. the ISO
+        still exists); when it fails, the stage and everything after it rerun.
+        """
+        if self.done(stage):
+            if valid is None or valid(self.data(stage)):
+                return self.data(stage)
+            self.invalidate(stage)
+        data = func() or {}
+        self.complete(stage, **data)
+        return data
+
+    def step_image(self, create):
+        """IMAGE stage for every front end: create() returns the ISO path
+
+        The checkpoint records the file's size, so an image cut short by a
+        crash mid-write is rebuilt on resume instead of being trusted.
+        """
+        def run():
+            iso = create()
+            return {"iso": iso, "size": os.path.getsize(iso)}
+
+        return self.step(IMAGE, run, valid=lambda data: file_matches(data.get("iso"), data.get("size"))).get("iso")
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stages}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
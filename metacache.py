@@ -0,0 +1,116 @@
+"""
+Flames NT metadata cache 🗂️
+Serves UUP dump API answers from disk and revalidates them in the background
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from bandwidth import METADATA, get_scheduler
+from flamespaths import data_dir
+from httpsession import get_session
+
+# How long an answer stays fresh, per channel/ring (seconds)
+CHANNEL_TTLS = {
+    "Canary": 10 * 60,
+    "WIF": 10 * 60,
+    "Dev": 60 * 60,
+    "WIS": 60 * 60,
+    "Beta": 6 * 60 * 60,
+    "RP": 6 * 60 * 60,
+    "Production": 24 * 60 * 60,
+    "RETAIL": 24 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+
+
+class MetadataCache:
+    def __init__(self, root=None, ttls=None, timeout=None):
+        self.root = root or os.path.join(data_dir(), "metadata")
+        self.ttls = dict(CHANNEL_TTLS, **(ttls or {}))
+        self.timeout = timeout
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def get_json(self, url, params=None, channel=None):
+        """Return the JSON answer for url/params, from disk whenever possible
+
+        Fresh entries are returned as-is. Stale entries are returned
+        immediately while a conditional request refreshes them in the
+        background. Only a cold cache waits on the network.
+        """
+        key = self._key(url, params)
+        entry = self._load(key)
+        if entry is None:
+            return self._refresh(key, url, params, None)["body"]
+
+        age = time.time() - entry.get("fetched_at", 0)
+        if age > self.ttls.get(channel, DEFAULT_TTL):
+            self.refresh_async(url, params)
+        return entry["body"]
+
+    def refresh_async(self, url, params=None):
+        key = self._key(url, params)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def worker():
+            try:
+                self._refresh(key, url, params, self._load(key))
+            except Exception:
+                pass  # keep serving the stale copy
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _refresh(self, key, url, params, entry):
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        # Metadata outranks every bulk transfer in the bandwidth scheduler
+        with get_scheduler().active(METADATA):
+            response = get_session().get(url, params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and entry:
+            entry["fetched_at"] = time.time()
+        else:
+            response.raise_for_status()
+            entry = {
+                "url": url,
+                "params": params,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+                "body": response.json(),
+            }
+        self._save(key, entry)
+        return entry
+
+    def _key(self, url, params):
+        raw = json.dumps([url, params or {}], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _load(self, key):
+        try:
+            with open(os.path.join(self.root, key + ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, key, entry):
+        path = os.path.join(self.root, key + ".json")
+        tmp = path + f".{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
@@ -0,0 +1,176 @@
+"""
+Flames NT mirror racing 🏁
+Probes every source at once, downloads from the fastest and hops if it stalls
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bandwidth import TOOLS, get_scheduler
+from httpsession import get_session
+from segdownloader import DownloadCancelled
+from segjournal import SegmentJournal
+from writepath import MAX_CHUNK, AdaptiveBuffer, ProgressThrottle, open_for_write, pwrite_all, raw_readinto
+
+
+class MirrorSelector:
+    def __init__(self, urls, sample_bytes=256 * 1024, probe_timeout=(5, 5),
+                 collapse_ratio=0.25, window=3.0, chunk_size=256 * 1024, max_chunk_size=MAX_CHUNK,
+                 status_callback=None, progress_callback=None, cancel_check=None,
+                 priority=TOOLS):
+        self.urls = list(urls)
+        self.sample_bytes = sample_bytes
+        self.probe_timeout = probe_timeout
+        # Switch when a mirror drops below collapse_ratio of its probed speed for `window` seconds
+        self.collapse_ratio = collapse_ratio
+        self.window = window
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.update_status = status_callback or (lambda msg: None)
+        self.progress_callback = progress_callback
+        self._progress = ProgressThrottle(progress_callback)
+        self.cancel_check = cancel_check or (lambda: False)
+        self.priority = priority
+        self.results = []
+
+    def probe(self, url):
+        """First-byte latency and a short throughput sample for one mirror"""
+        result = {"url": url, "ok": False, "ttfb": None, "throughput": 0.0,
+                  "size": 0, "ranges": False, "final_url": url}
+        started = time.monotonic()
+        try:
+            with get_session().get(url, headers={"Range": f"bytes=0-{self.sample_bytes - 1}"},
+                                   stream=True, timeout=self.probe_timeout) as response:
+                response.raise_for_status()
+                result["final_url"] = response.url
+                result["ranges"] = response.status_code == 206
+                if result["ranges"]:
+                    total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+                    result["size"] = int(total) if total.isdigit() else 0
+                else:
+                    result["size"] = int(response.headers.get("Content-Length", 0))
+
+                received = 0
+                first_byte = None
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if first_byte is None:
+                        first_byte = time.monotonic()
+                    received += len(chunk)
+                    if received >= self.sample_bytes:
+                        break
+                if first_byte is None:
+                    return result
+                elapsed = max(time.monotonic() - first_byte, 1e-3)
+                result["ttfb"] = first_byte - started
+                result["throughput"] = received / elapsed
+                result["ok"] = True
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    def rank(self):
+        """Probe every mirror concurrently, fastest first"""
+        with ThreadPoolExecutor(max_workers=len(self.urls)) as pool:
+            results = list(pool.map(self.probe, self.urls))
+        self.results = sorted(
+            results,
+            key=lambda r: (not r["ok"], -r["throughput"], r["ttfb"] if r["ttfb"] is not None else 1e9)
+        )
+        return self.results
+
+    def download(self, dest):
+        """Download dest from the best mirror, switching mid-transfer if it collapses"""
+        mirrors = [r for r in self.rank() if r["ok"]]
+        if not mirrors:
+            raise RuntimeError("No mirror reachable: " + ", ".join(self.urls))
+
+        part = dest + ".part"
+        size = mirrors[0]["size"]
+        journal = SegmentJournal.load(part, size, mirrors[0]["url"]) if size else None
+        offset = 0
+        if journal and journal.done and journal.done[0][0] == 0:
+            offset = journal.done[0][1] + 1
+        with open(part, "r+b" if offset else "wb"):
+            pass
+
+        last_error = None
+        for index, mirror in enumerate(mirrors):
+            if index:
+                self.update_status(f"Switching to mirror {mirror['url'].split('/')[2]} 🔀")
+            if mirror["size"] != size or not mirror["ranges"]:
+                # Bytes from another mirror can only be spliced onto an identical file; start
+                # over with an empty part so no tail of the other file survives past the new size
+                offset = 0
+                size = mirror["size"]
+                if journal:
+                    journal.remove()
+                with open(part, "wb"):
+                    pass
+                journal = SegmentJournal(part, size, mirror["url"]) if size else None
+            try:
+                offset, finished = self._stream(mirror, part, offset, size, journal,
+                                                 can_switch=index + 1 < len(mirrors))
+            except DownloadCancelled:
+                raise
+            except Exception as e:
+                last_error = e
+                continue
+            if finished:
+                os.replace(part, dest)
+                if journal:
+                    journal.remove()
+                return mirror["url"]
+            last_error = RuntimeError(f"{mirror['url']} stalled at byte {offset}")
+
+        raise RuntimeError(f"All mirrors failed: {last_error}")
+
+    def _stream(self, mirror, part, offset, size, journal, can_switch):
+        """Stream from one mirror; returns (offset, finished) and stops early if it collapses"""
+        headers = {"Range": f"bytes={offset}-"} if offset and mirror["ranges"] else {}
+        scheduler = get_scheduler()
+        floor = mirror["throughput"] * self.collapse_ratio
+        window_start = time.monotonic()
+        window_bytes = 0
+        checkpoint = offset
+
+        with scheduler.active(self.priority), \
+                get_session().get(mirror["final_url"], headers=headers, stream=True) as response:
+            response.raise_for_status()
+            if headers:
+                # A server that ignores the Range sends the file from byte 0; never write that at offset
+                start = response.headers.get("Content-Range", "").partition(" ")[2].split("-")[0]
+                if response.status_code != 206 or start != str(offset):
+                    raise RuntimeError(f"{mirror['url']} ignored the range request for byte {offset}")
+            readinto = raw_readinto(response)
+            buf = AdaptiveBuffer(self.chunk_size, self.max_chunk_size)
+            fd = open_for_write(part)
+            try:
+                while True:
+                    if self.cancel_check():
+                        raise DownloadCancelled("Download cancelled")
+                    data = buf.fill(readinto)
+                    if not data:
+                        break
+                    pwrite_all(fd, data, offset)
+                    offset += len(data)
+                    window_bytes += len(data)
+                    self._progress(offset, size)
+                    throttled = time.monotonic()
+                    scheduler.throttle(len(data), self.priority)
+                    # Time held back by the rate limit says nothing about the mirror
+                    window_start += time.monotonic() - throttled
+
+                    elapsed = time.monotonic() - window_start
+                    if elapsed >= self.window:
+                        if can_switch and mirror["ranges"] and window_bytes / elapsed < floor:
+                            return offset, False
+                        window_start = time.monotonic()
+                        window_bytes = 0
+            finally:
+                if journal and offset > checkpoint:
+                    os.fsync(fd)
+                    journal.mark(checkpoint, offset - 1)
+                os.close(fd)
+
+        return offset, not size or offset >= size
@@ -0,0 +1,244 @@
+"""
+Flames NT output watcher 👀
+Learns which image a converter produced the moment it is closed, instead of walking the tree afterwards
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct("iIII")
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_libc()
+
+
+def scan(roots, suffix, recursive=True):
+    """{path: (size, mtime_ns)} of matching files under roots, via scandir"""
+    found = {}
+    stack = [r for r in roots if os.path.isdir(r)]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                stack.append(entry.path)
+                        elif entry.name.lower().endswith(suffix):
+                            st = entry.stat()
+                            found[entry.path] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return found
+
+
+class OutputWatcher:
+    """Collects files ending in `suffix` that are written under roots after start()
+
+    On Linux an inotify watch per directory reports each file as it is
+    closed (or renamed into place), so the result is known with no scan and
+    can't be a stale image from an earlier run. Elsewhere, or if inotify is
+    unavailable or overflows, start() snapshots the matching files and
+    results() rescans with scandir and reports what is new or changed.
+    Directories inotify refused to watch (usually the watch limit) are kept
+    in `errors` as OSErrors and covered by that rescan.
+    """
+
+    def __init__(self, roots, suffix=".iso", recursive=True):
+        self.roots = [os.path.abspath(r) for r in (roots if isinstance(roots, (list, tuple)) else [roots])]
+        self.suffix = suffix.lower()
+        self.recursive = recursive
+        self.using_inotify = False
+        self.errors = []
+        self._fd = None
+        self._watches = {}
+        self._found = {}
+        self._baseline = None
+        self._rescan = False
+        self._started = None
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._started = time.time()
+        for root in self.roots:
+            os.makedirs(root, exist_ok=True)
+        if _libc is not None:
+            fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+                # Written to by stop() so the reader wakes at once instead of on its next poll
+                self._wake_r, self._wake_w = os.pipe()
+                self.using_inotify = True
+                for root in self.roots:
+                    self._watch_tree(root)
+                if self.errors:
+                    # Part of the tree is unwatched: snapshot now so the rescan knows what's stale
+                    self._baseline = scan(self.roots, self.suffix, self.recursive)
+                self._thread = threading.Thread(target=self._read_loop, name="output-watch", daemon=True)
+                self._thread.start()
+                return self
+        self._baseline = scan(self.roots, self.suffix, self.recursive)
+        return self
+
+    def stop(self):
+        """Stop watching; returns results()"""
+        if self._thread:
+            self._stop.set()
+            os.write(self._wake_w, b"\0")
+            self._thread.join()
+            self._thread = None
+            for fd in (self._fd, self._wake_r, self._wake_w):
+                os.close(fd)
+            self._fd = None
+        return self.results()
+
+    def results(self):
+        """Paths of output files written since start(), oldest first"""
+        if self._baseline is not None or self._rescan:
+            current = scan(self.roots, self.suffix, self.recursive)
+            if self._baseline is not None:
+                fresh = {p: s for p, s in current.items() if self._baseline.get(p) != s}
+            else:
+                # inotify missed events and there is no snapshot: anything modified since start()
+                fresh = {p: s for p, s in current.items() if s[1] / 1e9 >= self._started - 1}
+            with self._cond:
+                for path, (_, mtime_ns) in fresh.items():
+                    self._found.setdefault(path, mtime_ns / 1e9)
+        with self._cond:
+            found = [p for p in sorted(self._found, key=self._found.get) if os.path.isfile(p)]
+        return found
+
+    def newest(self):
+        found = self.results()
+        return found[-1] if found else None
+
+    def wait(self, timeout=None):
+        """Block until an output file lands (inotify only); returns its path or None"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._found and self.using_inotify and not self._stop.is_set():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining if remaining is not None else 0.5)
+        found = self.results()
+        return found[-1] if found else None
+
+    # -- inotify ----------------------------------------------------------
+
+    def _add_watch(self, path):
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_ONLYDIR | (IN_CREATE if self.recursive else 0)
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            self.errors.append(OSError(errno, os.strerror(errno), path))
+            self._rescan = True
+            return
+        self._watches[wd] = path
+
+    def _watch_tree(self, root):
+        self._add_watch(root)
+        if not self.recursive:
+            return
+        # Directories only; files are never walked
+        stack = [root]
+        while stack:
+            folder = stack.pop()
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            self._add_watch(entry.path)
+                            stack.append(entry.path)
+            except OSError:
+                pass
+
+    def _read_loop(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd, self._wake_r], [], [])
+            if self._fd in ready and not self._read_events():
+                break
+        # Events queued before stop() still count
+        self._read_events()
+
+    def _read_events(self):
+        """Handle everything queued on the inotify fd; False once it's unusable"""
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return True
+            except OSError:
+                return False
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\x00")
+                offset += _EVENT.size + length
+                self._handle(wd, mask, os.fsdecode(name))
+
+    def _handle(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped; fall back to a rescan when results are collected
+            self._rescan = True
+            return
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return
+        folder = self._watches.get(wd)
+        if folder is None or not name:
+            return
+        path = os.path.join(folder, name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO) and self.recursive:
+                self._watch_tree(path)
+                # Anything finished inside before the watch existed
+                for found in scan([path], self.suffix):
+                    self._record(found)
+            return
+        if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and name.lower().endswith(self.suffix):
+            self._record(path)
+
+    def _record(self, path):
+        with self._cond:
+            self._found[path] = time.time()
+            self._cond.notify_all()
@@ -0,0 +1,70 @@
+"""
+Flames NT payload store 📦
+Content-addressed cache of UUP payloads, shared by every build and edition
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from flamespaths import data_dir
+
+
+class PayloadStore:
+    def __init__(self, root=None):
+        self.root = root or os.path.join(data_dir(), "store")
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, sha1):
+        sha1 = sha1.lower()
+        return os.path.join(self.root, "sha1", sha1[:2], sha1)
+
+    def has(self, sha1):
+        return bool(sha1) and os.path.isfile(self.path_for(sha1))
+
+    def link_into(self, sha1, dest):
+        """Hardlink a stored payload to dest (copying if links aren't possible)"""
+        src = self.path_for(sha1)
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        if os.path.lexists(dest):
+            if os.path.exists(dest) and os.path.samefile(src, dest):
+                return dest
+            os.remove(dest)
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
+        return dest
+
+    def add(self, path, sha1, verified=False):
+        """Put a downloaded file into the store under its published hash"""
+        if not sha1:
+            return False
+        if self.has(sha1):
+            return True
+        if not verified and file_sha1(path) != sha1.lower():
+            return False
+
+        target = self.path_for(sha1)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Unique per call, so two threads storing the same digest never share a temp name
+        fd, tmp = tempfile.mkstemp(prefix=f"{sha1.lower()}.", suffix=".tmp", dir=os.path.dirname(target))
+        os.close(fd)
+        os.remove(tmp)
+        try:
+            os.link(path, tmp)
+        except OSError:
+            shutil.copyfile(path, tmp)
+        # No chmod: the inode is shared with the job's own copy, which must stay
+        # removable. Nothing edits payloads in place; downloads land via os.replace
+        os.replace(tmp, target)
+        return True
+
+
+def file_sha1(path, block_size=4 * 1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
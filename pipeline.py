@@ -0,0 +1,169 @@
+"""
+Flames NT job pipeline 🔀
+Runs a job as a DAG of tasks so disk and CPU work overlaps with downloads
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class PipelineError(RuntimeError):
+    pass
+
+
+class Task:
+    def __init__(self, name, func, deps, resource, group):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.resource = resource
+        self.group = group
+        self.state = PENDING
+        self.result = None
+        self.error = None
+
+
+class Pipeline:
+    """Tasks start as soon as their dependencies finish, each on its resource's pool
+
+    A dependency is either a task name or "group:<name>", which waits for
+    every task added to that group so far. Tasks may add more tasks while
+    the pipeline runs (e.g. one post-processing task per downloaded file);
+    as long as the producer is also a dependency, the group is complete by
+    the time the producer is.
+    """
+
+    def __init__(self, workers=None, status_callback=None, cancel_check=None):
+        self.workers = {"net": 2, "disk": 2, "cpu": os.cpu_count() or 2}
+        self.workers.update(workers or {})
+        self.update_status = status_callback or (lambda msg: None)
+        self.cancel_check = cancel_check or (lambda: False)
+        self.tasks = {}
+        self._pools = {}
+        self._cond = threading.Condition()
+        self._running = False
+        self._failed = None
+
+    def add(self, name, func, deps=(), resource="cpu", group=None):
+        with self._cond:
+            if name in self.tasks:
+                raise PipelineError(f"Duplicate task {name}")
+            for dep in deps:
+                if not dep.startswith("group:") and dep not in self.tasks:
+                    raise PipelineError(f"{name} depends on unknown task {dep}")
+            self.tasks[name] = Task(name, func, deps, resource, group)
+            if self._running:
+                self._schedule()
+        return name
+
+    def result(self, name):
+        return self.tasks[name].result
+
+    def stopping(self):
+        """True once a task has failed or the job was cancelled
+
+        Long tasks (the payload download) pass this as their own cancel
+        check, so a failed stage stops them instead of waiting them out.
+        """
+        return self._failed is not None or self.cancel_check()
+
+    def fail(self, name, error):
+        """Fail the run with an error raised outside any task, e.g. while a task was being added"""
+        with self._cond:
+            self._fail(Task(name, None, (), None, None), error)
+            self._schedule()
+            self._cond.notify_all()
+
+    def run(self):
+        """Run every task; returns {name: result} or raises the first failure"""
+        with self._cond:
+            self._running = True
+            self._schedule()
+            while True:
+                active = any(t.state == RUNNING for t in self.tasks.values())
+                pending = any(t.state == PENDING for t in self.tasks.values())
+                if not active and (not pending or self._failed):
+                    break
+                if not active and not self._schedule():
+                    raise PipelineError("Dependency cycle between: " + ", ".join(
+                        t.name for t in self.tasks.values() if t.state == PENDING))
+                # Also wakes up periodically to notice cancellation
+                self._cond.wait(0.5)
+            self._running = False
+
+        for pool in self._pools.values():
+            pool.shutdown(wait=True)
+        self._pools.clear()
+        if self._failed:
+            raise self._failed.error
+        return {name: task.result for name, task in self.tasks.items()}
+
+    # -- internals --------------------------------------------------------
+
+    def _ready(self, task):
+        for dep in task.deps:
+            if dep.startswith("group:"):
+                group = dep[len("group:"):]
+                if any(t.group == group and t.state != DONE for t in self.tasks.values()):
+                    return False
+            elif self.tasks[dep].state != DONE:
+                return False
+        return True
+
+    def _schedule(self):
+        """Start every ready task (caller holds the lock); returns how many started"""
+        if not self._failed and self.cancel_check():
+            self._fail(None, PipelineError("Job cancelled"))
+        if self._failed:
+            for task in self.tasks.values():
+                if task.state == PENDING:
+                    task.state = SKIPPED
+            return 0
+
+        started = 0
+        for task in list(self.tasks.values()):
+            if task.state == PENDING and self._ready(task):
+                task.state = RUNNING
+                self._pool(task.resource).submit(self._execute, task)
+                started += 1
+        return started
+
+    def _pool(self, resource):
+        pool = self._pools.get(resource)
+        if pool is None:
+            pool = self._pools[resource] = ThreadPoolExecutor(
+                max_workers=self.workers.get(resource, 1), thread_name_prefix=f"pipeline-{resource}"
+            )
+        return pool
+
+    def _execute(self, task):
+        try:
+            result = task.func()
+        except BaseException as e:
+            with self._cond:
+                task.state = FAILED
+                task.error = e
+                self._fail(task, e)
+                self._schedule()
+                self._cond.notify_all()
+            return
+        with self._cond:
+            task.result = result
+            task.state = DONE
+            self._schedule()
+            self._cond.notify_all()
+
+    def _fail(self, task, error):
+        if self._failed is None:
+            if task is None:
+                task = Task("cancel", None, (), None, None)
+            task.state = FAILED
+            task.error = error
+            self._failed = task
@@ -0,0 +1,86 @@
+"""
+Flames NT download planner 🧮
+Dedupes a UUP file list and spreads it over connections so every slot finishes together
+"""
+
+import heapq
+import os
+import shutil
+
+
+class Plan:
+    def __init__(self, order, duplicates, lanes):
+        # Largest first, each entry carrying its planned "connections"
+        self.order = order
+        # (entry, original) pairs whose bytes are copied from another entry in the set
+        self.duplicates = duplicates
+        # Bytes assigned to each connection; the largest is the expected makespan
+        self.lanes = lanes
+
+    @property
+    def makespan(self):
+        return max(self.lanes) if self.lanes else 0
+
+    @property
+    def balance(self):
+        """Average lane load over the busiest lane (1.0 means all slots finish together)"""
+        return sum(self.lanes) / (len(self.lanes) * self.makespan) if self.makespan else 1.0
+
+
+def dedupe(files):
+    """Drop repeated names and map repeated content onto one download"""
+    unique, duplicates = [], []
+    names = set()
+    by_hash = {}
+    for entry in files:
+        if entry["name"] in names:
+            continue
+        names.add(entry["name"])
+        key = (entry.get("sha1") or entry.get("sha256") or "").lower()
+        if key and key in by_hash:
+            duplicates.append((entry, by_hash[key]))
+            continue
+        if key:
+            by_hash[key] = entry
+        unique.append(entry)
+    return unique, duplicates
+
+
+def plan(files, connections, max_per_file=16, min_segment_size=4 * 1024 * 1024):
+    """Largest-first order with size-aware connection counts, packed onto `connections` lanes
+
+    Each file is split across however many of the least loaded lanes
+    finishes it earliest, so one huge ESD can't become the tail; smaller
+    files are packed LPT-style onto whichever lane frees up first.
+    """
+    unique, duplicates = dedupe(files)
+    connections = max(1, connections)
+    order = []
+    lanes = [(0, i) for i in range(connections)]
+    for entry in sorted(unique, key=lambda e: e.get("size") or 0, reverse=True):
+        size = entry.get("size") or 0
+        # Use however many of the least loaded lanes gives the earliest finish
+        widest = max(1, min(max_per_file, connections, size // min_segment_size))
+        candidates = heapq.nsmallest(widest, lanes)
+        count = min(range(1, widest + 1), key=lambda k: candidates[k - 1][0] + size / k)
+        order.append(dict(entry, connections=count))
+        # Each segment lands on a different currently-least-loaded lane
+        taken = [heapq.heappop(lanes) for _ in range(count)]
+        for load, lane in taken:
+            heapq.heappush(lanes, (load + size / count, lane))
+
+    return Plan(order, duplicates, [load for load, _ in sorted(lanes, key=lambda item: item[1])])
+
+
+def link_duplicates(duplicates, dest_dir):
+    """Materialise repeated content from the copy that was actually downloaded"""
+    for entry, original in duplicates:
+        src = os.path.join(dest_dir, original["name"])
+        dest = os.path.join(dest_dir, entry["name"])
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        if os.path.lexists(dest):
+            os.remove(dest)
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
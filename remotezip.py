@@ -0,0 +1,248 @@
+"""
+Flames NT remote zip reader 🗜️
+Pulls single members out of a zip over HTTP Range requests, inflating straight to disk
+"""
+
+import os
+import struct
+import zlib
+
+from bandwidth import TOOLS, get_scheduler
+from httpsession import get_session
+from segdownloader import DownloadCancelled
+from writepath import ProgressThrottle
+
+EOCD_SIG = b"PK\x05\x06"
+ZIP64_LOCATOR_SIG = b"PK\x06\x07"
+ZIP64_EOCD_SIG = b"PK\x06\x06"
+CENTRAL_SIG = b"PK\x01\x02"
+LOCAL_SIG = b"PK\x03\x04"
+
+# EOCD (22 bytes) plus the longest possible archive comment
+TAIL_BYTES = 22 + 0xFFFF
+STORED = 0
+DEFLATED = 8
+
+
+class RemoteZipError(RuntimeError):
+    pass
+
+
+class RangeNotSupported(RemoteZipError):
+    pass
+
+
+class RemoteZip:
+    """Central directory of a zip on an HTTP server; members are fetched one at a time"""
+
+    def __init__(self, url, timeout=None, chunk_size=256 * 1024, priority=TOOLS,
+                 progress_callback=None, cancel_check=None):
+        self.url = url
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.priority = priority
+        self.scheduler = get_scheduler()
+        self._progress = ProgressThrottle(progress_callback)
+        self.cancel_check = cancel_check or (lambda: False)
+        self.size = 0
+        self.members = []
+        self.fetched = 0
+        self._cd_offset = 0
+        self._load_directory()
+
+    def find(self, suffix):
+        """First member whose name ends with suffix (case-insensitive)"""
+        suffix = suffix.lower()
+        for member in self.members:
+            if member["name"].lower().endswith(suffix):
+                return member
+        return None
+
+    def extract(self, member, dest):
+        """Inflate one member to dest, checking its CRC; returns dest"""
+        if member["flags"] & 0x1:
+            raise RemoteZipError(f"{member['name']} is encrypted")
+        if member["method"] not in (STORED, DEFLATED):
+            raise RemoteZipError(f"{member['name']} uses unsupported compression method {member['method']}")
+
+        # Local header extras can differ from the central copy, so read up to the next
+        # structure and parse the real header from the start of the stream
+        start = member["offset"]
+        end = min(self._next_offset(start), start + 30 + 0xFFFF * 2 + member["csize"]) - 1
+        part = dest + ".part"
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        inflater = zlib.decompressobj(-15) if member["method"] == DEFLATED else None
+        crc = 0
+        written = 0
+        with self.scheduler.active(self.priority), self._get(start, end) as response:
+            chunks = response.iter_content(chunk_size=self.chunk_size)
+            header, chunks = self._read_exact(chunks, 30)
+            if header[:4] != LOCAL_SIG:
+                raise RemoteZipError(f"Bad local header for {member['name']}")
+            name_len, extra_len = struct.unpack("<HH", header[26:30])
+            _, chunks = self._read_exact(chunks, name_len + extra_len)
+
+            remaining = member["csize"]
+            with open(part, "wb") as f:
+                for chunk in chunks:
+                    if self.cancel_check():
+                        raise DownloadCancelled("Download cancelled")
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                    self.fetched += len(chunk)
+                    data = inflater.decompress(chunk) if inflater else chunk
+                    f.write(data)
+                    crc = zlib.crc32(data, crc)
+                    written += len(data)
+                    self._progress(member["csize"] - remaining, member["csize"])
+                    self.scheduler.throttle(len(chunk), self.priority)
+                    if not remaining:
+                        break
+                if inflater:
+                    tail = inflater.flush()
+                    f.write(tail)
+                    crc = zlib.crc32(tail, crc)
+                    written += len(tail)
+
+        if remaining or written != member["usize"] or crc != member["crc"]:
+            os.remove(part)
+            raise RemoteZipError(f"{member['name']} failed its CRC/size check")
+        os.replace(part, dest)
+        return dest
+
+    # -- central directory ------------------------------------------------
+
+    def _load_directory(self):
+        # A suffix range returns the tail and the total size in one round trip
+        with self._get(None, TAIL_BYTES) as response:
+            tail = response.content
+        self.fetched += len(tail)
+        tail_start = self.size - len(tail)
+
+        pos = tail.rfind(EOCD_SIG)
+        if pos < 0 or len(tail) - pos < 22:
+            raise RemoteZipError(f"No end of central directory in {self.url}")
+        count, cd_size, cd_offset = struct.unpack("<6xHII", tail[pos + 4:pos + 20])
+
+        if 0xFFFFFFFF in (cd_size, cd_offset) or count == 0xFFFF:
+            locator = tail[pos - 20:pos] if pos >= 20 else b""
+            if locator[:4] != ZIP64_LOCATOR_SIG:
+                raise RemoteZipError("ZIP64 archive without a ZIP64 locator")
+            (eocd64_offset,) = struct.unpack("<Q", locator[8:16])
+            record = self._slice(tail, tail_start, eocd64_offset, 56)
+            if record[:4] != ZIP64_EOCD_SIG:
+                raise RemoteZipError("Bad ZIP64 end of central directory")
+            count, cd_size, cd_offset = struct.unpack("<QQQ", record[32:56])
+
+        self._cd_offset = cd_offset
+        directory = self._slice(tail, tail_start, cd_offset, cd_size)
+        self.members = self._parse_directory(directory, count)
+
+    def _parse_directory(self, data, count):
+        members = []
+        pos = 0
+        for _ in range(count):
+            if data[pos:pos + 4] != CENTRAL_SIG:
+                raise RemoteZipError("Corrupt central directory")
+            (flags, method, crc, csize, usize, name_len, extra_len, comment_len,
+             offset) = struct.unpack("<4xHH4xIIIHHH8xI", data[pos + 4:pos + 46])
+            name = data[pos + 46:pos + 46 + name_len]
+            extra = data[pos + 46 + name_len:pos + 46 + name_len + extra_len]
+            usize, csize, offset = self._zip64_sizes(extra, usize, csize, offset)
+            members.append({
+                "name": name.decode("utf-8" if flags & 0x800 else "cp437"),
+                "flags": flags,
+                "method": method,
+                "crc": crc,
+                "csize": csize,
+                "usize": usize,
+                "offset": offset,
+            })
+            pos += 46 + name_len + extra_len + comment_len
+        return members
+
+    @staticmethod
+    def _zip64_sizes(extra, usize, csize, offset):
+        """Apply the ZIP64 extra field, which only carries the fields that overflowed"""
+        pos = 0
+        while pos + 4 <= len(extra):
+            tag, length = struct.unpack("<HH", extra[pos:pos + 4])
+            if tag == 0x0001:
+                values = iter(struct.unpack(f"<{length // 8}Q", extra[pos + 4:pos + 4 + length // 8 * 8]))
+                if usize == 0xFFFFFFFF:
+                    usize = next(values)
+                if csize == 0xFFFFFFFF:
+                    csize = next(values)
+                if offset == 0xFFFFFFFF:
+                    offset = next(values)
+                break
+            pos += 4 + length
+        return usize, csize, offset
+
+    def _next_offset(self, offset):
+        later = [m["offset"] for m in self.members if m["offset"] > offset]
+        return min(later) if later else self._cd_offset
+
+    # -- HTTP -------------------------------------------------------------
+
+    def _slice(self, tail, tail_start, offset, length):
+        """Bytes offset..offset+length, from the tail we already hold when possible"""
+        if offset >= tail_start:
+            return tail[offset - tail_start:offset - tail_start + length]
+        with self._get(offset, offset + length - 1) as response:
+            data = response.content
+        self.fetched += len(data)
+        return data
+
+    def _get(self, start, end):
+        """Range GET; start=None asks for the last `end` bytes"""
+        spec = f"bytes=-{end}" if start is None else f"bytes={start}-{end}"
+        response = get_session().get(self.url, headers={"Range": spec}, stream=True, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise RangeNotSupported(f"{self.url} does not support Range requests")
+        except Exception:
+            response.close()
+            raise
+        # Later requests skip the redirect hop
+        self.url = response.url
+        total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+        if total.isdigit():
+            self.size = int(total)
+        return response
+
+    @staticmethod
+    def _read_exact(chunks, n):
+        """Take n bytes off a chunk iterator; returns (bytes, iterator over the rest)"""
+        buf = b""
+        chunks = iter(chunks)
+        while len(buf) < n:
+            chunk = next(chunks, b"")
+            if not chunk:
+                raise RemoteZipError("Archive ended early")
+            buf += chunk
+        rest = buf[n:]
+
+        def remainder():
+            if rest:
+                yield rest
+            yield from chunks
+        return buf[:n], remainder()
+
+
+def extract_member(urls, suffix, dest, **kwargs):
+    """Extract the first member ending in suffix from whichever URL supports ranges"""
+    last_error = None
+    for url in urls:
+        try:
+            archive = RemoteZip(url, **kwargs)
+            member = archive.find(suffix)
+            if member is None:
+                raise RemoteZipError(f"{suffix} not found in {url}")
+            return archive.extract(member, dest)
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            last_error = e
+    raise RemoteZipError(f"Could not extract {suffix}: {last_error}")
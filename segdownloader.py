@@ -0,0 +1,109 @@
+"""
+Flames NT segmented download steps 🌐
+The disk side of a multi-connection Range download: resume, segment, verify, store
+"""
+
+import os
+
+from hashstream import IntegrityError, verify_file
+from segjournal import SegmentJournal
+from writepath import ALIGN, preallocate
+
+
+class DownloadCancelled(RuntimeError):
+    pass
+
+
+# Everything here touches the disk, so asyncengine runs these in an executor
+
+def reuse_finished(dest, size, sha1=None, sha256=None):
+    """True if dest is already the finished file; a wrong one is removed so it's fetched again
+
+    The right size isn't proof: a file with a published hash is re-checked
+    before it's trusted (and later added to the payload store).
+    """
+    if not size or os.path.exists(dest + ".part") or not os.path.exists(dest) or os.path.getsize(dest) != size:
+        return False
+    if verify_file(dest, size, sha1, sha256):
+        return True
+    os.remove(dest)
+    return False
+
+
+def open_part(part, size, url):
+    """Journal for part, resuming an earlier attempt or preallocating a fresh file"""
+    os.makedirs(os.path.dirname(part) or ".", exist_ok=True)
+    if not size:
+        # No length means no Range support and nothing to resume from
+        with open(part, "wb"):
+            pass
+        return None
+    journal = SegmentJournal.load(part, size, url)
+    if not journal.done:
+        with open(part, "wb") as f:
+            preallocate(f.fileno(), size)
+    return journal
+
+
+def plan_segments(missing, lanes, min_segment_size):
+    """Split the journal's missing ranges into at most `lanes` block-aligned segments each"""
+    segments = []
+    for start, end in missing:
+        size = end - start + 1
+        count = min(lanes, max(1, size // min_segment_size))
+        # Keep segment boundaries block aligned so every large write is too
+        step = max(ALIGN, size // count // ALIGN * ALIGN)
+        count = min(count, max(1, size // step))
+        for i in range(count):
+            seg_start = start + i * step
+            segments.append((seg_start, end if i == count - 1 else seg_start + step - 1))
+    return segments
+
+
+def finish_part(hasher, part, dest, size=None, journal=None):
+    """Check the digests, then move the finished part into place
+
+    On a mismatch the part and its journal are discarded and IntegrityError
+    propagates, so only this file is fetched again.
+    """
+    if hasher:
+        try:
+            hasher.finish(os.path.getsize(part) if size is None else size)
+        except IntegrityError:
+            if journal:
+                journal.remove()
+            os.remove(part)
+            raise
+    os.replace(part, dest)
+    if journal:
+        journal.remove()
+    return dest
+
+
+def resume_hash(hasher, journal):
+    """Hash the prefix an earlier run already journaled, so the resumed stream meets the cursor"""
+    if hasher and journal.done and journal.done[0][0] == 0:
+        hasher.catch_up(journal.done[0][1] + 1)
+
+
+def sync_journal(fd, journal, start, offset):
+    """Flush written bytes to disk before the journal claims them"""
+    if offset <= start:
+        return
+    os.fsync(fd)
+    journal.mark(start, offset - 1)
+
+
+def from_store(store, entry, dest):
+    """Hardlink entry out of the payload store; returns its size, or None when it isn't there"""
+    sha1 = entry.get("sha1")
+    if not (store and store.has(sha1)):
+        return None
+    store.link_into(sha1, dest)
+    return entry.get("size") or os.path.getsize(dest)
+
+
+def to_store(store, entry, dest):
+    """Add a downloaded (and therefore verified) entry to the payload store"""
+    if store and entry.get("sha1"):
+        store.add(dest, entry["sha1"], verified=True)
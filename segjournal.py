@@ -0,0 +1,77 @@
+"""
+Flames NT segment journal 📓
+Remembers which byte ranges of a .part file are safely on disk
+"""
+
+import json
+import os
+import threading
+
+
+class SegmentJournal:
+    def __init__(self, part_path, size, url=None):
+        self.path = part_path + ".journal"
+        self.size = size
+        self.url = url
+        self.done = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, part_path, size, url=None):
+        """Open the journal for part_path, keeping progress only if it matches size"""
+        journal = cls(part_path, size, url)
+        if not os.path.exists(part_path):
+            return journal
+        try:
+            with open(journal.path, "r") as f:
+                data = json.load(f)
+            if data.get("size") == size:
+                journal.done = [tuple(r) for r in data.get("done", [])]
+        except (OSError, ValueError):
+            pass
+        return journal
+
+    def mark(self, start, end):
+        """Record start..end (inclusive) as written and flushed, then persist"""
+        if end < start:
+            return
+        with self._lock:
+            ranges = sorted(self.done + [(start, end)])
+            merged = [ranges[0]]
+            for s, e in ranges[1:]:
+                last_s, last_e = merged[-1]
+                if s <= last_e + 1:
+                    merged[-1] = (last_s, max(last_e, e))
+                else:
+                    merged.append((s, e))
+            self.done = merged
+            self._save()
+
+    def missing(self):
+        """Byte ranges (inclusive) that still have to be fetched"""
+        with self._lock:
+            gaps = []
+            cursor = 0
+            for s, e in self.done:
+                if s > cursor:
+                    gaps.append((cursor, s - 1))
+                cursor = max(cursor, e + 1)
+            if cursor < self.size:
+                gaps.append((cursor, self.size - 1))
+            return gaps
+
+    def completed_bytes(self):
+        with self._lock:
+            return sum(e - s + 1 for s, e in self.done)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"url": self.url, "size": self.size, "done": self.done}, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,205 @@
+"""
+Stand-in for aria2c's JSON-RPC interface, for tests
+
+Downloads never touch the network: a URL's ?size=N query says how big the
+file is, and every getGlobalStat moves the active ones on by a third of
+their size, at most two at a time. Run as a script it takes aria2c's
+--rpc-listen-port/--rpc-secret flags, so Aria2Daemon can start it.
+"""
+
+import json
+import sys
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_ACTIVE = 2
+
+
+class Aria2Stub:
+    def __init__(self, secret=None):
+        self.secret = secret
+        self.downloads = {}
+        self.order = []
+        self.global_options = {}
+        # (method, gid or None, options) for every changeOption/changeGlobalOption
+        self.changes = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    # -- simulation -------------------------------------------------------
+
+    def _promote(self):
+        active = sum(1 for d in self.downloads.values() if d["status"] == "active")
+        for gid in self.order:
+            if active >= MAX_ACTIVE:
+                break
+            if self.downloads[gid]["status"] == "waiting":
+                self.downloads[gid]["status"] = "active"
+                active += 1
+
+    def _advance(self):
+        speed = 0
+        for download in self.downloads.values():
+            if download["status"] != "active":
+                continue
+            step = min(download["size"] // 3 + 1, download["size"] - download["done"])
+            download["done"] += step
+            speed += step
+            if download["done"] >= download["size"]:
+                download["status"] = "complete"
+        self._promote()
+        return speed
+
+    def _status(self, gid, keys=None):
+        download = self.downloads[gid]
+        status = {"gid": gid, "status": download["status"], "totalLength": str(download["size"]),
+                  "completedLength": str(download["done"]), "downloadSpeed": "0",
+                  "connections": "1" if download["status"] == "active" else "0",
+                  "errorCode": "0", "errorMessage": ""}
+        return {k: v for k, v in status.items() if not keys or k in keys}
+
+    def _listed(self, states, keys):
+        return [self._status(gid, keys) for gid in self.order if self.downloads[gid]["status"] in states]
+
+    # -- methods ----------------------------------------------------------
+
+    def addUri(self, uris, options=None):
+        gid = f"{len(self.order) + 1:016x}"
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(uris[0]).query)
+        self.downloads[gid] = {"uris": uris, "options": dict(options or {}), "status": "waiting",
+                               "size": int(query.get("size", ["0"])[0]), "done": 0}
+        self.order.append(gid)
+        self._promote()
+        return gid
+
+    def getGlobalStat(self):
+        speed = self._advance()
+        count = lambda *states: str(sum(1 for d in self.downloads.values() if d["status"] in states))
+        return {"downloadSpeed": str(speed), "uploadSpeed": "0", "numActive": count("active"),
+                "numWaiting": count("waiting", "paused"), "numStopped": count("complete", "removed", "error"),
+                "numStoppedTotal": count("complete", "removed", "error")}
+
+    def tellStatus(self, gid, keys=None):
+        return self._status(gid, keys)
+
+    def tellActive(self, keys=None):
+        return self._listed(("active",), keys)
+
+    def tellWaiting(self, offset, num, keys=None):
+        return self._listed(("waiting", "paused"), keys)[offset:offset + num]
+
+    def tellStopped(self, offset, num, keys=None):
+        return self._listed(("complete", "removed", "error"), keys)[offset:offset + num]
+
+    def changeOption(self, gid, options):
+        self.downloads[gid]["options"].update(options)
+        self.changes.append(("aria2.changeOption", gid, options))
+        return "OK"
+
+    def changeGlobalOption(self, options):
+        self.global_options.update(options)
+        self.changes.append(("aria2.changeGlobalOption", None, options))
+        return "OK"
+
+    def pause(self, gid):
+        self.downloads[gid]["status"] = "paused"
+        return gid
+
+    def unpause(self, gid):
+        self.downloads[gid]["status"] = "waiting"
+        self._promote()
+        return gid
+
+    def pauseAll(self):
+        for gid, download in self.downloads.items():
+            if download["status"] in ("active", "waiting"):
+                download["status"] = "paused"
+        return "OK"
+
+    def unpauseAll(self):
+        for download in self.downloads.values():
+            if download["status"] == "paused":
+                download["status"] = "waiting"
+        self._promote()
+        return "OK"
+
+    def forceRemove(self, gid):
+        self.downloads[gid]["status"] = "removed"
+        self._promote()
+        return gid
+
+    def getVersion(self):
+        return {"version": "stub", "enabledFeatures": []}
+
+    def shutdown(self):
+        self.stopped.set()
+        return "OK"
+
+    forceShutdown = shutdown
+
+    # -- dispatch ---------------------------------------------------------
+
+    def dispatch(self, method, params):
+        """Result of one call; raises (code, message) as ValueError for JSON-RPC errors"""
+        if method == "system.multicall":
+            results = []
+            for call in params[0]:
+                try:
+                    results.append([self.dispatch(call["methodName"], call.get("params", []))])
+                except ValueError as e:
+                    code, message = e.args
+                    results.append({"code": code, "message": message})
+            return results
+        if self.secret:
+            if not params or params[0] != f"token:{self.secret}":
+                raise ValueError(1, "Unauthorized")
+            params = params[1:]
+        handler = getattr(self, method.partition("aria2.")[2] or "-", None)
+        if handler is None:
+            raise ValueError(1, f"No such method: {method}")
+        try:
+            with self.lock:
+                return handler(*params)
+        except (KeyError, IndexError, TypeError) as e:
+            raise ValueError(1, str(e))
+
+
+def serve(stub, port=0):
+    """Start a ThreadingHTTPServer for stub in the background; returns it"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            try:
+                reply, code = {"result": stub.dispatch(request["method"], request.get("params", []))}, 200
+            except ValueError as e:
+                reply, code = {"error": {"code": e.args[0], "message": e.args[1]}}, 400
+            body = json.dumps(dict(reply, jsonrpc="2.0", id=request.get("id"))).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json-rpc")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv):
+    flags = dict(arg[2:].partition("=")[::2] for arg in argv if arg.startswith("--"))
+    stub = Aria2Stub(secret=flags.get("rpc-secret"))
+    server = serve(stub, int(flags.get("rpc-listen-port") or 6800))
+    # Let the shutdown call's reply go out before the process exits
+    server.daemon_threads = False
+    stub.stopped.wait()
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
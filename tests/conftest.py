@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+# The modules are flat scripts at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def flamesnt_home(tmp_path, monkeypatch):
+    """Keep job state, caches and the daemon file out of the real data dir"""
+    monkeypatch.setenv("FLAMESNT_HOME", str(tmp_path / "home"))
+    return tmp_path / "home"
+
+
+@pytest.fixture
+def http_root(tmp_path):
+    """(directory, base URL) of a throwaway static HTTP server"""
+    import functools
+    import io
+    import re
+    import threading
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(SimpleHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_head(self):
+            # Just enough Range support for segmented downloads: bytes=a-b, a- and -n
+            match = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", ""))
+            path = self.translate_path(self.path)
+            if not match or not os.path.isfile(path):
+                return super().send_head()
+            size = os.path.getsize(path)
+            first, last = match.groups()
+            start = int(first) if first else max(0, size - int(last))
+            stop = min(int(last), size - 1) if first and last else size - 1
+            f = open(path, "rb")
+            f.seek(start)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{stop}/{size}")
+            self.send_header("Content-Length", str(stop - start + 1))
+            self.end_headers()
+            return io.BytesIO(f.read(stop - start + 1))
+
+    root = tmp_path / "srv"
+    root.mkdir()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield root, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
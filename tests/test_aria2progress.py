@@ -0,0 +1,53 @@
+from aria2progress import Aria2Progress, parse_eta, parse_size
+
+MiB = 2**20
+
+SUMMARY = """
+ *** Download Progress Summary as of Sun Oct 18 12:00:01 2026 ***
+===============================================================================
+[#2089b0 400MiB/1.0GiB(39%) CN:16 DL:112MiB ETA:5s]
+FILE: C:\\UUPs\\core.esd
+-------------------------------------------------------------------------------
+"""
+READOUT = "\r[DL:120MiB][#2089b0 512MiB/1.0GiB(50%) CN:16][#a1b2c3 1.0MiB/2.0MiB(50%) CN:1]\r"
+LOG = """
+10/18 12:00:03 [NOTICE] Download complete: C:\\UUPs\\small.cab
+
+Download Results:
+gid   |stat|avg speed  |path/URI
+======+====+===========+=======================================================
+2089b0|OK  |   110MiB/s|C:/UUPs/core.esd
+a1b2c3|ERR |       0B/s|C:/UUPs/bad.cab
+"""
+
+
+def test_sizes_and_etas_parse_like_aria2_prints_them():
+    assert parse_size("1.5GiB") == 1536 * MiB
+    assert parse_size("512B") == 512
+    assert parse_size("n/a") == 0
+    assert parse_eta("1h2m3s") == 3723 and parse_eta("45s") == 45
+
+
+def test_console_output_becomes_running_totals_whatever_the_chunking():
+    expected = [{"name": "core.esd", "size": 1024 * MiB}, {"name": "sub/small.cab", "size": 5 * MiB},
+                {"name": "bad.cab", "size": 2 * MiB}, {"name": "later.cab", "size": 9 * MiB}]
+    updates = []
+    progress = Aria2Progress(expected, callback=lambda p: updates.append(p.downloaded))
+
+    text = SUMMARY + READOUT
+    # Lines cut at arbitrary points, as they come off the pipe
+    for i in range(0, len(text), 7):
+        progress.feed(text[i:i + 7])
+
+    assert progress.active["2089b0"]["path"] == "C:\\UUPs\\core.esd"
+    assert updates == [400 * MiB, 512 * MiB + MiB]
+    assert progress.speed == 120 * MiB
+    assert progress.total == 1040 * MiB
+    assert progress.describe() == "0/4 files · 513 of 1040 MiB · 120.0 MiB/s · ETA 0m04s"
+
+    progress.feed(LOG)
+    progress.close()
+    # small.cab finished between two summaries and still counts its full size
+    assert progress.finished == {"small.cab": 5 * MiB, "core.esd": 1024 * MiB}
+    assert progress.errors == ["C:/UUPs/bad.cab"]
+    assert progress.downloaded == 1029 * MiB + MiB
@@ -0,0 +1,81 @@
+import os
+import stat
+import sys
+
+import pytest
+
+import aria2stub
+from aria2rpc import Aria2Daemon, Aria2RPC, Aria2RPCError, Aria2Session
+
+
+def files(*sizes):
+    return [{"name": f"f{i}.bin", "url": f"http://mirror.invalid/f{i}.bin?size={size}", "size": size}
+            for i, size in enumerate(sizes)]
+
+
+@pytest.fixture
+def stub():
+    stub = aria2stub.Aria2Stub(secret="s3cret")
+    server = aria2stub.serve(stub)
+    stub.url = f"http://127.0.0.1:{server.server_address[1]}/jsonrpc"
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+
+def test_wait_polls_real_byte_counts_to_completion(stub):
+    seen = []
+    session = Aria2Session(Aria2RPC(stub.url, secret="s3cret"), poll_interval=0,
+                           callback=lambda s: seen.append((s.downloaded, s.total)))
+    session.submit(files(3000, 6000, 9000))
+
+    assert session.wait() is True
+    downloaded = [done for done, _ in seen]
+    assert downloaded == sorted(downloaded)
+    assert seen[-1] == (18000, 18000)
+    assert len(session.completed) == 3 and not session.errors
+
+
+def test_set_connections_leaves_active_downloads_alone(stub):
+    session = Aria2Session(Aria2RPC(stub.url, secret="s3cret"), poll_interval=0)
+    gids = session.submit(files(9000, 6000, 3000))
+    session.poll()
+    waiting = [g for g in gids if session.statuses[g]["status"] == "waiting"]
+    assert len(waiting) == 1
+
+    session.set_connections(4)
+
+    assert ("aria2.changeGlobalOption", None, {"split": "4", "max-connection-per-server": "4"}) in stub.changes
+    assert [gid for method, gid, _ in stub.changes if method == "aria2.changeOption"] == waiting
+    assert session.wait() is True
+
+
+def test_set_connections_for_one_gid_changes_just_that_download(stub):
+    session = Aria2Session(Aria2RPC(stub.url, secret="s3cret"), poll_interval=0)
+    gids = session.submit(files(9000, 6000))
+    session.poll()
+
+    session.set_connections(99, gid=gids[0])
+
+    assert stub.changes == [("aria2.changeOption", gids[0], {"split": "16", "max-connection-per-server": "16"})]
+
+
+def test_daemon_serves_rpc_with_its_secret_and_shuts_down_cleanly(tmp_path):
+    aria2c = tmp_path / "aria2c"
+    aria2c.write_text(f"#!{sys.executable}\n"
+                      "import sys\n"
+                      f"sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+                      "import aria2stub\n"
+                      "aria2stub.main(sys.argv[1:])\n")
+    aria2c.chmod(aria2c.stat().st_mode | stat.S_IXUSR)
+
+    with Aria2Daemon(str(aria2c), str(tmp_path / "dl")) as daemon:
+        with pytest.raises(Aria2RPCError):
+            Aria2RPC(daemon.rpc.url, secret="wrong").get_global_stat()
+        session = Aria2Session(daemon.rpc, poll_interval=0)
+        session.submit(files(4000))
+        assert session.wait() is True
+        assert session.downloaded == 4000
+
+    # Exited on its own after aria2.shutdown rather than being killed
+    assert daemon.process.returncode == 0
@@ -0,0 +1,77 @@
+import hashlib
+import os
+
+import pytest
+
+import uupdump
+from batch import BatchRunner
+from test_flamesengine import CONVERT_SH
+from test_isowriter import udf_files
+
+
+@pytest.fixture
+def editions(tmp_path, http_root, monkeypatch):
+    """{edition: payload bytes by name}, served over HTTP with a converter stub in place"""
+    root, base = http_root
+    shared = os.urandom(200 * 1024)
+    payloads = {
+        "Professional": {"core.esd": shared, "pro.esd": os.urandom(50 * 1024)},
+        "Core": {"core.esd": shared, "home.esd": os.urandom(60 * 1024)},
+    }
+    lists = {}
+    for edition, files in payloads.items():
+        lists[edition] = []
+        for name, data in files.items():
+            # Same bytes under a per-edition URL: only the hash says they're one payload
+            (root / f"{edition}-{name}").write_bytes(data)
+            lists[edition].append({"name": name, "url": f"{base}/{edition}-{name}", "size": len(data),
+                                   "sha1": hashlib.sha1(data).hexdigest()})
+    monkeypatch.setattr(uupdump, "get_file_list", lambda build_id, edition: lists[edition])
+
+    converter = tmp_path / "converter"
+    converter.mkdir()
+    (converter / "convert.sh").write_text(CONVERT_SH)
+    monkeypatch.setenv("FLAMESNT_CONVERTER", str(converter))
+    return payloads
+
+
+def run_batch(payloads):
+    runner = BatchRunner()
+    for edition in payloads:
+        runner.add({"id": "uuid-1", "build": "22621.1", "created": 1700000000}, edition)
+    return runner, runner.run()
+
+
+def test_shared_payloads_are_fetched_once_and_every_edition_is_imaged(editions):
+    runner, jobs = run_batch(editions)
+
+    assert [job["error"] for job in jobs] == [None, None]
+    # The pool was only a staging area; the job trees keep their own links
+    assert not os.path.exists(runner.pool_dir)
+    assert all(os.listdir(os.path.join(job["dir"], "files")) for job in jobs)
+    assert runner.shared_bytes == len(editions["Core"]["core.esd"])
+    assert runner.downloaded == sum(len(data) for files in editions.values() for data in files.values()) \
+        - runner.shared_bytes
+    for job in jobs:
+        with open(job["iso"], "rb") as f:
+            image = f.read()
+        size, extents = udf_files(image)["/sources/install.wim"]
+        payloads = editions[job["edition"]]
+        assert b"".join(image[lba * 2048:lba * 2048 + n] for n, lba in extents) == \
+            b"".join(payloads[name] for name in sorted(payloads))
+
+    # Same inputs again: both images come from the build cache, nothing is fetched
+    again, cached = run_batch(editions)
+    assert [job["cached"] for job in cached] == [True, True]
+    assert again.downloaded == 0
+    assert [job["iso"] for job in cached] == [job["iso"] for job in jobs]
+
+
+def test_missing_converter_fails_before_any_download(editions, tmp_path, monkeypatch):
+    monkeypatch.setenv("FLAMESNT_CONVERTER", str(tmp_path / "no-converter"))
+
+    with pytest.raises(Exception, match="No UUP converter"):
+        run_batch(editions)
+
+    assert not any(os.path.exists(os.path.join(job_dir, "files")) for job_dir in
+                   (tmp_path / "home" / "jobs").iterdir())
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from buildcache import DEFAULT_EPOCH, BuildCache, build_key, manifest_hash, reproducible_timestamp
+from isowriter import create_iso
+
+
+def test_key_follows_the_inputs_not_their_order():
+    files = [{"name": "b.esd", "sha1": "BB"}, {"name": "a.cab", "size": 10}]
+    manifest = manifest_hash(files)
+
+    assert manifest == manifest_hash(list(reversed(files)))
+    assert manifest != manifest_hash([{"name": "b.esd", "sha1": "cc"}, {"name": "a.cab", "size": 10}])
+    assert build_key("uuid", "Professional", manifest) == build_key("uuid", "professional", manifest)
+    assert build_key("uuid", "Professional", manifest) != build_key("uuid", "Core", manifest)
+
+
+def test_reproducible_timestamp_prefers_source_date_epoch(monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    assert reproducible_timestamp() == DEFAULT_EPOCH
+    assert reproducible_timestamp({"created": "1700000000"}) == 1700000000
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1600000000")
+    assert reproducible_timestamp({"created": 1700000000}) == 1600000000
+
+
+def test_equal_inputs_give_byte_identical_isos(tmp_path, monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    media = tmp_path / "media"
+    (media / "sources").mkdir(parents=True)
+    (media / "sources" / "install.wim").write_bytes(os.urandom(10000))
+    (media / "setup.exe").write_bytes(b"MZ" * 100)
+    stamp = reproducible_timestamp({"created": 1700000000})
+
+    first = tmp_path / "first.iso"
+    create_iso(str(media), str(first), timestamp=stamp)
+    # A later run on another day, from a freshly extracted tree
+    for path in (media / "setup.exe", media / "sources" / "install.wim"):
+        os.utime(path, (1800000000, 1800000000))
+    second = tmp_path / "second.iso"
+    create_iso(str(media), str(second), timestamp=reproducible_timestamp({"created": 1700000000}))
+
+    assert first.read_bytes() == second.read_bytes()
+
+
+def test_images_are_linked_in_and_out_and_evicted_oldest_first(tmp_path):
+    cache = BuildCache(max_bytes=5000)
+    for name in ("old", "new"):
+        (tmp_path / f"{name}.iso").write_bytes(b"\0" * 3000)
+
+    cache.put("a" * 64, str(tmp_path / "old.iso"), build="uuid", edition="Core")
+    assert os.path.samefile(cache.path_for("a" * 64), tmp_path / "old.iso")
+    dest = tmp_path / "out" / "Windows.iso"
+    assert cache.link_out("a" * 64, str(dest)) == str(dest)
+    assert os.path.samefile(dest, tmp_path / "old.iso")
+
+    cache.put("b" * 64, str(tmp_path / "new.iso"))
+    # Both no longer fit: the least recently used one goes
+    assert cache.get("a" * 64) is None
+    assert cache.get("b" * 64) == cache.path_for("b" * 64)
+    assert cache.link_out("a" * 64, str(tmp_path / "miss.iso")) is None
+
+
+@pytest.mark.parametrize("size", [0, 2999])
+def test_entry_whose_file_changed_is_dropped(tmp_path, size):
+    cache = BuildCache()
+    (tmp_path / "a.iso").write_bytes(b"\0" * 3000)
+    path = cache.put("c" * 64, str(tmp_path / "a.iso"))
+    with open(path, "r+b") as f:
+        f.truncate(size)
+
+    assert cache.get("c" * 64) is None
+    assert not os.path.exists(path)
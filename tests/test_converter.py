@@ -0,0 +1,62 @@
+import os
+import threading
+
+import converter
+
+
+def test_image_is_taken_from_the_output_folder_not_the_uup_tree(tmp_path):
+    tool = tmp_path / "converter"
+    tool.mkdir()
+    # An ISO-looking file deep in the payloads must not be mistaken for the result
+    (tool / "convert.sh").write_text(
+        'echo image > out.iso\n'
+        'mkdir -p "$2/sub" && echo payload > "$2/sub/embedded.iso"\n'
+    )
+    uup = tmp_path / "uup"
+    uup.mkdir()
+    iso_dir = tmp_path / "out"
+    iso_dir.mkdir()
+    messages = []
+
+    iso = converter.run_conversion(str(tool), str(uup), str(iso_dir), "26100.1", "Pro",
+                                   lambda kind, text: messages.append((kind, text)))
+
+    assert iso == os.path.join(str(iso_dir), "FlamesOS_26100.1_Pro.iso")
+    with open(iso) as f:
+        assert f.read() == "image\n"
+    assert (uup / "sub" / "embedded.iso").exists()
+    assert not [text for kind, text in messages if kind == "error"]
+
+
+def test_output_is_batched_with_crlf_and_utf8_kept_whole_across_reads():
+    read_fd, write_fd = os.pipe()
+    batches = []
+    emitted = threading.Event()
+
+    def emit(text):
+        batches.append(text)
+        emitted.set()
+
+    def converter_output():
+        os.write(write_fd, "Progress 50%\r".encode("utf-8") + "✓".encode("utf-8")[:1])
+        # The reader has to hand over what it has before the rest arrives
+        emitted.wait(5)
+        emitted.clear()
+        os.write(write_fd, "✓".encode("utf-8")[1:] + "\r".encode("utf-8"))
+        emitted.wait(5)
+        os.write(write_fd, b"\n")
+        for i in range(2000):
+            os.write(write_fd, f"line {i}\r\n".encode("utf-8"))
+        os.close(write_fd)
+
+    writer = threading.Thread(target=converter_output)
+    writer.start()
+    with os.fdopen(read_fd, "rb") as stream:
+        converter.pump_output(stream, emit, encoding="utf-8", interval=0.05)
+    writer.join()
+
+    # A progress line redrawn with \r stays one; \r\n split over two reads is still one newline
+    assert "".join(batches) == "Progress 50%\r✓\n" + "".join(f"line {i}\n" for i in range(2000))
+    assert batches[:2] == ["Progress 50%", "\r✓"]
+    # Thousands of writes, a handful of updates
+    assert len(batches) < 50
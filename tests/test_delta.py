@@ -0,0 +1,58 @@
+import delta
+from delta import DeltaManifest
+
+
+def entry(name, data, sha1):
+    return {"name": name, "size": len(data), "sha1": sha1}
+
+
+def test_only_files_a_hash_proves_unchanged_are_reused(tmp_path):
+    old_dir = tmp_path / "old"
+    old_dir.mkdir()
+    (old_dir / "same.cab").write_bytes(b"same")
+    (old_dir / "old-name.esd").write_bytes(b"renamed")
+    (old_dir / "nohash.cab").write_bytes(b"nohash")
+    (old_dir / "edited.cab").write_bytes(b"edited")
+    previous = DeltaManifest().save("retail", "22631", "PROFESSIONAL", "build-1", str(old_dir), [
+        entry("same.cab", b"same", "AA"),
+        entry("old-name.esd", b"renamed", "bb"),
+        {"name": "nohash.cab", "size": 6},
+        entry("edited.cab", b"edited", "cc"),
+    ])
+
+    files = [
+        entry("same.cab", b"same", "aa"),
+        entry("new-name.esd", b"renamed", "BB"),
+        {"name": "nohash.cab", "size": 6},
+        entry("edited.cab", b"edited", "dd"),
+        entry("added.cab", b"added", "ee"),
+    ]
+    changed, reused = delta.plan(previous, files)
+
+    assert [e["name"] for e in changed] == ["nohash.cab", "edited.cab", "added.cab"]
+    assert [(e["name"], source) for e, source in reused] == [
+        ("same.cab", str(old_dir / "same.cab")),
+        ("new-name.esd", str(old_dir / "old-name.esd")),
+    ]
+
+    new_dir = tmp_path / "new"
+    assert delta.apply(reused, str(new_dir)) == len(b"same") + len(b"renamed")
+    assert (new_dir / "new-name.esd").read_bytes() == b"renamed"
+    assert (new_dir / "same.cab").stat().st_ino == (old_dir / "same.cab").stat().st_ino
+
+
+def test_a_missing_or_truncated_base_is_fetched_again(tmp_path):
+    old_dir = tmp_path / "old"
+    old_dir.mkdir()
+    (old_dir / "short.cab").write_bytes(b"shor")
+    files = [entry("short.cab", b"short", "aa"), entry("gone.cab", b"gone", "bb")]
+    manifest = DeltaManifest()
+    manifest.save("retail", "22631", "CORE", "build-1", str(old_dir), files)
+
+    changed, reused = delta.plan(manifest.load("retail", "22631", "CORE"), files)
+    assert (changed, reused) == (files, [])
+    # No manifest for this track, or its working set was cleaned up
+    assert delta.plan(manifest.load("wif", "26100", "CORE"), files) == (files, [])
+    (old_dir / "short.cab").unlink()
+    old_dir.rmdir()
+    assert delta.plan(manifest.load("retail", "22631", "CORE"), files) == (files, [])
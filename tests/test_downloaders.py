@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+
+import asyncengine
+from asyncengine import AsyncDownloadEngine
+from hashstream import StreamHasher
+from payloadstore import PayloadStore
+from segjournal import SegmentJournal
+
+
+def make_async():
+    return AsyncDownloadEngine(timeout=10)
+
+
+def test_corrupt_file_of_right_size_is_refetched_not_stored(tmp_path, http_root):
+    root, base = http_root
+    data = os.urandom(200 * 1024)
+    (root / "a.cab").write_bytes(data)
+    entry = {"name": "a.cab", "url": f"{base}/a.cab", "size": len(data), "sha1": hashlib.sha1(data).hexdigest()}
+
+    dest_dir = tmp_path / "files"
+    dest_dir.mkdir()
+    # Left by an interrupted earlier run: right size, wrong bytes
+    (dest_dir / "a.cab").write_bytes(b"\0" * len(data))
+    store = PayloadStore(str(tmp_path / "store"))
+
+    downloader = make_async()
+    try:
+        downloader.download_files([entry], str(dest_dir), store=store)
+    finally:
+        downloader.close()
+
+    assert (dest_dir / "a.cab").read_bytes() == data
+    with open(store.path_for(entry["sha1"]), "rb") as f:
+        assert f.read() == data
+
+
+@pytest.mark.parametrize("hashed", [False, True])
+def test_segmented_download(tmp_path, http_root, hashed):
+    root, base = http_root
+    data = os.urandom(3 * 1024 * 1024 + 12345)
+    (root / "big.cab").write_bytes(data)
+    entry = {"name": "sub/big.cab", "url": f"{base}/big.cab", "size": len(data), "connections": 4}
+    if hashed:
+        entry["sha1"] = hashlib.sha1(data).hexdigest()
+
+    downloader = make_async()
+    downloader.min_segment_size = 256 * 1024
+    try:
+        downloader.download_files([entry], str(tmp_path / "files"))
+    finally:
+        downloader.close()
+
+    assert (tmp_path / "files" / "sub" / "big.cab").read_bytes() == data
+    assert not os.path.exists(tmp_path / "files" / "sub" / "big.cab.part")
+
+
+def test_async_engine_keeps_loop_free_during_fsync(tmp_path, http_root, monkeypatch):
+    root, base = http_root
+    data = os.urandom(4 * 1024 * 1024)
+    (root / "big.cab").write_bytes(data)
+    real_fsync = os.fsync
+
+    def slow_fsync(fd):
+        time.sleep(0.3)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", slow_fsync)
+    engine = AsyncDownloadEngine(timeout=10, checkpoint_bytes=512 * 1024)
+    engine.start()
+    gaps = []
+
+    async def heartbeat():
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+
+    beat = asyncio.run_coroutine_threadsafe(heartbeat(), engine.loop)
+    try:
+        engine.download_files([{"name": "big.cab", "url": f"{base}/big.cab", "size": len(data)}],
+                              str(tmp_path / "files"))
+    finally:
+        engine.loop.call_soon_threadsafe(beat.cancel)
+        engine.close()
+
+    assert (tmp_path / "files" / "big.cab").read_bytes() == data
+    # Each fsync takes 0.3 s; none of them may hold up the loop
+    assert max(gaps) < 0.2
+
+
+def test_resumed_hash_rereads_only_the_journaled_prefix(tmp_path, http_root, monkeypatch):
+    root, base = http_root
+    data = os.urandom(1024 * 1024)
+    (root / "a.cab").write_bytes(data)
+    prefix = 256 * 1024
+    entry = {"name": "a.cab", "url": f"{base}/a.cab", "size": len(data), "sha1": hashlib.sha1(data).hexdigest()}
+    dest = str(tmp_path / "a.cab")
+    with open(dest + ".part", "wb") as f:
+        f.write(data[:prefix])
+    SegmentJournal(dest + ".part", len(data)).mark(0, prefix - 1)
+
+    hashers = []
+
+    class SmallBuffer(StreamHasher):
+        # Far less than the rest of the file, so nothing can wait in memory for the prefix
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **{**kwargs, "max_buffer": 64 * 1024})
+            hashers.append(self)
+
+    monkeypatch.setattr(asyncengine, "StreamHasher", SmallBuffer)
+    downloader = make_async()
+    try:
+        downloader.download_files([entry], str(tmp_path))
+    finally:
+        downloader.close()
+
+    assert (tmp_path / "a.cab").read_bytes() == data
+    assert hashers[0].reread <= prefix
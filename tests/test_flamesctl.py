@@ -0,0 +1,20 @@
+import flamesctl
+import flamesengine
+
+
+def test_build_unpack_flag_reaches_the_engine(monkeypatch):
+    seen = {}
+
+    class Engine:
+        def __init__(self, **options):
+            seen.update(options)
+            self.cancelled = False
+
+        def run_job(self, build, edition, mount=True):
+            return None
+
+    monkeypatch.setattr(flamesengine, "FlamesEngine", Engine)
+    monkeypatch.setattr(flamesengine, "configure_process", lambda: None)
+
+    assert flamesctl.main(["build", "-b", "24H2", "-e", "Professional", "--unpack"]) == 0
+    assert seen["unpack_archives"] is True
@@ -0,0 +1,36 @@
+import pytest
+
+import flamesctl
+import flamesd
+from flamesd import DONE, DaemonError, JobDaemon
+
+
+@pytest.mark.parametrize("host", ["127.0.0.1", "127.0.0.2", "::1", "localhost"])
+def test_loopback_hosts_are_served(host):
+    flamesd.check_host(host)
+
+
+@pytest.mark.parametrize("host", ["0.0.0.0", "::", "192.168.1.20", "flames.example"])
+def test_other_hosts_are_refused_before_anything_starts(host, monkeypatch, capsys):
+    monkeypatch.setattr(flamesd, "JobDaemon", lambda **kwargs: pytest.fail("daemon started"))
+
+    assert flamesctl.main(["serve", "--host", host]) == 1
+    assert "Refusing to serve" in capsys.readouterr().err
+
+
+def test_a_build_already_queued_is_not_queued_twice(monkeypatch):
+    # Jobs stay queued: nothing runs them
+    monkeypatch.setattr(JobDaemon, "_run", lambda self, job: None)
+    daemon = JobDaemon()
+    try:
+        first = daemon.submit("24H2", "Professional")
+        with pytest.raises(DaemonError, match=f"Job {first['id']}"):
+            daemon.submit("24H2", "Professional", aria2=True)
+        with pytest.raises(DaemonError):
+            daemon.submit(batch=[["24H2", "Core"], ["24H2", "Professional"]])
+        daemon.submit("24H2", "Core")
+
+        first["state"] = DONE
+        assert daemon.submit("24H2", "Professional")["id"] != first["id"]
+    finally:
+        daemon.close()
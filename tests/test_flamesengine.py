@@ -0,0 +1,193 @@
+import hashlib
+import os
+import zipfile
+
+import pytest
+
+import bandwidth
+import flamesengine
+import uupdump
+from jobstate import IMAGE, MEDIA, JobState
+from test_isowriter import udf_files
+
+# Stands in for uup-dump's convert.sh: lays the payloads out as a media tree in MEDIA_PATH
+CONVERT_SH = """mkdir -p "$MEDIA_PATH/sources"
+cat "$2"/*.esd > "$MEDIA_PATH/sources/install.wim"
+echo Done
+"""
+
+
+def make_engine(tmp_path):
+    engine = flamesengine.FlamesEngine()
+    engine.temp_dir = str(tmp_path / "job")
+    return engine
+
+
+def test_download_tools_uses_tools_priority(tmp_path, monkeypatch):
+    seen = []
+
+    def extract_member(urls, member, dest, priority, **kwargs):
+        seen.append(priority)
+        # What the real transfer does with it; a stage name here raises TypeError
+        with bandwidth.get_scheduler().active(priority):
+            with open(dest, "wb") as f:
+                f.write(b"MZ")
+
+    monkeypatch.setattr(flamesengine, "extract_member", extract_member)
+    engine = make_engine(tmp_path)
+    engine.download_tools()
+
+    assert seen == [bandwidth.TOOLS]
+    assert os.path.exists(os.path.join(engine.temp_dir, "tools", "aria2c.exe"))
+
+
+def test_download_tools_falls_back_to_mirrors(tmp_path, monkeypatch):
+    seen = []
+
+    def extract_member(*args, **kwargs):
+        raise OSError("no range support")
+
+    class MirrorSelector:
+        def __init__(self, urls, priority, **kwargs):
+            seen.append(priority)
+            self.priority = priority
+
+        def download(self, dest):
+            with bandwidth.get_scheduler().active(self.priority):
+                with zipfile.ZipFile(dest, "w") as archive:
+                    archive.writestr("aria2-1.37.0-win-64bit-build1/aria2c.exe", b"MZ")
+
+    monkeypatch.setattr(flamesengine, "extract_member", extract_member)
+    monkeypatch.setattr(flamesengine, "MirrorSelector", MirrorSelector)
+    engine = make_engine(tmp_path)
+    engine.download_tools()
+
+    assert seen == [bandwidth.TOOLS]
+    assert os.path.exists(os.path.join(engine.temp_dir, "tools", "aria2c.exe"))
+
+
+def test_new_engine_keeps_the_shared_session(tmp_path):
+    import httpsession
+
+    session = httpsession.get_session()
+    make_engine(tmp_path)
+    make_engine(tmp_path)
+    # A later job's engine must not close the session earlier jobs are using
+    assert httpsession.get_session() is session
+
+
+def test_image_stage_never_images_the_raw_uup_set(tmp_path, monkeypatch):
+    monkeypatch.setenv("FLAMESNT_CONVERTER", str(tmp_path / "no-converter"))
+    engine = make_engine(tmp_path)
+    os.makedirs(os.path.join(engine.temp_dir, "files"))
+    with open(os.path.join(engine.temp_dir, "files", "core.esd"), "wb") as f:
+        f.write(b"\0" * 4096)
+    engine.job_state = JobState("Build", "Pro", root=str(tmp_path / "state"))
+    engine.file_list = [{"name": "core.esd", "size": 4096, "sha1": "0" * 40}]
+    build_info = {"id": "uuid", "build": "22621.1", "title": "Build"}
+
+    with pytest.raises(Exception, match="conversion failed"):
+        engine.image_stage(build_info, "Pro")
+
+    assert not engine.job_state.done(MEDIA) and not engine.job_state.done(IMAGE)
+    assert not [name for name in os.listdir(engine.temp_dir) if name.endswith(".iso")]
+    assert engine.build_cache.get(engine.image_key(build_info, "Pro")) is None
+
+
+def serve_payloads(http_root, monkeypatch, **payloads):
+    root, base = http_root
+    files = []
+    for name, data in payloads.items():
+        (root / name).write_bytes(data)
+        files.append({"name": name, "url": f"{base}/{name}", "size": len(data),
+                      "sha1": hashlib.sha1(data).hexdigest()})
+    requested = []
+    monkeypatch.setattr(uupdump, "get_file_list", lambda build_id, edition: requested.append(build_id) or files)
+    monkeypatch.setattr(flamesengine.FlamesEngine, "get_build_info",
+                        lambda self, build: {"id": "uuid-1", "build": "22621.1", "title": build})
+    return requested
+
+
+def test_run_job_goes_from_payloads_to_an_iso(tmp_path, http_root, monkeypatch):
+    converter = tmp_path / "converter"
+    converter.mkdir()
+    (converter / "convert.sh").write_text(CONVERT_SH)
+    monkeypatch.setenv("FLAMESNT_CONVERTER", str(converter))
+    core = os.urandom(300 * 1024)
+    serve_payloads(http_root, monkeypatch, **{"core.esd": core})
+
+    engine = flamesengine.FlamesEngine()
+    iso = engine.run_job("Windows 11 24H2 (Current Stable)", "Professional", mount=False)
+
+    with open(iso, "rb") as f:
+        image = f.read()
+    size, extents = udf_files(image)["/sources/install.wim"]
+    assert b"".join(image[lba * 2048:lba * 2048 + n] for n, lba in extents) == core
+    assert engine.job_state.done(MEDIA) and engine.job_state.data(IMAGE)["iso"] == iso
+
+
+def test_missing_converter_fails_before_any_download(tmp_path, http_root, monkeypatch):
+    monkeypatch.setenv("FLAMESNT_CONVERTER", str(tmp_path / "no-converter"))
+    serve_payloads(http_root, monkeypatch, **{"core.esd": b"\1" * 4096})
+
+    engine = flamesengine.FlamesEngine()
+    with pytest.raises(Exception, match="No UUP converter"):
+        engine.run_job("Windows 11 24H2 (Current Stable)", "Professional", mount=False)
+
+    assert not os.path.exists(os.path.join(engine.temp_dir, "files"))
+    assert not engine.job_state.done("tools")
+
+
+def test_fallback_build_info_is_looked_up_again_on_resume(tmp_path, http_root, monkeypatch):
+    monkeypatch.setenv("FLAMESNT_CONVERTER", str(tmp_path / "no-converter"))
+    serve_payloads(http_root, monkeypatch, **{"core.esd": b"\1" * 4096})
+    answers = [{"id": "26100_fallback", "title": "24H2", "build": "26100"},
+               {"id": "uuid-1", "build": "26100.1", "title": "24H2"}]
+    lookups = []
+    monkeypatch.setattr(flamesengine.FlamesEngine, "get_build_info",
+                        lambda self, build: lookups.append(build) or answers[min(len(lookups), 2) - 1])
+
+    for _ in range(3):
+        engine = flamesengine.FlamesEngine()
+        # Stops at the converter check, after the METADATA checkpoint
+        with pytest.raises(Exception, match="No UUP converter"):
+            engine.run_job("Windows 11 24H2 (Current Stable)", "Professional", mount=False)
+
+    # The lookup that failed was retried; the real id it found was trusted from then on
+    assert len(lookups) == 2
+    assert engine.job_state.data("metadata")["build_info"]["id"] == "uuid-1"
+
+
+def test_unpacked_archives_reach_the_converter(tmp_path, http_root, monkeypatch):
+    import io
+
+    converter = tmp_path / "converter"
+    converter.mkdir()
+    (converter / "convert.sh").write_text(
+        'mkdir -p "$MEDIA_PATH/sources"\n'
+        'cp -R "$EXPANDED_PATH"/. "$MEDIA_PATH/sources/"\n'
+    )
+    monkeypatch.setenv("FLAMESNT_CONVERTER", str(converter))
+
+    def archive(**members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        return buffer.getvalue()
+
+    # Stored members, so flipping payload bytes fails the CRC check after the file was written
+    broken = archive(**{"big.bin": b"B" * 70000}).replace(b"B" * 70000, b"C" * 70000)
+    serve_payloads(http_root, monkeypatch, **{"appx.zip": archive(**{"x.txt": b"from the archive"}),
+                                               "broken.zip": broken})
+
+    engine = flamesengine.FlamesEngine(unpack_archives=True)
+    iso = engine.run_job("Windows 11 24H2 (Current Stable)", "Professional", mount=False)
+
+    with open(iso, "rb") as f:
+        image = f.read()
+    files = udf_files(image)
+    # The half-extracted archive was removed instead of being handed on
+    assert sorted(files) == ["/sources/appx/x.txt"]
+    n, lba = files["/sources/appx/x.txt"][1][0]
+    assert image[lba * 2048:lba * 2048 + n] == b"from the archive"
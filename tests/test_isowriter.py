@@ -0,0 +1,128 @@
+import binascii
+import os
+import struct
+
+from isowriter import FLAG_MULTI_EXTENT, MAX_EXTENT, SECTOR, IsoWriter, create_iso
+
+
+def descriptor(image, offset, ident, location=None):
+    """The descriptor at offset, after checking its tag the way UDF readers do"""
+    head = image[offset:offset + 16]
+    tag_ident, _, checksum, _, _, crc, crc_length, tag_location = struct.unpack("<HHBBHHHI", head)
+    assert tag_ident == ident
+    assert (sum(head) - head[4]) & 0xFF == checksum
+    assert binascii.crc_hqx(image[offset + 16:offset + 16 + crc_length], 0) == crc
+    assert location is None or tag_location == location
+    return image[offset:offset + 16 + crc_length]
+
+
+def udf_files(image):
+    """{path: (size, [(length, lba), ...])} for every file the UDF side of image holds"""
+    anchor = descriptor(image, 256 * SECTOR, 2, 256)
+    length, start = struct.unpack_from("<II", anchor, 16)
+    for lba in range(start, start + length // SECTOR):
+        ident = struct.unpack_from("<H", image, lba * SECTOR)[0]
+        if ident == 5:
+            partition = struct.unpack_from("<I", descriptor(image, lba * SECTOR, 5, lba), 188)[0]
+        elif ident == 6:
+            file_set = struct.unpack_from("<I", descriptor(image, lba * SECTOR, 6, lba), 252)[0]
+        elif ident == 8:
+            break
+    root = struct.unpack_from("<I", descriptor(image, (partition + file_set) * SECTOR, 256, file_set), 404)[0]
+
+    files = {}
+
+    def walk(block, path):
+        entry = descriptor(image, (partition + block) * SECTOR, 261, block)
+        size, = struct.unpack_from("<Q", entry, 56)
+        ads, = struct.unpack_from("<I", entry, 172)
+        extents = [(length, partition + pos) for length, pos in
+                   (struct.unpack_from("<II", entry, 176 + i) for i in range(0, ads, 8))]
+        if entry[27] == 5:
+            files[path] = (size, extents)
+            return
+        data = b"".join(image[lba * SECTOR:lba * SECTOR + length] for length, lba in extents)
+        offset = 0
+        while offset < size:
+            fid = descriptor(data, offset, 257)
+            characteristics, name_length = fid[18], fid[19]
+            entry_block, = struct.unpack_from("<I", fid, 24)
+            name = fid[38:38 + name_length]
+            if not characteristics & 0x08:
+                text = name[1:].decode("latin-1" if name[0] == 8 else "utf-16-be")
+                walk(entry_block, f"{path}/{text}")
+            offset += (38 + name_length + 3) // 4 * 4
+
+    walk(root, "")
+    return files
+
+
+def test_files_past_one_extent_are_one_udf_file(tmp_path):
+    src = tmp_path / "media" / "sources"
+    src.mkdir(parents=True)
+    with open(src / "install.wim", "wb") as f:
+        # Sparse, and only the metadata gets built, so the test costs no disk
+        f.truncate(MAX_EXTENT + 1)
+    writer = IsoWriter().add_tree(str(tmp_path / "media"))
+    writer._now = 0
+    total = writer._layout()
+    image = writer._metadata()
+    wim = writer._find("sources/install.wim")
+
+    size, extents = udf_files(image)["/sources/install.wim"]
+    assert size == MAX_EXTENT + 1 == sum(length for length, _ in extents)
+    lba = wim.data_lba
+    for length, start in extents:
+        assert start == lba
+        lba += length // SECTOR
+    assert (wim.data_lba + (size + SECTOR - 1) // SECTOR + 1) * SECTOR == total
+
+    # ISO 9660 carries the same data as two extents, the first flagged multi-extent
+    directory = writer._find("sources").lba["iso"] * SECTOR
+    records, offset = [], directory
+    while image[offset]:
+        length = image[offset]
+        name = image[offset + 33:offset + 33 + image[offset + 32]]
+        if name == b"INSTALL.WIM;1":
+            records.append((struct.unpack_from("<I", image, offset + 2)[0],
+                            struct.unpack_from("<I", image, offset + 10)[0], image[offset + 25]))
+        offset += length
+    assert records == [(wim.data_lba, MAX_EXTENT, FLAG_MULTI_EXTENT),
+                       (wim.data_lba + MAX_EXTENT // SECTOR, 1, 0)]
+
+
+def test_small_tree_images(tmp_path):
+    src = tmp_path / "media" / "sources"
+    src.mkdir(parents=True)
+    (src / "boot.wim").write_bytes(b"\1" * 5000)
+    (tmp_path / "media" / "Ünïcode ✓").mkdir()
+    (tmp_path / "media" / "Ünïcode ✓" / "a long file name.txt").write_bytes(b"hello")
+    (tmp_path / "media" / "empty").write_bytes(b"")
+    dest = str(tmp_path / "Windows.iso")
+
+    size = create_iso(str(tmp_path / "media"), dest)
+    assert os.path.getsize(dest) == size and size % 2048 == 0
+    with open(dest, "rb") as f:
+        image = f.read()
+    assert b"\1" * 5000 in image
+
+    files = udf_files(image)
+    assert sorted(files) == ["/empty", "/sources/boot.wim", "/Ünïcode ✓/a long file name.txt"]
+    for path, (length, extents) in files.items():
+        data = b"".join(image[lba * SECTOR:lba * SECTOR + n] for n, lba in extents)
+        assert data == (tmp_path / "media" / path.lstrip("/")).read_bytes()
+    # The closing anchor is the image's last sector
+    descriptor(image, size - SECTOR, 2, size // SECTOR - 1)
+
+
+def test_fixed_timestamp_is_reproducible(tmp_path):
+    (tmp_path / "media").mkdir()
+    (tmp_path / "media" / "setup.exe").write_bytes(b"MZ" * 3000)
+    first, second = str(tmp_path / "a.iso"), str(tmp_path / "b.iso")
+
+    create_iso(str(tmp_path / "media"), first, timestamp=1700000000)
+    os.utime(tmp_path / "media" / "setup.exe", (0, 0))
+    create_iso(str(tmp_path / "media"), second, timestamp=1700000000)
+
+    with open(first, "rb") as a, open(second, "rb") as b:
+        assert a.read() == b.read()
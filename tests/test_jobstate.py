@@ -0,0 +1,25 @@
+from jobstate import IMAGE, JobState
+
+
+def test_truncated_image_is_rebuilt_on_resume(tmp_path):
+    iso = tmp_path / "Windows.iso"
+    builds = []
+
+    def create():
+        builds.append(1)
+        iso.write_bytes(b"\1" * 4096)
+        return str(iso)
+
+    state = JobState("Build", "Pro", root=str(tmp_path / "state"))
+    assert state.step_image(create) == str(iso)
+
+    # Resumed with the image intact: nothing to do
+    assert JobState("Build", "Pro", root=str(tmp_path / "state")).step_image(create) == str(iso)
+    assert len(builds) == 1
+
+    # Crash mid-rewrite left a short file at the recorded path
+    iso.write_bytes(b"\1" * 100)
+    state = JobState("Build", "Pro", root=str(tmp_path / "state"))
+    assert state.step_image(create) == str(iso)
+    assert len(builds) == 2
+    assert state.data(IMAGE)["size"] == 4096
@@ -0,0 +1,102 @@
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import bandwidth
+from mirrors import MirrorSelector
+from segjournal import SegmentJournal
+
+
+@pytest.fixture
+def mirror_server():
+    """(files, base URL): /good/<name> honours ranges, /fromzero/<name> ignores any not starting
+    at 0, /short/<name> announces the whole file on a plain GET but hangs up at 5/6 of it"""
+    files = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            kind, _, name = self.path.split("?")[0].strip("/").partition("/")
+            data = files[name]
+            match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+            if match and (kind != "fromzero" or match.group(1) == "0"):
+                start = int(match.group(1))
+                stop = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{stop}/{len(data)}")
+                body = data[start:stop + 1]
+            else:
+                self.send_response(200)
+                body = data
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if kind == "short" and not match:
+                self.wfile.write(body[:len(body) * 5 // 6])
+                self.close_connection = True
+                return
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield files, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def in_order(selector, monkeypatch):
+    """Rank the mirrors in the order they were given, whatever the probes measured"""
+    ranked = selector.rank
+    monkeypatch.setattr(selector, "rank", lambda: sorted(ranked(), key=lambda r: selector.urls.index(r["url"])))
+    return selector
+
+
+def test_resume_is_never_spliced_from_a_server_that_ignores_the_range(tmp_path, mirror_server, monkeypatch):
+    files, base = mirror_server
+    data = files["f.bin"] = os.urandom(600 * 1024)
+    dest = str(tmp_path / "f.bin")
+    # An earlier run got the first half onto disk
+    with open(dest + ".part", "wb") as f:
+        f.write(data[:300 * 1024])
+    SegmentJournal(dest + ".part", len(data)).mark(0, 300 * 1024 - 1)
+
+    selector = in_order(MirrorSelector([f"{base}/fromzero/f.bin", f"{base}/good/f.bin"]), monkeypatch)
+
+    assert selector.download(dest) == f"{base}/good/f.bin"
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+
+def test_switching_to_a_differently_sized_mirror_starts_an_empty_part(tmp_path, mirror_server, monkeypatch):
+    files, base = mirror_server
+    files["a.bin"] = os.urandom(6 * 2**20)
+    smaller = files["b.bin"] = os.urandom(300 * 1024)
+    dest = str(tmp_path / "tool.zip")
+
+    selector = in_order(MirrorSelector([f"{base}/short/a.bin", f"{base}/good/b.bin"]), monkeypatch)
+
+    assert selector.download(dest) == f"{base}/good/b.bin"
+    with open(dest, "rb") as f:
+        assert f.read() == smaller
+
+
+def test_rate_limit_is_not_taken_for_a_collapsing_mirror(tmp_path, mirror_server, monkeypatch):
+    files, base = mirror_server
+    data = files["f.bin"] = os.urandom(1536 * 1024)
+    # Far below what the probes measure on loopback; the last third waits on the limit
+    monkeypatch.setattr(bandwidth, "_scheduler", bandwidth.BandwidthScheduler(global_rate=2**20))
+    statuses = []
+    selector = in_order(MirrorSelector([f"{base}/good/f.bin", f"{base}/good/f.bin?copy"], window=0.2,
+                                       status_callback=statuses.append), monkeypatch)
+
+    selector.download(str(tmp_path / "f.bin"))
+
+    assert not [s for s in statuses if "Switching" in s]
+    with open(tmp_path / "f.bin", "rb") as f:
+        assert f.read() == data
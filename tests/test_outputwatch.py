@@ -0,0 +1,78 @@
+import ctypes
+import errno
+import os
+
+import pytest
+
+import outputwatch
+from outputwatch import OutputWatcher
+
+
+@pytest.fixture(params=["inotify", "scandir"])
+def backend(request, monkeypatch):
+    if request.param == "inotify":
+        if outputwatch._libc is None:
+            pytest.skip("no inotify here")
+    else:
+        monkeypatch.setattr(outputwatch, "_libc", None)
+    return request.param
+
+
+def test_only_images_written_after_start_are_reported(tmp_path, backend):
+    (tmp_path / "stale.iso").write_bytes(b"old")
+    (tmp_path / "rewritten.iso").write_bytes(b"old")
+
+    with OutputWatcher([str(tmp_path)]) as watcher:
+        assert watcher.using_inotify == (backend == "inotify")
+        # A folder the converter makes after the watch began, with the image inside
+        (tmp_path / "ISOFOLDER").mkdir()
+        (tmp_path / "ISOFOLDER" / "Windows.ISO").write_bytes(b"new")
+        (tmp_path / "ISOFOLDER" / "notes.txt").write_bytes(b"new")
+        (tmp_path / "rewritten.iso").write_bytes(b"newer")
+        if backend == "inotify":
+            assert watcher.wait(5)
+
+    assert sorted(watcher.results()) == [str(tmp_path / "ISOFOLDER" / "Windows.ISO"), str(tmp_path / "rewritten.iso")]
+
+
+def test_non_recursive_watch_ignores_subfolders(tmp_path, backend):
+    (tmp_path / "sub").mkdir()
+    watcher = OutputWatcher(str(tmp_path), recursive=False).start()
+    (tmp_path / "sub" / "deep.iso").write_bytes(b"x")
+    (tmp_path / "top.iso").write_bytes(b"x")
+
+    assert watcher.stop() == [str(tmp_path / "top.iso")]
+
+
+def test_renamed_into_place_counts_once_finished(tmp_path, backend):
+    watcher = OutputWatcher(str(tmp_path)).start()
+    (tmp_path / "out.iso.tmp").write_bytes(b"x" * 4096)
+    assert watcher.results() == []
+    os.replace(tmp_path / "out.iso.tmp", tmp_path / "out.iso")
+
+    assert watcher.stop() == [str(tmp_path / "out.iso")]
+
+
+@pytest.mark.skipif(outputwatch._libc is None, reason="no inotify here")
+def test_refused_watches_are_reported_and_rescanned(tmp_path, monkeypatch):
+    libc = outputwatch._libc
+
+    class WatchLimit:
+        inotify_init1 = libc.inotify_init1
+
+        @staticmethod
+        def inotify_add_watch(fd, path, mask):
+            if path.endswith(b"full"):
+                ctypes.set_errno(errno.ENOSPC)
+                return -1
+            return libc.inotify_add_watch(fd, path, mask)
+
+    monkeypatch.setattr(outputwatch, "_libc", WatchLimit)
+    (tmp_path / "full").mkdir()
+    (tmp_path / "full" / "stale.iso").write_bytes(b"old")
+
+    watcher = OutputWatcher(str(tmp_path)).start()
+    (tmp_path / "full" / "new.iso").write_bytes(b"new")
+
+    assert [(e.errno, e.filename) for e in watcher.errors] == [(errno.ENOSPC, str(tmp_path / "full"))]
+    assert watcher.stop() == [str(tmp_path / "full" / "new.iso")]
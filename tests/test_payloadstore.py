@@ -0,0 +1,49 @@
+import hashlib
+import os
+import stat
+import threading
+
+from payloadstore import PayloadStore
+
+
+def test_add_leaves_job_copy_writable(tmp_path):
+    store = PayloadStore(str(tmp_path / "store"))
+    path = tmp_path / "job" / "a.cab"
+    path.parent.mkdir()
+    path.write_bytes(b"payload")
+    sha1 = hashlib.sha1(b"payload").hexdigest()
+
+    assert store.add(str(path), sha1)
+    # Read-only would make the job's own copy unremovable on Windows
+    assert os.stat(path).st_mode & stat.S_IWUSR
+    os.remove(path)
+    assert store.has(sha1)
+
+
+def test_concurrent_adds_of_one_digest(tmp_path):
+    store = PayloadStore(str(tmp_path / "store"))
+    data = os.urandom(64 * 1024)
+    sha1 = hashlib.sha1(data).hexdigest()
+    paths = []
+    for i in range(16):
+        path = tmp_path / f"copy{i}"
+        path.write_bytes(data)
+        paths.append(str(path))
+    errors = []
+
+    def add(path):
+        try:
+            assert store.add(path, sha1, verified=True)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=add, args=(path,)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    with open(store.path_for(sha1), "rb") as f:
+        assert f.read() == data
+    assert not [n for n in os.listdir(os.path.dirname(store.path_for(sha1))) if n.endswith(".tmp")]
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from pipeline import Pipeline, PipelineError
+
+
+def test_failed_stage_stops_a_long_task_early():
+    job = Pipeline()
+    stopped = []
+
+    def download():
+        # Stands in for the payload download: honours the pipeline as its cancel check
+        for _ in range(200):
+            if job.stopping():
+                stopped.append(True)
+                raise RuntimeError("cancelled")
+            time.sleep(0.05)
+
+    def stage():
+        raise ValueError("bad payload")
+
+    job.add("payloads", download, resource="net")
+    job.add("stage:a", stage, resource="disk")
+
+    started = time.monotonic()
+    with pytest.raises(ValueError, match="bad payload"):
+        job.run()
+    assert time.monotonic() - started < 2
+    assert stopped
+
+
+def test_fail_reports_an_add_error_from_inside_a_task():
+    job = Pipeline()
+
+    def producer():
+        for name in ("a.cab", "a.cab"):
+            try:
+                job.add(f"stage:{name}", lambda: None, group="stage")
+            except PipelineError as e:
+                job.fail(f"stage:{name}", e)
+        return "done"
+
+    job.add("payloads", producer)
+    job.add("image", lambda: None, deps=("payloads", "group:stage"))
+
+    with pytest.raises(PipelineError, match="Duplicate task stage:a.cab"):
+        job.run()
+    assert job.tasks["image"].state == "skipped"
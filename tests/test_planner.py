@@ -0,0 +1,44 @@
+import planner
+
+MiB = 1024 * 1024
+
+
+def test_big_file_is_spread_so_every_lane_finishes_together():
+    files = [{"name": f"small{i}.cab", "size": 8 * MiB} for i in range(8)]
+    files.insert(3, {"name": "install.esd", "size": 64 * MiB})
+
+    plan = planner.plan(files, 8, min_segment_size=MiB)
+
+    assert plan.order[0]["name"] == "install.esd"
+    assert plan.order[0]["connections"] == 8
+    assert sum(plan.lanes) == 128 * MiB
+    assert plan.makespan == 16 * MiB and plan.balance == 1.0
+    # The list handed in keeps its own entries; only the plan carries connections
+    assert "connections" not in files[3]
+
+
+def test_small_files_get_one_connection_on_the_least_loaded_lane():
+    sizes = [2, 3, 2, 3, 2]
+    plan = planner.plan([{"name": f"f{i}", "size": s * MiB} for i, s in enumerate(sizes)], 4, min_segment_size=4 * MiB)
+
+    assert [e["size"] // MiB for e in plan.order] == [3, 3, 2, 2, 2]
+    assert all(e["connections"] == 1 for e in plan.order)
+    assert sorted(plan.lanes) == [2 * MiB, 3 * MiB, 3 * MiB, 4 * MiB]
+
+
+def test_repeated_names_are_dropped_and_repeated_content_is_linked(tmp_path):
+    files = [
+        {"name": "a.cab", "size": 5, "sha1": "AA"},
+        {"name": "a.cab", "size": 5, "sha1": "AA"},
+        {"name": "sub/b.cab", "size": 5, "sha1": "aa"},
+        {"name": "c.cab", "size": 5},
+        {"name": "d.cab", "size": 5},
+    ]
+    plan = planner.plan(files, 4)
+
+    assert sorted(e["name"] for e in plan.order) == ["a.cab", "c.cab", "d.cab"]
+    assert [(e["name"], original["name"]) for e, original in plan.duplicates] == [("sub/b.cab", "a.cab")]
+
+    (tmp_path / "a.cab").write_bytes(b"hello")
+    planner.link_duplicates(plan.duplicates, str(tmp_path))
+    assert (tmp_path / "sub" / "b.cab").read_bytes() == b"hello"
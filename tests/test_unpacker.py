@@ -0,0 +1,44 @@
+import os
+import resource
+import struct
+
+import unpacker
+
+
+def write_stored_cab(path, members):
+    """Single-folder, uncompressed cabinet holding {name: bytes}"""
+    payload = b"".join(members.values())
+    blocks = [payload[i:i + 32768] for i in range(0, len(payload), 32768)] or [b""]
+    entries = b""
+    offset = 0
+    for name, data in members.items():
+        entries += struct.pack("<IIHHHH", len(data), offset, 0, 0, 0, 0x20) + name.encode() + b"\0"
+        offset += len(data)
+    coff_files = 36 + 8
+    data_start = coff_files + len(entries)
+    header = struct.pack("<4sIIIIIBBHHHHH", b"MSCF", 0, 0, 0, coff_files, 0, 3, 1, 1, len(members), 0, 0, 0)
+    folder = struct.pack("<IHH", data_start, len(blocks), unpacker.CAB_NONE)
+    with open(path, "wb") as f:
+        f.write(header + folder + entries)
+        for block in blocks:
+            f.write(struct.pack("<IHH", 0, len(block), len(block)) + block)
+
+
+def test_cab_folder_job_keeps_few_files_open(tmp_path):
+    members = {f"dir/file{i:04d}.txt": (b"%d," % i) * (i % 7) for i in range(2000)}
+    members["big.bin"] = os.urandom(100000)
+    src = str(tmp_path / "many.cab")
+    write_stored_cab(src, members)
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(256, hard), hard))
+    try:
+        count, size = unpacker._cab_folder_job(src, str(tmp_path / "out"), 0)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    assert count == len(members)
+    assert size == sum(len(data) for data in members.values())
+    for name, data in members.items():
+        with open(tmp_path / "out" / name, "rb") as f:
+            assert f.read() == data
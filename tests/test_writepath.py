@@ -0,0 +1,29 @@
+import os
+
+import urllib3.connection
+
+import httpsession
+from mirrors import MirrorSelector
+
+
+def test_range_downloads_reuse_pooled_connections(tmp_path, http_root, monkeypatch):
+    root, base = http_root
+    for i in range(3):
+        (root / f"f{i}.cab").write_bytes(os.urandom(200 * 1024 + i))
+
+    opened = []
+    real_connect = urllib3.connection.HTTPConnection.connect
+
+    def connect(self):
+        opened.append(self)
+        return real_connect(self)
+
+    monkeypatch.setattr(urllib3.connection.HTTPConnection, "connect", connect)
+    httpsession.configure()
+    # One file at a time: every probe and Range body goes back to the pool
+    for i in range(3):
+        MirrorSelector([f"{base}/f{i}.cab"]).download(str(tmp_path / f"f{i}.cab"))
+
+    for i in range(3):
+        assert (tmp_path / f"f{i}.cab").read_bytes() == (root / f"f{i}.cab").read_bytes()
+    assert len(opened) == 1
@@ -0,0 +1,203 @@
+"""
+Flames NT UDF bridge 📀
+UDF 1.02 descriptors, so the ISO 9660 images isowriter lays out carry a UDF file system over the same file data
+"""
+
+import binascii
+import struct
+import time
+
+BLOCK = 2048
+
+# Descriptor tag identifiers (ECMA-167 3/7.2.1 and 4/7.2.1)
+PRIMARY_VOLUME = 1
+ANCHOR = 2
+IMPLEMENTATION_USE = 4
+PARTITION = 5
+LOGICAL_VOLUME = 6
+UNALLOCATED_SPACE = 7
+TERMINATING = 8
+INTEGRITY = 9
+FILE_SET = 256
+FILE_IDENTIFIER = 257
+FILE_ENTRY = 261
+
+UDF_REVISION = 0x0102
+
+# Fixed places in the image: both volume descriptor sequences and the integrity
+# sequence sit between the ISO 9660 descriptors and the anchor at 256
+MAIN_VDS = 32
+RESERVE_VDS = 48
+VDS_BLOCKS = 16
+INTEGRITY_LBA = 64
+ANCHOR_LBA = 256
+# The partition (file set, file entries and every file's data) starts right after the anchor
+PARTITION_START = ANCHOR_LBA + 1
+
+# Largest block-aligned length one allocation descriptor can describe (30 bits)
+MAX_EXTENT = 0x40000000 - BLOCK
+# 0-15 are reserved; the root directory is always 0
+FIRST_UNIQUE_ID = 16
+# Longest file identifier, compression ID included
+MAX_NAME = 255
+
+FILE_TYPE_DIRECTORY = 4
+FILE_TYPE_FILE = 5
+CHAR_DIRECTORY = 0x02
+CHAR_PARENT = 0x08
+
+# Read for everyone, plus search on directories; nothing on a disc can be changed
+PERM_FILE = 0x1084
+PERM_DIRECTORY = 0x14A5
+
+
+def _regid(identifier, suffix=b""):
+    return b"\x00" + identifier.ljust(23, b"\x00") + suffix.ljust(8, b"\x00")
+
+
+DOMAIN = _regid(b"*OSTA UDF Compliant", struct.pack("<HB", UDF_REVISION, 0))
+LV_INFO = _regid(b"*UDF LV Info", struct.pack("<H", UDF_REVISION))
+IMPLEMENTATION = _regid(b"*Flames NT")
+NSR02 = _regid(b"+NSR02")
+
+
+def _charspec():
+    return b"\x00" + b"OSTA Compressed Unicode".ljust(63, b"\x00")
+
+
+def dchars(text):
+    """OSTA compressed Unicode: 8 bits a character where Latin-1 covers text, 16 otherwise"""
+    if not text:
+        return b""
+    try:
+        return b"\x08" + text.encode("latin-1")
+    except UnicodeEncodeError:
+        return b"\x10" + text.encode("utf-16-be")
+
+
+def _dstring(text, length):
+    while len(dchars(text)) > length - 1:
+        text = text[:-1]
+    data = dchars(text)
+    if not data:
+        return bytes(length)
+    return data.ljust(length - 1, b"\x00") + bytes([len(data)])
+
+
+def _timestamp(stamp):
+    # Type 1 (local time) with a zero offset: the times are UTC
+    t = time.gmtime(stamp)
+    return struct.pack("<HhBBBBBBBB", 0x1000, t.tm_year, t.tm_mon, t.tm_mday,
+                       t.tm_hour, t.tm_min, t.tm_sec, 0, 0, 0)
+
+
+def _extent_ad(length, location):
+    return struct.pack("<II", length, location)
+
+
+def _long_ad(length, block, unique_id=0):
+    # The implementation use of an ICB address carries the entry's UDF unique ID
+    return struct.pack("<IIHHI", length, block, 0, 0, unique_id & 0xFFFFFFFF)
+
+
+def _descriptor(ident, location, body, size=None):
+    """Tag + body; the CRC covers the whole body, size pads the body first"""
+    if size is not None:
+        body = body.ljust(size - 16, b"\x00")
+    head = bytearray(struct.pack("<HHBBHHHI", ident, 2, 0, 0, 0, binascii.crc_hqx(body, 0), len(body), location))
+    head[4] = sum(head) & 0xFF
+    return bytes(head) + body
+
+
+def block(data):
+    """Pad a descriptor out to a whole block"""
+    return data.ljust(-(-len(data) // BLOCK) * BLOCK, b"\x00")
+
+
+# -- volume recognition and volume structure --------------------------------
+
+def recognition_sequence():
+    """BEA01, NSR02, TEA01: the three blocks that follow the ISO 9660 set terminator"""
+    return b"".join(block(b"\x00" + ident + b"\x01") for ident in (b"BEA01", b"NSR02", b"TEA01"))
+
+
+def anchor(location):
+    body = (_extent_ad(VDS_BLOCKS * BLOCK, MAIN_VDS) + _extent_ad(VDS_BLOCKS * BLOCK, RESERVE_VDS))
+    return _descriptor(ANCHOR, location, body, 512)
+
+
+def volume_descriptors(start, volume_id, stamp, partition_length):
+    """One volume descriptor sequence (main or reserve copy) starting at block start"""
+    recorded = _timestamp(stamp)
+    set_id = f"{int(stamp) & 0xFFFFFFFF:08X}{binascii.crc32(volume_id.encode('utf-8')):08X}{volume_id}"
+
+    primary = (struct.pack("<II", 0, 0) + _dstring(volume_id, 32) + struct.pack("<HHHHII", 1, 1, 2, 2, 1, 1)
+               + _dstring(set_id, 128) + _charspec() + _charspec() + bytes(16) + IMPLEMENTATION + recorded
+               + IMPLEMENTATION + bytes(64) + struct.pack("<IH", 0, 0))
+    lv_info = (_charspec() + _dstring(volume_id, 128) + bytes(3 * 36) + IMPLEMENTATION).ljust(460, b"\x00")
+    implementation_use = struct.pack("<I", 1) + LV_INFO + lv_info
+    partition = (struct.pack("<IHH", 2, 1, 0) + NSR02 + bytes(128)
+                 + struct.pack("<III", 1, PARTITION_START, partition_length) + IMPLEMENTATION)
+    logical = (struct.pack("<I", 3) + _charspec() + _dstring(volume_id, 128) + struct.pack("<I", BLOCK) + DOMAIN
+               + _long_ad(BLOCK, 0) + struct.pack("<II", 6, 1) + IMPLEMENTATION + bytes(128)
+               + _extent_ad(2 * BLOCK, INTEGRITY_LBA) + struct.pack("<BBHH", 1, 6, 1, 0))
+    unallocated = struct.pack("<II", 4, 0)
+
+    return b"".join([
+        block(_descriptor(PRIMARY_VOLUME, start, primary, 512)),
+        block(_descriptor(IMPLEMENTATION_USE, start + 1, implementation_use, 512)),
+        block(_descriptor(PARTITION, start + 2, partition, 512)),
+        block(_descriptor(LOGICAL_VOLUME, start + 3, logical)),
+        block(_descriptor(UNALLOCATED_SPACE, start + 4, unallocated)),
+        block(_descriptor(TERMINATING, start + 5, b"", 512)),
+    ])
+
+
+def integrity_sequence(stamp, next_unique_id, partition_length, files, directories):
+    """Closed logical volume integrity descriptor and its terminator, at INTEGRITY_LBA"""
+    implementation_use = IMPLEMENTATION + struct.pack("<IIHHH", files, directories,
+                                                      UDF_REVISION, UDF_REVISION, UDF_REVISION)
+    body = (_timestamp(stamp) + struct.pack("<I", 1) + _extent_ad(0, 0)
+            + struct.pack("<Q24x", next_unique_id) + struct.pack("<II", 1, len(implementation_use))
+            + struct.pack("<II", 0, partition_length) + implementation_use)
+    return block(_descriptor(INTEGRITY, INTEGRITY_LBA, body)) + block(_descriptor(TERMINATING, INTEGRITY_LBA + 1, b"", 512))
+
+
+# -- file set and files (locations are blocks within the partition) --------
+
+def file_set(volume_id, stamp, root_block):
+    """File set descriptor at partition block 0, followed by its terminator"""
+    body = (_timestamp(stamp) + struct.pack("<HHIIII", 3, 3, 1, 1, 0, 0) + _charspec() + _dstring(volume_id, 128)
+            + _charspec() + _dstring(volume_id, 32) + bytes(64) + _long_ad(BLOCK, root_block) + DOMAIN)
+    return block(_descriptor(FILE_SET, 0, body, 512)) + block(_descriptor(TERMINATING, 1, b"", 512))
+
+
+def file_entry(location, is_dir, length, first_block, links, unique_id, stamp):
+    """File entry for a file or directory whose data is contiguous from first_block"""
+    extents = []
+    offset = 0
+    while offset < length:
+        size = min(MAX_EXTENT, length - offset)
+        extents.append(struct.pack("<II", size, first_block + offset // BLOCK))
+        offset += size
+    allocation = b"".join(extents)
+    recorded = _timestamp(stamp)
+    icb_tag = struct.pack("<IHHHBB6xH", 0, 4, 0, 1, 0, FILE_TYPE_DIRECTORY if is_dir else FILE_TYPE_FILE, 0)
+    body = (icb_tag + struct.pack("<IIIHBBI", 0xFFFFFFFF, 0xFFFFFFFF, PERM_DIRECTORY if is_dir else PERM_FILE,
+                                  links, 0, 0, 0)
+            + struct.pack("<QQ", length, -(-length // BLOCK)) + recorded * 3 + struct.pack("<I", 1)
+            + bytes(16) + IMPLEMENTATION + struct.pack("<QII", unique_id, 0, len(allocation)) + allocation)
+    return block(_descriptor(FILE_ENTRY, location, body))
+
+
+def identifier_length(name):
+    """Bytes one file identifier descriptor for name (b"" for the parent entry) takes"""
+    return -(-(38 + len(name)) // 4) * 4
+
+
+def file_identifier(location, name, entry_block, unique_id, is_dir, parent=False):
+    """Directory record pointing at the file entry in entry_block; name is from dchars()"""
+    characteristics = (CHAR_DIRECTORY if is_dir else 0) | (CHAR_PARENT if parent else 0)
+    body = (struct.pack("<HBB", 1, characteristics, len(name)) + _long_ad(BLOCK, entry_block, unique_id)
+            + struct.pack("<H", 0) + name)
+    return _descriptor(FILE_IDENTIFIER, location, body.ljust(identifier_length(name) - 16, b"\x00"))
@@ -0,0 +1,287 @@
+"""
+Flames NT payload unpacker 📂
+Fans archive extraction out over a process pool, one job per zip batch or cab folder
+"""
+
+import os
+import shutil
+import struct
+import subprocess
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Zip members are grouped into jobs of roughly this many bytes
+ZIP_BATCH_BYTES = 256 * 1024 * 1024
+
+CAB_NONE = 0
+CAB_MSZIP = 1
+CAB_LZX = 3
+
+
+class UnpackError(RuntimeError):
+    pass
+
+
+def default_workers():
+    """Cores, capped by how many concurrent writers the disk is expected to sustain
+
+    FLAMESNT_UNPACK_WORKERS overrides; FLAMESNT_DISK_WRITERS sets the disk cap (default 8).
+    """
+    if os.environ.get("FLAMESNT_UNPACK_WORKERS"):
+        return max(1, int(os.environ["FLAMESNT_UNPACK_WORKERS"]))
+    return max(1, min(os.cpu_count() or 1, int(os.environ.get("FLAMESNT_DISK_WRITERS", 8))))
+
+
+def _safe_join(dest_dir, name):
+    """Join an archive member name onto dest_dir without letting it escape"""
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+    if not parts:
+        raise UnpackError(f"Unusable member name {name!r}")
+    return os.path.join(dest_dir, *parts)
+
+
+# -- zip ------------------------------------------------------------------
+
+def _zip_job(src, dest_dir, names):
+    """Worker: extract some members of a zip; returns (members, bytes)"""
+    count = total = 0
+    with zipfile.ZipFile(src) as archive:
+        for name in names:
+            info = archive.getinfo(name)
+            target = _safe_join(dest_dir, name)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with archive.open(info) as fin, open(target, "wb") as fout:
+                shutil.copyfileobj(fin, fout, 1024 * 1024)
+            count += 1
+            total += info.file_size
+    return count, total
+
+
+def plan_zip(src, dest_dir):
+    """Split a zip into size-balanced member batches"""
+    with zipfile.ZipFile(src) as archive:
+        infos = sorted(archive.infolist(), key=lambda i: i.file_size, reverse=True)
+    jobs, batch, batch_bytes = [], [], 0
+    for info in infos:
+        batch.append(info.filename)
+        batch_bytes += info.file_size
+        if batch_bytes >= ZIP_BATCH_BYTES:
+            jobs.append((_zip_job, (src, dest_dir, batch)))
+            batch, batch_bytes = [], 0
+    if batch or not jobs:
+        jobs.append((_zip_job, (src, dest_dir, batch)))
+    return jobs
+
+
+# -- cab ------------------------------------------------------------------
+
+def _read_cstring(f):
+    data = bytearray()
+    while True:
+        c = f.read(1)
+        if not c or c == b"\x00":
+            return bytes(data)
+        data += c
+
+
+def read_cab_directory(src):
+    """Parse a cabinet's folders and files (MS-CAB); returns (folders, files, data_reserve)"""
+    with open(src, "rb") as f:
+        header = f.read(36)
+        if header[:4] != b"MSCF":
+            raise UnpackError(f"{src} is not a cabinet")
+        coff_files, = struct.unpack("<I", header[16:20])
+        n_folders, n_files, flags = struct.unpack("<HHH", header[26:32])
+        folder_reserve = data_reserve = 0
+        if flags & 0x4:
+            header_reserve, folder_reserve, data_reserve = struct.unpack("<HBB", f.read(4))
+            f.seek(header_reserve, os.SEEK_CUR)
+        if flags & 0x3:
+            raise UnpackError(f"{src} spans several cabinets")
+
+        folders = []
+        for _ in range(n_folders):
+            offset, blocks, compress = struct.unpack("<IHH", f.read(8))
+            f.seek(folder_reserve, os.SEEK_CUR)
+            folders.append({"offset": offset, "blocks": blocks, "compress": compress})
+
+        f.seek(coff_files)
+        files = []
+        for _ in range(n_files):
+            size, folder_offset, folder, _date, _time, attribs = struct.unpack("<IIHHHH", f.read(16))
+            raw = _read_cstring(f)
+            name = raw.decode("utf-8" if attribs & 0x80 else "cp437")
+            files.append({"name": name, "size": size, "offset": folder_offset, "folder": folder})
+    return folders, files, data_reserve
+
+
+def _cab_folder_job(src, dest_dir, index):
+    """Worker: decompress one cab folder (stored or MSZIP) and write the files it holds"""
+    folders, files, data_reserve = read_cab_directory(src)
+    folder = folders[index]
+    kind = folder["compress"] & 0x0F
+    members = sorted((e for e in files if e["folder"] == index), key=lambda e: e["offset"])
+    targets = []
+    for entry in members:
+        target = _safe_join(dest_dir, entry["name"])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if not entry["size"]:
+            open(target, "wb").close()
+        targets.append(target)
+
+    # A file is open only while its byte range is being written, so a folder
+    # of thousands of small files never holds thousands of handles
+    outputs = {}
+    first = 0
+    position = 0
+    window = b""
+    try:
+        with open(src, "rb") as f:
+            f.seek(folder["offset"])
+            for _ in range(folder["blocks"]):
+                _checksum, packed, unpacked = struct.unpack("<IHH", f.read(8))
+                f.seek(data_reserve, os.SEEK_CUR)
+                block = f.read(packed)
+                if kind == CAB_NONE:
+                    data = block
+                else:
+                    if block[:2] != b"CK":
+                        raise UnpackError(f"Corrupt MSZIP block in {src}")
+                    # Each block is raw deflate primed with the previous 32 KiB of output
+                    inflater = zlib.decompressobj(-15, zdict=window) if window else zlib.decompressobj(-15)
+                    data = inflater.decompress(block[2:]) + inflater.flush()
+                    window = (window + data)[-32768:]
+                if len(data) != unpacked:
+                    raise UnpackError(f"Short block in {src}")
+
+                end = position + len(data)
+                for i in range(first, len(members)):
+                    entry = members[i]
+                    if entry["offset"] >= end:
+                        break
+                    entry_end = entry["offset"] + entry["size"]
+                    start = max(position, entry["offset"])
+                    stop = min(end, entry_end)
+                    if start < stop:
+                        out = outputs.get(i)
+                        if out is None:
+                            out = outputs[i] = open(targets[i], "wb")
+                        out.write(data[start - position:stop - position])
+                    if entry_end <= end and i in outputs:
+                        outputs.pop(i).close()
+                while first < len(members) and members[first]["offset"] + members[first]["size"] <= end:
+                    first += 1
+                position = end
+    finally:
+        for out in outputs.values():
+            out.close()
+    return len(members), sum(e["size"] for e in members)
+
+
+def _cab_external_job(src, dest_dir):
+    """Worker: hand a whole cabinet (LZX/Quantum) to the platform's expander"""
+    os.makedirs(dest_dir, exist_ok=True)
+    if os.name == "nt":
+        cmd = ["expand.exe", "-F:*", src, dest_dir]
+    elif shutil.which("cabextract"):
+        cmd = ["cabextract", "-q", "-d", dest_dir, src]
+    else:
+        raise UnpackError(f"{os.path.basename(src)} needs LZX support: install cabextract")
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise UnpackError(f"{cmd[0]} failed on {src}: {result.stderr.strip()}")
+    _, files, _ = read_cab_directory(src)
+    return len(files), sum(e["size"] for e in files)
+
+
+def plan_cab(src, dest_dir):
+    """One job per folder when we can decode it ourselves, else the whole cab externally"""
+    folders, _, _ = read_cab_directory(src)
+    if all(folder["compress"] & 0x0F in (CAB_NONE, CAB_MSZIP) for folder in folders):
+        return [(_cab_folder_job, (src, dest_dir, i)) for i in range(len(folders))]
+    return [(_cab_external_job, (src, dest_dir))]
+
+
+# Extension -> planner(src, dest_dir) returning [(worker function, args)]; workers must be
+# module-level functions so they can be pickled into the pool
+FORMATS = {
+    ".zip": plan_zip,
+    ".cab": plan_cab,
+}
+
+
+def register(extension, planner):
+    FORMATS[extension.lower()] = planner
+
+
+class Unpacker:
+    """Shared process pool for archive extraction
+
+    event_callback receives dicts like {"archive", "state", "members",
+    "bytes", "done", "total"} as each archive is queued, finished or fails.
+    """
+
+    def __init__(self, workers=None, event_callback=None):
+        self.workers = workers or default_workers()
+        self.event_callback = event_callback or (lambda event: None)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.finished = 0
+
+    def handles(self, path):
+        return os.path.splitext(path)[1].lower() in FORMATS
+
+    def unpack(self, src, dest_dir):
+        """Extract one archive using as many pool workers as it has jobs; returns (members, bytes)"""
+        planner = FORMATS.get(os.path.splitext(src)[1].lower())
+        if planner is None:
+            raise UnpackError(f"No unpacker registered for {src}")
+        self._event(src, "queued")
+        try:
+            jobs = planner(src, dest_dir)
+            pool = self._get_pool()
+            futures = [pool.submit(func, *args) for func, args in jobs]
+            members = total = 0
+            for future in futures:
+                count, size = future.result()
+                members += count
+                total += size
+        except Exception as e:
+            self._event(src, "failed", error=str(e))
+            raise
+        self._event(src, "done", members=members, bytes=total)
+        return members, total
+
+    def unpack_all(self, archives):
+        """Extract [(src, dest_dir)] concurrently; returns {src: (members, bytes)}"""
+        # Threads only wait on pool futures, so one per worker keeps the pool saturated
+        with ThreadPoolExecutor(max_workers=self.workers) as waiters:
+            futures = {src: waiters.submit(self.unpack, src, dest_dir) for src, dest_dir in archives}
+            return {src: future.result() for src, future in futures.items()}
+
+    def close(self):
+        with self._lock:
+            if self._pool:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _event(self, src, state, **detail):
+        with self._lock:
+            if state == "queued":
+                self.queued += 1
+            else:
+                self.finished += 1
+            event = dict(archive=src, state=state, done=self.finished, total=self.queued, **detail)
+        self.event_callback(event)
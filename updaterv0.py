@@ -18,6 +18,8 @@ from datetime import datetime
 import ctypes
 import platform
 
+import converter
+
 # Enable Windows DPI awareness for better scaling
 if platform.system() == 'Windows':
     try:
@@ -57,22 +59,7 @@ class UUPtoISOConverter:
         
     def find_uup_converter(self):
         """Try to find UUP converter in common locations"""
-        possible_paths = [
-            r"C:\UUP-Converter",
-            r"C:\UUPtoISO",
-            r"C:\Tools\UUP-Converter",
-            os.path.join(os.getcwd(), "UUP-Converter"),
-            os.path.join(os.getcwd(), "uup-converter-wimlib")
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                # Check for the actual converter script
-                if os.path.exists(os.path.join(path, "convert-UUP.cmd")) or \
-                   os.path.exists(os.path.join(path, "uup-converter-wimlib.cmd")):
-                    return path
-        
-        return r"C:\UUP-Converter"  # Default fallback
+        return converter.find_converter()
         
     def setup_ui(self):
         # Main container with padding
@@ -353,141 +340,18 @@ class UUPtoISOConverter:
         conversion_thread.start()
         
     def run_conversion(self):
+        # The converter itself runs headless (see converter.py / flamesctl convert);
+        # this window only feeds its messages into the console queue
         try:
-            # Determine which converter script exists
-            converter_path = self.uup_converter_path.get()
-            converter_script = None
-            
-            possible_scripts = [
-                "convert-UUP.cmd",
-                "uup-converter-wimlib.cmd",
-                "convert.cmd",
-                "ConvertUUP.cmd"
-            ]
-            
-            for script in possible_scripts:
-                script_path = os.path.join(converter_path, script)
-                if os.path.exists(script_path):
-                    converter_script = script_path
-                    break
-                    
-            if not converter_script:
-                self.output_queue.put(("error", f"\n❌ No converter script found in {converter_path}\n"))
-                return
-            
-            # Build ISO filename
-            iso_filename = f"FlamesOS_{self.build_version.get()}_{self.edition_name.get().replace(' ', '_')}.iso"
-            
-            # Map edition names to converter format
-            edition_map = {
-                "Professional": "Professional",
-                "Home": "Core",
-                "Enterprise": "Enterprise",
-                "Education": "Education",
-                "Pro N": "ProfessionalN",
-                "Core": "Core"
-            }
-            
-            edition_code = edition_map.get(self.edition_name.get(), "Professional")
-            
-            # Different converters use different arguments
-            if "wimlib" in converter_script.lower():
-                # uup-converter-wimlib style
-                cmd = [
-                    "cmd", "/c",
-                    converter_script,
-                    edition_code
-                ]
-                # Set working directory to UUP files path for this converter
-                working_dir = self.uup_files_path.get()
-            else:
-                # Standard convert-UUP.cmd style
-                cmd = [
-                    "cmd", "/c",
-                    converter_script
-                ]
-                # This converter expects to be run from its own directory
-                working_dir = converter_path
-                
-                # Copy/move UUP files if needed
-                # Some converters expect files in specific subdirectories
-                
-            # Log command
-            self.output_queue.put(("info", f"Converter: {os.path.basename(converter_script)}\n"))
-            self.output_queue.put(("info", f"Edition: {edition_code}\n"))
-            self.output_queue.put(("info", f"Working Directory: {working_dir}\n"))
-            self.output_queue.put(("info", f"Command: {' '.join(cmd)}\n\n"))
-            
-            # Create environment with proper paths
-            env = os.environ.copy()
-            env["UUP_PATH"] = self.uup_files_path.get()
-            env["ISO_PATH"] = self.iso_output_path.get()
-            env["ISO_NAME"] = iso_filename
-            
-            # Run conversion
-            self.conversion_process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                cwd=working_dir,
-                env=env,
-                shell=True
+            converter.run_conversion(
+                self.uup_converter_path.get(),
+                self.uup_files_path.get(),
+                self.iso_output_path.get(),
+                self.build_version.get(),
+                self.edition_name.get(),
+                emit=lambda kind, text: self.output_queue.put((kind, text)),
+                on_start=lambda process: setattr(self, "conversion_process", process)
             )
-            
-            # Read output
-            for line in iter(self.conversion_process.stdout.readline, ''):
-                if line:
-                    self.output_queue.put(("output", line))
-                    
-            self.conversion_process.wait()
-            
-            # Check result
-            if self.conversion_process.returncode == 0:
-                # Try to find the ISO file
-                iso_found = False
-                for root, dirs, files in os.walk(self.uup_files_path.get()):
-                    for file in files:
-                        if file.endswith('.iso'):
-                            iso_path = os.path.join(root, file)
-                            # Move to output directory
-                            final_path = os.path.join(self.iso_output_path.get(), iso_filename)
-                            try:
-                                os.rename(iso_path, final_path)
-                                self.output_queue.put(("success", f"\n✅ Conversion completed successfully!\nISO saved to: {final_path}\n"))
-                                iso_found = True
-                            except:
-                                self.output_queue.put(("success", f"\n✅ Conversion completed!\nISO created at: {iso_path}\n"))
-                                iso_found = True
-                            break
-                    if iso_found:
-                        break
-                        
-                if not iso_found:
-                    # Check output directory too
-                    for file in os.listdir(self.iso_output_path.get()):
-                        if file.endswith('.iso'):
-                            self.output_queue.put(("success", f"\n✅ Conversion completed!\nISO found: {os.path.join(self.iso_output_path.get(), file)}\n"))
-                            iso_found = True
-                            break
-                            
-                if not iso_found:
-                    self.output_queue.put(("success", "\n✅ Conversion completed! Check the converter output for ISO location.\n"))
-            else:
-                self.output_queue.put(("error", f"\n💔 Oh dear, the UUP conversion failed!\nError code: {self.conversion_process.returncode}\n"))
-                self.output_queue.put(("error", "Common issues:\n"))
-                self.output_queue.put(("error", "- Missing Windows ADK/DISM\n"))
-                self.output_queue.put(("error", "- Insufficient disk space\n"))
-                self.output_queue.put(("error", "- Corrupted UUP files\n"))
-                self.output_queue.put(("error", "- Wrong edition selected\n"))
-                
-        except Exception as e:
-            self.output_queue.put(("error", f"\n❌ Error: {str(e)}\n"))
-            import traceback
-            self.output_queue.put(("error", f"Traceback:\n{traceback.format_exc()}\n"))
-            
         finally:
             self.output_queue.put(("done", ""))
             
@@ -513,13 +377,20 @@ class UUPtoISOConverter:
         self.status_label.config(text="Ready to convert! 💻")
         
     def process_queue(self):
+        # Converter output already arrives batched; whatever queued up since the
+        # last tick goes into the console as one insert
+        pending_output = []
         try:
             while True:
                 msg_type, msg = self.output_queue.get_nowait()
                 
                 if msg_type == "output":
-                    self.log_output(msg)
-                elif msg_type == "info":
+                    pending_output.append(msg)
+                    continue
+                if pending_output:
+                    self.log_output("".join(pending_output))
+                    pending_output = []
+                if msg_type == "info":
                     self.log_output(msg, "#00ffff")
                 elif msg_type == "success":
                     self.log_output(msg, "#00ff00")
@@ -533,6 +404,8 @@ class UUPtoISOConverter:
                     
         except queue.Empty:
             pass
+        if pending_output:
+            self.log_output("".join(pending_output))
             
         self.root.after(100, self.process_queue)
 
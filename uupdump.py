@@ -0,0 +1,71 @@
+"""
+UUP dump API helpers 💕
+Shared by the Flames NT installers
+"""
+
+from bandwidth import METADATA, get_scheduler
+from httpsession import get_session
+
+API_URL = "https://api.uupdump.net"
+
+
+def get_file_list(build_id, edition, lang="en-us"):
+    """Fetch the UUP file list for a build as a list of file dicts"""
+    with get_scheduler().active(METADATA):
+        response = get_session().get(
+            f"{API_URL}/get.php",
+            params={"id": build_id, "lang": lang, "edition": edition.lower()}
+        )
+    response.raise_for_status()
+    files = response.json().get("response", {}).get("files", {})
+
+    return [
+        {
+            "name": name,
+            "url": info["url"],
+            "sha1": info.get("sha1"),
+            "sha256": info.get("sha256"),
+            "size": int(info.get("size") or 0)
+        }
+        for name, info in sorted(files.items())
+        if info.get("url")
+    ]
+
+
+def parse_aria2_list(text):
+    """Parse an aria2 input file (as served by uupdump.net) into file dicts"""
+    files = []
+    current = None
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line[0].isspace():
+            current = {"name": None, "url": line.strip(), "sha1": None, "size": 0}
+            files.append(current)
+            continue
+        if current is None:
+            continue
+        key, _, value = line.strip().partition("=")
+        if key == "out":
+            current["name"] = value
+        elif key == "checksum" and value.lower().startswith("sha-1="):
+            current["sha1"] = value[len("sha-1="):]
+
+    for entry in files:
+        if not entry["name"]:
+            entry["name"] = entry["url"].split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+    return files
+
+
+def format_aria2_list(files):
+    """Write file dicts back out as an aria2 input file (inverse of parse_aria2_list)"""
+    lines = []
+    for entry in files:
+        lines.append(entry["url"])
+        lines.append(f"  out={entry['name']}")
+        if entry.get("sha1"):
+            lines.append(f"  checksum=sha-1={entry['sha1']}")
+        if entry.get("connections"):
+            # Per-entry split set by the planner overrides the global -s
+            lines.append(f"  split={entry['connections']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,135 @@
+"""
+Flames NT download write path 💾
+Preallocated files, reusable buffers filled with readinto, large positional writes
+"""
+
+import os
+import threading
+import time
+
+MIN_CHUNK = 256 * 1024
+MAX_CHUNK = 8 * 1024 * 1024
+ALIGN = 64 * 1024
+
+
+def open_for_write(path):
+    """Raw fd for positional writes (one per worker, so no shared seek position)"""
+    return os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+
+
+def preallocate(fd, size):
+    """Reserve the whole file up front so large writes never extend it piecemeal"""
+    if not size:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            pass  # e.g. filesystems without fallocate support
+    os.ftruncate(fd, size)
+
+
+def pwrite_all(fd, view, offset):
+    """Write the whole memoryview at offset"""
+    while view:
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+
+def raw_readinto(response):
+    """readinto() for a streamed requests response
+
+    Goes through urllib3 rather than the http.client response underneath
+    it, so urllib3 sees the body finish and hands the keep-alive connection
+    back to the pool instead of dropping it on close.
+    """
+    return response.raw.readinto
+
+
+class AdaptiveBuffer:
+    """One reusable buffer whose fill size follows the observed throughput
+
+    Fills that complete faster than `fast` seconds double the chunk size,
+    fills slower than `slow` halve it, so fast links make few large writes
+    and slow links still report progress regularly.
+    """
+
+    def __init__(self, min_size=MIN_CHUNK, max_size=MAX_CHUNK, fast=0.05, slow=0.5):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.fast = fast
+        self.slow = slow
+        self.size = min_size
+        self.buffer = bytearray(min_size)
+        self.view = memoryview(self.buffer)
+
+    def fill(self, readinto, limit=None):
+        """Read until the current chunk size (or limit) is reached; returns a view of the data
+
+        The view is only valid until the next fill().
+        """
+        want = self._reserve(limit)
+        filled = 0
+        started = time.monotonic()
+        while filled < want:
+            n = readinto(self.view[filled:want])
+            if not n:
+                break
+            filled += n
+        self._adapt(time.monotonic() - started, filled == want)
+        return self.view[:filled]
+
+    async def fill_async(self, read, limit=None):
+        """fill() for an awaitable read(n) that returns bytes (asyncio streams have no readinto)"""
+        want = self._reserve(limit)
+        filled = 0
+        started = time.monotonic()
+        while filled < want:
+            data = await read(want - filled)
+            if not data:
+                break
+            self.view[filled:filled + len(data)] = data
+            filled += len(data)
+        self._adapt(time.monotonic() - started, filled == want)
+        return self.view[:filled]
+
+    def _reserve(self, limit):
+        want = self.size if limit is None else min(self.size, limit)
+        if len(self.buffer) < want:
+            # Grown lazily, so slow connections never hold a max-size buffer
+            self.view.release()
+            self.buffer = bytearray(self.size)
+            self.view = memoryview(self.buffer)
+        return want
+
+    def _adapt(self, elapsed, full):
+        if full and elapsed < self.fast and self.size < self.max_size:
+            self.size = min(self.max_size, self.size * 2)
+        elif elapsed > self.slow and self.size > self.min_size:
+            self.size = max(self.min_size, (self.size // 2) // ALIGN * ALIGN)
+
+
+class ProgressThrottle:
+    """Forwards progress at most every `interval` seconds (and always at completion)"""
+
+    def __init__(self, callback, interval=0.1):
+        self.callback = callback
+        self.interval = interval
+        self.last = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, done, total):
+        if not self.callback:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self.last < self.interval and not (total and done >= total):
+                return
+            self.last = now
+        self.callback(done, total)